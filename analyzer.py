@@ -0,0 +1,2542 @@
+"""Robot industry analysis pipeline: search, clustering, prompts, Gemini calls,
+history and Word/PDF export.
+
+Everything here runs without Streamlit so the same pipeline backs the web app
+(app.py) and the headless batch runner (weekly_batch.py). User-facing messages
+go through notify(), which app.py routes to st.warning/st.error.
+"""
+import contextlib
+import functools
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# google.generativeai, duckduckgo_search, docx, fpdf and PyPDF2 (via
+# pdf_extract) are imported inside the functions that use them: together they
+# account for most of the app's cold start, and a keyword edit or history
+# page change needs none of them.
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_LOG_LEVELS = {'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+def _log_notifier(level, message):
+    logger.log(_LOG_LEVELS.get(level, logging.INFO), message)
+
+_notifier = _log_notifier
+_notify_local = threading.local()
+
+# Function to route user-facing messages (Streamlit in the app, logging headless)
+def set_notifier(notifier):
+    global _notifier
+    _notifier = notifier or _log_notifier
+
+@contextlib.contextmanager
+def notifier_scope(notifier):
+    """Route notify() calls from the current thread to notifier (e.g. a background job)"""
+    previous = getattr(_notify_local, 'notifier', None)
+    _notify_local.notifier = notifier
+    try:
+        yield
+    finally:
+        _notify_local.notifier = previous
+
+def notify(level, message):
+    """level is 'info', 'warning' or 'error'"""
+    (getattr(_notify_local, 'notifier', None) or _notifier)(level, message)
+
+# API Key file path
+API_KEY_FILE = os.path.join(os.path.dirname(__file__), '.api_key.txt')
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), '.analysis_history.json')  # Legacy, imported once
+HISTORY_DB_FILE = os.path.join(os.path.dirname(__file__), '.analysis_history.sqlite3')
+KEYWORDS_FILE = os.path.join(os.path.dirname(__file__), '.keywords.json')
+SEARCH_CACHE_FILE = os.path.join(os.path.dirname(__file__), '.search_cache.sqlite3')
+SEEN_INDEX_FILE = os.path.join(os.path.dirname(__file__), '.seen_articles.sqlite3')
+DOC_CACHE_FILE = os.path.join(os.path.dirname(__file__), '.document_cache.sqlite3')
+RESPONSE_CACHE_FILE = os.path.join(os.path.dirname(__file__), '.response_cache.sqlite3')
+ARTICLE_CACHE_FILE = os.path.join(os.path.dirname(__file__), '.article_cache.sqlite3')
+
+# Function to load API key from file
+def load_api_key():
+    if os.path.exists(API_KEY_FILE):
+        try:
+            with open(API_KEY_FILE, 'r') as f:
+                return f.read().strip()
+        except:
+            return ""
+    return ""
+
+# Function to save API key to file
+def save_api_key(api_key):
+    try:
+        with open(API_KEY_FILE, 'w') as f:
+            f.write(api_key)
+        return True
+    except:
+        return False
+
+# Function to load keywords
+def load_keywords(path=KEYWORDS_FILE):
+    default_keywords = {
+        "group_a_construction": "건설 로봇\n건설 현장 자동화\n스마트 건설 R&D\n건설용 웨어러블 로봇",
+        "group_a_humanoid": "휴머노이드 로봇\n이족보행 로봇\n테슬라 옵티머스\n피규어 AI\n보스턴 다이내믹스",
+        "group_b_keywords": "협동로봇\n물류 로봇\nAMR\n주차 로봇\n제조업 로봇"
+    }
+    
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved_keywords = json.load(f)
+                # Merge with defaults to ensure all keys exist
+                for key, value in default_keywords.items():
+                    if key not in saved_keywords:
+                        saved_keywords[key] = value
+                return saved_keywords
+        except:
+            return default_keywords
+    return default_keywords
+
+# Function to split a keyword text area/file value into keywords
+def split_keywords(text):
+    return [k.strip() for k in text.split('\n') if k.strip()]
+
+# Function to save keywords
+def save_keywords(keywords_data):
+    try:
+        with open(KEYWORDS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(keywords_data, f, ensure_ascii=False, indent=2)
+        return True
+    except Exception as e:
+        notify('warning', f"키워드 저장 실패: {str(e)}")
+        return False
+
+# Text helpers shared by prompt budgeting and history retrieval
+_HANGUL_RE = re.compile(r'[가-힣]+')
+_LATIN_RE = re.compile(r'[a-z0-9]+')
+
+# Function to estimate prompt tokens without calling the API
+def estimate_tokens(text):
+    """Rough Gemini token count: ~1 per Hangul syllable, ~4 characters per token otherwise"""
+    hangul = sum(len(run) for run in _HANGUL_RE.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+def _relevance_terms(text):
+    """Latin/number words plus Hangul character bigrams (no morphological analyser needed)"""
+    text = text.lower()
+    terms = _LATIN_RE.findall(text)
+    for run in _HANGUL_RE.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+# History store settings
+HISTORY_SUMMARY_CHARS = 1000   # Uncompressed preview kept for listings
+HISTORY_PAGE_SIZE = 5          # Entries per sidebar page (newest page is the default context)
+HISTORY_PASSAGE_TOKENS = 250   # Target size of retrievable report passages
+HISTORY_CONTEXT_TOKENS = 1500  # Budget for retrieved history in the news prompt
+HISTORY_QUERY_TERMS = 400      # Most frequent query terms used for retrieval
+HISTORY_CANDIDATES = 200       # Best-scoring passages considered for the context budget
+
+# Function to split a report into retrievable passages
+def split_passages(content, max_tokens=HISTORY_PASSAGE_TOKENS):
+    """Group lines into passages, starting a new one at markdown headings or when full"""
+    passages, current, current_tokens = [], [], 0
+    for line in content.split('\n'):
+        if not line.strip():
+            continue
+        tokens = estimate_tokens(line)
+        if current and (line.lstrip().startswith('#') or current_tokens + tokens > max_tokens):
+            passages.append('\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        passages.append('\n'.join(current))
+    return passages
+
+# Indexed analysis history
+class HistoryStore:
+    """SQLite history with full compressed reports and unbounded retention.
+
+    Entries are addressed by id; appends and deletes touch a single row, and
+    listings read only the indexed metadata and a short preview. Each report is
+    also split into passages with an inverted index (term -> passage, tf) that
+    is updated with every append/delete, for offline BM25 retrieval.
+    """
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, "
+                "type TEXT NOT NULL, summary TEXT NOT NULL, content BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_type ON history(type, timestamp)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_passages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, entry_id INTEGER NOT NULL, "
+                "length INTEGER NOT NULL, text TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_passages_entry ON history_passages(entry_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_postings ("
+                "term TEXT NOT NULL, passage_id INTEGER NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (term, passage_id)) WITHOUT ROWID"
+            )
+        if legacy_json and os.path.exists(legacy_json):
+            self._import_legacy(legacy_json)
+        self._index_missing()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _import_legacy(self, legacy_json):
+        """One-time import of the old .analysis_history.json, kept as .bak afterwards"""
+        try:
+            with open(legacy_json, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO history (timestamp, type, summary, content) VALUES (?, ?, ?, ?)",
+                    [
+                        (item['timestamp'], item['type'], item['content'][:HISTORY_SUMMARY_CHARS],
+                         zlib.compress(item['content'].encode('utf-8')))
+                        for item in items
+                    ]
+                )
+            os.replace(legacy_json, legacy_json + '.bak')
+        except (OSError, ValueError, KeyError, sqlite3.Error):
+            pass
+
+    def _index_entry(self, conn, entry_id, content):
+        for passage in split_passages(content):
+            terms = Counter(_relevance_terms(passage))
+            if not terms:
+                continue
+            passage_id = conn.execute(
+                "INSERT INTO history_passages (entry_id, length, text) VALUES (?, ?, ?)",
+                (entry_id, sum(terms.values()), passage)
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO history_postings (term, passage_id, tf) VALUES (?, ?, ?)",
+                [(term, passage_id, tf) for term, tf in terms.items()]
+            )
+
+    def _index_missing(self):
+        """Index entries written before passage retrieval existed"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, content FROM history WHERE id NOT IN (SELECT DISTINCT entry_id FROM history_passages)"
+            ).fetchall()
+            for entry_id, blob in rows:
+                self._index_entry(conn, entry_id, zlib.decompress(blob).decode('utf-8'))
+
+    @staticmethod
+    def _row_to_entry(row):
+        return {'id': row[0], 'timestamp': row[1], 'type': row[2], 'summary': row[3]}
+
+    def append(self, analysis_type, content):
+        with self._connect() as conn:
+            entry_id = conn.execute(
+                "INSERT INTO history (timestamp, type, summary, content) VALUES (?, ?, ?, ?)",
+                (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), analysis_type,
+                 content[:HISTORY_SUMMARY_CHARS], zlib.compress(content.encode('utf-8')))
+            ).lastrowid
+            self._index_entry(conn, entry_id, content)
+            return entry_id
+
+    def delete(self, entry_id):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM history_postings WHERE passage_id IN "
+                "(SELECT id FROM history_passages WHERE entry_id = ?)", (entry_id,)
+            )
+            conn.execute("DELETE FROM history_passages WHERE entry_id = ?", (entry_id,))
+            return conn.execute("DELETE FROM history WHERE id = ?", (entry_id,)).rowcount > 0
+
+    def search_passages(self, query, token_budget=HISTORY_CONTEXT_TOKENS, entry_ids=None):
+        """Return the passages most relevant to query (BM25) that fit token_budget.
+
+        entry_ids restricts retrieval to those history entries. Results are
+        dicts with timestamp, type, text and score, best first.
+        """
+        terms = [term for term, _ in Counter(_relevance_terms(query)).most_common(HISTORY_QUERY_TERMS)]
+        if not terms or entry_ids == []:
+            return []
+
+        entry_filter, entry_params = "", []
+        if entry_ids is not None:
+            entry_filter = f" WHERE s.entry_id IN ({','.join('?' * len(entry_ids))})"
+            entry_params = list(entry_ids)
+
+        scores = Counter()
+        with self._connect() as conn:
+            passages, total_length = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM history_passages"
+            ).fetchone()
+            if not passages:
+                return []
+            avgdl = total_length / passages
+
+            for i in range(0, len(terms), 400):
+                batch = terms[i:i + 400]
+                placeholders = ",".join("?" * len(batch))
+                df = conn.execute(
+                    f"SELECT term, COUNT(*) FROM history_postings WHERE term IN ({placeholders}) GROUP BY term",
+                    batch
+                ).fetchall()
+                if not df:
+                    continue
+                # BM25 is summed per passage in SQL; only the idf weights come from Python
+                idf = [(term, math.log(1 + (passages - n + 0.5) / (n + 0.5))) for term, n in df]
+                weights = ",".join("(?, ?)" for _ in idf)
+                scores.update(dict(conn.execute(
+                    f"WITH q(term, idf) AS (VALUES {weights}) "
+                    "SELECT p.passage_id, SUM(q.idf * p.tf * ? / (p.tf + ? * (1 - ? + ? * s.length / ?))) "
+                    "FROM q JOIN history_postings p ON p.term = q.term "
+                    f"JOIN history_passages s ON s.id = p.passage_id{entry_filter} GROUP BY p.passage_id",
+                    [value for pair in idf for value in pair]
+                    + [BM25_K1 + 1, BM25_K1, BM25_B, BM25_B, avgdl] + entry_params
+                )))
+
+            ranked = scores.most_common(HISTORY_CANDIDATES)
+            rows = {}
+            for i in range(0, len(ranked), 500):
+                ids = [passage_id for passage_id, _ in ranked[i:i + 500]]
+                rows.update((row[0], row[1:]) for row in conn.execute(
+                    "SELECT s.id, s.text, h.timestamp, h.type FROM history_passages s "
+                    f"JOIN history h ON h.id = s.entry_id WHERE s.id IN ({','.join('?' * len(ids))})", ids
+                ))
+
+            results, used = [], 0
+            for passage_id, score in ranked:
+                text, timestamp, analysis_type = rows[passage_id]
+                cost = estimate_tokens(text)
+                if used + cost > token_budget:
+                    continue
+                results.append({'timestamp': timestamp, 'type': analysis_type, 'text': text, 'score': score})
+                used += cost
+                if token_budget - used < 20:
+                    break
+        return results
+
+    def count(self, analysis_type=None):
+        with self._connect() as conn:
+            if analysis_type:
+                return conn.execute("SELECT COUNT(*) FROM history WHERE type = ?", (analysis_type,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def page(self, offset=0, limit=HISTORY_PAGE_SIZE, analysis_type=None):
+        """Entries newest first, without the full report text"""
+        query = "SELECT id, timestamp, type, summary FROM history"
+        params = []
+        if analysis_type:
+            query += " WHERE type = ?"
+            params.append(analysis_type)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._connect() as conn:
+            return [self._row_to_entry(row) for row in conn.execute(query, params)]
+
+    def get(self, entry_id):
+        """Entry with its full report text, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, timestamp, type, summary, content FROM history WHERE id = ?", (entry_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = self._row_to_entry(row)
+        entry['content'] = zlib.decompress(row[4]).decode('utf-8')
+        return entry
+
+    def latest(self, analysis_type=None):
+        entries = self.page(0, 1, analysis_type)
+        return self.get(entries[0]['id']) if entries else None
+
+@functools.lru_cache(maxsize=None)
+def get_history_store():
+    return HistoryStore(HISTORY_DB_FILE, legacy_json=HISTORY_FILE)
+
+# Function to save analysis to history
+def save_to_history(analysis_type, content):
+    try:
+        store = get_history_store()
+        
+        # A cached response replayed for the same request is not a new analysis
+        last = store.latest(analysis_type)
+        if last and last['content'] == content:
+            return True
+        
+        store.append(analysis_type, content)
+        return True
+    except Exception as e:
+        notify('warning', f"히스토리 저장 실패: {str(e)}")
+        return False
+
+# Function to delete history item
+def delete_history_item(entry_id):
+    try:
+        return get_history_store().delete(entry_id)
+    except:
+        return False
+
+# Function to get history summary
+def get_history_summary(selected_ids=None):
+    store = get_history_store()
+    if not store.count():
+        return "이전 분석 기록이 없습니다."
+    
+    summary = "=== 이전 분석 히스토리 ===\n\n"
+    
+    # Filter by selected entries if provided
+    if selected_ids is not None:
+        target_history = [entry for entry in (store.get(i) for i in selected_ids) if entry]
+        target_history.sort(key=lambda entry: (entry['timestamp'], entry['id']))
+    else:
+        target_history = list(reversed(store.page(0, HISTORY_PAGE_SIZE)))  # Default to the newest sidebar page
+        
+    if not target_history:
+        return "선택된 이전 분석 기록이 없습니다."
+        
+    for i, item in enumerate(target_history, 1):
+        summary += f"{i}. [{item['timestamp']}] {item['type']}\n"
+        summary += f"   요약: {item['summary'][:200]}...\n\n"
+    
+    return summary
+
+# Function to build history context relevant to the current news
+def get_relevant_history(query, selected_ids=None, token_budget=HISTORY_CONTEXT_TOKENS):
+    """Pick the past-report passages most relevant to query within token_budget.
+
+    Falls back to get_history_summary when nothing in history matches.
+    """
+    passages = get_history_store().search_passages(query, token_budget, selected_ids)
+    if not passages:
+        return get_history_summary(selected_ids)
+    
+    summary = "=== 이전 분석 중 이번 뉴스와 관련된 내용 ===\n\n"
+    for item in sorted(passages, key=lambda p: p['timestamp']):
+        summary += f"[{item['timestamp']}] {item['type']}\n{item['text']}\n\n"
+    return summary
+
+# Function to save as Word
+def save_to_word(content):
+    try:
+        started = time.perf_counter()
+        from docx import Document
+        from docx.oxml.ns import qn
+
+        doc = Document()
+        
+        # Set style for Korean font
+        style = doc.styles['Normal']
+        style.font.name = 'Malgun Gothic'
+        style._element.rPr.rFonts.set(qn('w:eastAsia'), 'Malgun Gothic')
+        
+        # Add heading
+        heading = doc.add_heading('로봇 산업 분석 리포트', 0)
+        heading.style.font.name = 'Malgun Gothic'
+        heading.style._element.rPr.rFonts.set(qn('w:eastAsia'), 'Malgun Gothic')
+        
+        # Add timestamp
+        p = doc.add_paragraph(f"생성 일시: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        p.style = doc.styles['Normal']
+        
+        doc.add_paragraph("-" * 50)
+        
+        # Add content
+        for line in content.split('\n'):
+            p = doc.add_paragraph(line)
+            p.style = doc.styles['Normal']
+        
+        # Save to BytesIO
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+        metrics.record('export.word', started, content_chars=len(content), output_bytes=buffer.getbuffer().nbytes)
+        return buffer
+    except Exception as e:
+        notify('error', f"Word 생성 실패: {str(e)}")
+        return None
+
+# Korean PDF font settings
+FONT_DIR = os.path.join(os.path.dirname(__file__), 'fonts')   # Bundled/offline fonts
+FONT_PATH_ENV = 'ROBOT_NEWS_FONT'                              # Explicit font file override
+KOREAN_FONT_URL = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Regular.ttf"
+FONT_DOWNLOAD_TIMEOUT = 60                                     # Seconds wait() blocks for the download
+KOREAN_FONT_CANDIDATES = [
+    os.path.join(FONT_DIR, "NanumGothic.ttf"),
+    os.path.join(FONT_DIR, "NanumGothic-Regular.ttf"),
+    "NanumGothic.ttf",   # Downloaded into the working directory by older versions
+    "C:/Windows/Fonts/malgun.ttf",
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/nanum/NanumGothic.ttf",
+    "/Library/Fonts/NanumGothic.ttf",
+    "/System/Library/Fonts/Supplemental/AppleGothic.ttf"
+]
+
+# Process-wide Korean font lookup for PDF export
+class FontRegistry:
+    """Resolves the Korean font for the process.
+
+    If no font is installed, NanumGothic is fetched into FONT_DIR on a
+    background thread, started as soon as the registry is created. The app
+    creates it at startup and reports "not ready" until the font lands;
+    headless callers block on wait() instead. While no font is known the
+    candidates are checked again on every lookup, so a font installed later
+    (or ROBOT_NEWS_FONT set) is picked up without a restart.
+    """
+    def __init__(self, download=True):
+        self.path = self._resolve()
+        self.error = None   # Why the last download failed, if it did
+        self._lock = threading.Lock()
+        self._downloading = False
+        self._fetched = threading.Event()
+        if self.path is None and download:
+            self.fetch_in_background()
+
+    @staticmethod
+    def _resolve():
+        candidates = [os.environ.get(FONT_PATH_ENV, "")] + KOREAN_FONT_CANDIDATES
+        for path in candidates:
+            if path and os.path.exists(path):
+                return path
+        return None
+
+    @property
+    def downloading(self):
+        with self._lock:
+            return self._downloading
+
+    def fetch_in_background(self):
+        with self._lock:
+            if self._downloading:
+                return
+            self._downloading = True
+            self._fetched.clear()
+        threading.Thread(target=self._download, daemon=True).start()
+
+    def _download(self):
+        target = os.path.join(FONT_DIR, "NanumGothic.ttf")
+        try:
+            os.makedirs(FONT_DIR, exist_ok=True)
+            partial = target + ".part"
+            urllib.request.urlretrieve(KOREAN_FONT_URL, partial)
+            os.replace(partial, target)
+            self.path = target
+            self.error = None
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"[:200]
+        finally:
+            with self._lock:
+                self._downloading = False
+            self._fetched.set()
+
+    def korean_font_path(self):
+        if self.path is None or not os.path.exists(self.path):
+            self.path = self._resolve()
+        return self.path
+
+    def retry(self):
+        """Look for a font again and restart the download if none is found or running"""
+        path = self.korean_font_path()
+        if path is None:
+            self.fetch_in_background()
+        return path
+
+    def missing_notice(self):
+        """(level, message) explaining why no font is available"""
+        if self.downloading:
+            return 'warning', "⏳ 한글 PDF 폰트를 내려받는 중입니다. 잠시 후 다시 시도하세요."
+        reason = f"폰트 다운로드 실패 ({self.error})" if self.error else "한글 PDF 폰트를 찾지 못했습니다"
+        return 'error', (
+            f"{reason}. {FONT_PATH_ENV} 환경 변수에 TTF 폰트 경로를 지정하거나 "
+            f"{os.path.join(FONT_DIR, 'NanumGothic.ttf')} 에 폰트를 넣은 뒤 다시 시도하세요."
+        )
+
+    def wait(self, timeout=FONT_DOWNLOAD_TIMEOUT):
+        """Block until a font is available or the download ends; return the path or None"""
+        if self.retry() is None:
+            self._fetched.wait(timeout)
+        return self.korean_font_path()
+
+@functools.lru_cache(maxsize=None)
+def get_font_registry():
+    return FontRegistry()
+
+# Function to save as PDF
+def save_to_pdf(content):
+    """Build a PDF report. fpdf2 embeds only the glyphs actually used from the TTF.
+
+    Returns None (with a warning) while no Korean font is available: the
+    built-in fonts cannot encode Hangul. Batch callers should wait() on the
+    font registry first.
+    """
+    try:
+        started = time.perf_counter()
+        # Font handling (looked up in the registry, never downloaded here)
+        registry = get_font_registry()
+        font_path = registry.korean_font_path()
+        if not font_path:
+            notify(*registry.missing_notice())
+            return None
+
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.add_font('Korean', '', font_path)
+        pdf.set_font('Korean', '', 11)
+            
+        pdf.cell(0, 10, "로봇 산업 분석 리포트", new_x="LMARGIN", new_y="NEXT", align='C')
+        pdf.cell(0, 10, f"생성 일시: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", new_x="LMARGIN", new_y="NEXT", align='R')
+        pdf.ln(10)
+        
+        # Split content by lines and write
+        # Replace unsupported characters
+        content = content.replace('\u2022', '-').replace('\u2013', '-').replace('\u2014', '-')
+        
+        for line in content.split('\n'):
+            # Handle empty lines
+            if not line.strip():
+                pdf.ln(5)
+                continue
+            
+            # Use multi_cell for automatic wrapping; return to the left margin
+            # (fpdf2 leaves x at the right edge by default, so the next line
+            # would have no width left)
+            try:
+                pdf.multi_cell(0, 8, line, new_x="LMARGIN", new_y="NEXT")
+            except Exception:
+                # Fallback for problematic lines (e.g. very long words)
+                try:
+                    pdf.set_x(pdf.l_margin)
+                    pdf.multi_cell(0, 8, line[:100] + "...", new_x="LMARGIN", new_y="NEXT")
+                except:
+                    pass
+            
+        # Output to bytes
+        data = bytes(pdf.output(dest='S'))
+        metrics.record('export.pdf', started, content_chars=len(content), output_bytes=len(data))
+        return data
+    except Exception as e:
+        notify('error', f"PDF 생성 실패: {str(e)}")
+        return None
+
+# Search concurrency settings
+SEARCH_MAX_WORKERS = 4       # Parallel keyword searches
+SEARCH_RATE_PER_SEC = 2.0    # Sustained DuckDuckGo requests per second
+SEARCH_RATE_BURST = 4        # Requests allowed back-to-back before throttling
+
+# Token bucket rate limiter shared by all search workers
+class TokenBucket:
+    """Thread-safe token bucket used to pace DuckDuckGo requests"""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+# Process-wide limiter so concurrent searches (and sessions) share one budget
+@functools.lru_cache(maxsize=None)
+def get_search_rate_limiter():
+    return TokenBucket(SEARCH_RATE_PER_SEC, SEARCH_RATE_BURST)
+
+# Reusable API clients. Each DDGS holds an HTTP client with keep-alive
+# connections, so handing the same objects to every search avoids paying a
+# TCP/TLS handshake per keyword.
+DDGS_POOL_MAX_IDLE = SEARCH_MAX_WORKERS * 5   # Workers x hedged fallback strategies
+
+class ClientPool:
+    """Thread-safe pool of clients; a leased client is used by one thread at a time"""
+    def __init__(self, factory, max_idle):
+        self._factory = factory
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextlib.contextmanager
+    def lease(self):
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+            if client is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if client is None:
+            client = self._factory()
+        try:
+            yield client
+        finally:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(client)
+
+    def stats(self):
+        with self._lock:
+            return {'created': self.created, 'reused': self.reused, 'idle': len(self._idle)}
+
+def _new_ddgs():
+    from duckduckgo_search import DDGS
+    return DDGS()
+
+@functools.lru_cache(maxsize=None)
+def get_ddgs_pool():
+    return ClientPool(_new_ddgs, DDGS_POOL_MAX_IDLE)
+
+# Search result cache settings
+SEARCH_CACHE_TTL = 6 * 60 * 60              # Seconds before a cached search expires
+SEARCH_CACHE_MAX_BYTES = 20 * 1024 * 1024   # Evict oldest entries beyond this size
+
+# Function to trim a SQLite cache table to a byte budget, oldest first
+def _evict_to_size(conn, table, key_column, order_column, max_bytes):
+    total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+    if total <= max_bytes:
+        return
+    stale = []
+    for key, size in conn.execute(f"SELECT {key_column}, size FROM {table} ORDER BY {order_column} ASC"):
+        if total <= max_bytes:
+            break
+        stale.append((key,))
+        total -= size
+    conn.executemany(f"DELETE FROM {table} WHERE {key_column} = ?", stale)
+
+# SQLite-backed cache of DuckDuckGo results
+class SearchCache:
+    """Persistent TTL cache keyed by (keyword, region, timelimit, max_results)"""
+    def __init__(self, path, ttl=SEARCH_CACHE_TTL, max_bytes=SEARCH_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, "
+                "size INTEGER NOT NULL, payload TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_created ON search_cache(created_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def _key(keyword, region, timelimit, max_results):
+        return json.dumps([keyword, region, timelimit, max_results], ensure_ascii=False)
+
+    def get(self, keyword, region, timelimit, max_results):
+        """Return cached results, or None on a miss or expired entry"""
+        key = self._key(keyword, region, timelimit, max_results)
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT created_at, payload FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            row = None
+        with self._lock:
+            if row and time.time() - row[0] < self.ttl:
+                self.hits += 1
+                return json.loads(row[1])
+            self.misses += 1
+        return None
+
+    def set(self, keyword, region, timelimit, max_results, results):
+        key = self._key(keyword, region, timelimit, max_results)
+        payload = json.dumps(results, ensure_ascii=False)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, created_at, size, payload) VALUES (?, ?, ?, ?)",
+                    (key, time.time(), len(payload.encode('utf-8')), payload)
+                )
+                self._evict(conn)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn):
+        """Drop expired entries, then the oldest ones until under max_bytes"""
+        conn.execute("DELETE FROM search_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        _evict_to_size(conn, 'search_cache', 'key', 'created_at', self.max_bytes)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM search_cache")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        try:
+            with self._connect() as conn:
+                entries, size = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache"
+                ).fetchone()
+        except sqlite3.Error:
+            entries, size = 0, 0
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+@functools.lru_cache(maxsize=None)
+def get_search_cache():
+    return SearchCache(SEARCH_CACHE_FILE)
+
+# Function to run one DuckDuckGo query through the cache and rate limiter
+def _cached_text(ddgs, keyword, region, timelimit, max_results, limiter=None, cache=None):
+    """Query DuckDuckGo, consulting the cache first. Network errors propagate."""
+    with metrics.span('search.query', keyword=keyword, region=region, timelimit=timelimit) as fields:
+        if cache:
+            cached = cache.get(keyword, region, timelimit, max_results)
+            if cached is not None:
+                fields.update(cached=True, results=len(cached))
+                return cached
+        if limiter:
+            waited = time.perf_counter()
+            limiter.acquire()
+            fields['rate_wait_ms'] = round((time.perf_counter() - waited) * 1000, 1)
+        if region is None:
+            results = ddgs.text(keyword, max_results=max_results)
+        else:
+            results = ddgs.text(
+                keyword,
+                region=region,
+                safesearch='off',
+                timelimit=timelimit,
+                max_results=max_results
+            )
+        results = list(results or [])   # duckduckgo-search 4.x returns a generator
+        fields['results'] = len(results)
+        if cache:
+            cache.set(keyword, region, timelimit, max_results, results)
+        return results
+
+# Fallback ladder: (region, timelimit), tried in priority order.
+# (None, None) is the unconstrained catch-all query.
+SEARCH_STRATEGIES = [
+    ('kr-kr', 'w'),    # 1. Korean region, past week
+    ('kr-kr', None),   # 2. Korean region, any time
+    ('wt-wt', 'w'),    # 3. World region, past week
+    ('wt-wt', None),   # 4. World region, any time
+    (None, None)       # 5. Catch-all without constraints
+]
+SEARCH_HEDGE_DELAY = 1.5     # Seconds before launching the next strategy in hedged mode
+
+# Function to search a single keyword with the region/timelimit fallback ladder
+def search_keyword(keyword, max_results=5, limiter=None, cache=None, hedge_delay=None):
+    """Return raw DuckDuckGo results for one keyword, or None if every attempt failed.
+
+    With hedge_delay set, the next strategy is launched in parallel whenever the
+    current ones have not answered within hedge_delay seconds (or as soon as
+    they all fail). The first non-empty result in priority order wins; once
+    any strategy has results no further ones are launched, and slower
+    higher-priority strategies get one more hedge_delay before it is used.
+    """
+    with metrics.span('search.keyword', keyword=keyword, hedged=hedge_delay is not None) as fields:
+        if hedge_delay is not None:
+            results = _hedged_search_keyword(keyword, max_results, limiter, cache, hedge_delay)
+        else:
+            results = _sequential_search_keyword(keyword, max_results, limiter, cache)
+        fields.update(results=len(results or []), failed=results is None)
+        return results
+
+def _sequential_search_keyword(keyword, max_results, limiter, cache):
+    *ladder, (fallback_region, fallback_timelimit) = SEARCH_STRATEGIES
+
+    with get_ddgs_pool().lease() as ddgs:
+        for region, timelimit in ladder:
+            try:
+                results = _cached_text(ddgs, keyword, region, timelimit, max_results, limiter, cache)
+                if results:
+                    return results
+            except Exception:
+                continue
+
+        # Final fallback: try without any constraints and catch-all
+        try:
+            return _cached_text(ddgs, keyword, fallback_region, fallback_timelimit, max_results, limiter, cache)
+        except Exception:
+            return None
+
+def _hedged_search_keyword(keyword, max_results, limiter, cache, hedge_delay):
+    @metrics.bind
+    def run(region, timelimit):
+        with get_ddgs_pool().lease() as ddgs:
+            return _cached_text(ddgs, keyword, region, timelimit, max_results, limiter, cache)
+
+    def outcome(future):
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    executor = ThreadPoolExecutor(max_workers=len(SEARCH_STRATEGIES))
+    futures = []
+    answered_deadline = None
+    try:
+        futures.append(executor.submit(run, *SEARCH_STRATEGIES[0]))
+        while True:
+            # Walk launched strategies in priority order; stop at the first
+            # one still running, since a higher-priority answer may yet arrive
+            pending = None
+            last_outcome = None
+            for future in futures:
+                if not future.done():
+                    pending = future
+                    break
+                last_outcome = outcome(future)
+                if last_outcome:
+                    return last_outcome
+
+            if pending is None:
+                if len(futures) == len(SEARCH_STRATEGIES):
+                    # Every strategy answered; mirror the sequential catch-all result
+                    return last_outcome
+                # All launched strategies came back empty: escalate immediately
+                futures.append(executor.submit(run, *SEARCH_STRATEGIES[len(futures)]))
+                continue
+
+            running = [f for f in futures if not f.done()]
+            answered = next((result for result in (outcome(f) for f in futures if f.done()) if result), None)
+            if answered:
+                # A lower-priority strategy already has results: launch nothing
+                # more, give the higher-priority ones one hedge_delay, then use it
+                if answered_deadline is None:
+                    answered_deadline = time.monotonic() + hedge_delay
+                remaining = answered_deadline - time.monotonic()
+                if remaining <= 0:
+                    return answered
+                wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+                continue
+
+            can_hedge = len(futures) < len(SEARCH_STRATEGIES)
+            done, _ = wait(running, timeout=hedge_delay if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done and can_hedge:
+                futures.append(executor.submit(run, *SEARCH_STRATEGIES[len(futures)]))
+    finally:
+        # Losing strategies are ignored; queued ones never start
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Function to search news using DuckDuckGo
+def search_news(keywords_list, max_results=5, max_workers=SEARCH_MAX_WORKERS, use_cache=True, hedge_delay=None):
+    """Search news using DuckDuckGo with robust retry logic.
+
+    Keywords are searched concurrently on a bounded worker pool and paced by a
+    shared token bucket. Results are merged in keyword order, so URL dedup and
+    keyword attribution match a sequential run. Queries answered by the
+    on-disk search cache skip the network and the rate limiter entirely.
+    Passing hedge_delay runs each keyword's fallback ladder in hedged mode.
+    """
+    all_results = []
+    seen_urls = set()
+
+    limiter = get_search_rate_limiter()
+    cache = get_search_cache() if use_cache else None
+    workers = max(1, min(max_workers, len(keywords_list)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        keyword_results = list(executor.map(
+            metrics.bind(lambda keyword: search_keyword(keyword, max_results, limiter, cache, hedge_delay)),
+            keywords_list
+        ))
+
+    for keyword, results in zip(keywords_list, keyword_results):
+        if results is None:
+            notify('warning', f"검색 실패 (키워드: {keyword}) - 모든 검색 시도 실패")
+            continue
+        for result in results:
+            url = result.get('href', '')
+            if url and url not in seen_urls:
+                seen_urls.add(url)
+                all_results.append({
+                    'title': result.get('title', ''),
+                    'snippet': result.get('body', ''),
+                    'url': url,
+                    'keyword': keyword
+                })
+
+    return all_results
+
+# Near-duplicate clustering settings
+NEAR_DUP_SHINGLE = 3          # Character shingle length (one Hangul syllable per char)
+NEAR_DUP_PERMUTATIONS = 32    # MinHash signature length
+NEAR_DUP_BANDS = 16           # LSH bands; rows per band = permutations / bands
+NEAR_DUP_THRESHOLD = 0.5      # Jaccard similarity of shingle sets for "same story"
+
+_NON_WORD_RE = re.compile(r'\W+')
+_EMPTY_BIN = 1 << 32
+
+# Function to split a text into character shingles
+def _shingles(text):
+    """Whitespace and punctuation are dropped first, so spacing differences
+    between outlets (common in Korean copy) do not change the shingles.
+    """
+    normalized = _NON_WORD_RE.sub('', text.lower())
+    if len(normalized) < NEAR_DUP_SHINGLE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + NEAR_DUP_SHINGLE] for i in range(len(normalized) - NEAR_DUP_SHINGLE + 1)}
+
+# Function to build a one-permutation MinHash signature of a shingle set
+def _minhash_signature(shingles):
+    """Hash each shingle once and keep the minimum per bin"""
+    signature = [_EMPTY_BIN] * NEAR_DUP_PERMUTATIONS
+    for shingle in shingles:
+        # Stable across processes, unlike hash() (salted by PYTHONHASHSEED)
+        h = zlib.crc32(shingle.encode('utf-8'))
+        b = h % NEAR_DUP_PERMUTATIONS
+        if h < signature[b]:
+            signature[b] = h
+    return signature
+
+def _jaccard(a, b):
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if a or b else 0.0
+
+# Function to collapse syndicated copies of the same story
+def cluster_near_duplicates(news_items, threshold=NEAR_DUP_THRESHOLD):
+    """Cluster near-duplicate news on title+snippet using MinHash LSH.
+
+    Items are taken in order; LSH banding only proposes candidates, and an
+    item joins a cluster when the exact shingle Jaccard with the cluster's
+    representative reaches threshold. Comparing against the representative
+    rather than any member keeps chains of loosely similar stories apart.
+    Returns one representative per cluster (the earliest item, so keyword
+    priority is kept) with 'source_count' and 'duplicate_urls' added.
+    """
+    shingles = [
+        _shingles(f"{item.get('title', '')} {item.get('snippet', '')}")
+        for item in news_items
+    ]
+    rows = NEAR_DUP_PERMUTATIONS // NEAR_DUP_BANDS
+    buckets = {}
+    cluster_of = []     # item index -> representative index
+    clusters = {}       # representative index -> member indices
+    for i, item_shingles in enumerate(shingles):
+        signature = _minhash_signature(item_shingles)
+        keys = [
+            (band, tuple(signature[band * rows:(band + 1) * rows]))
+            for band in range(NEAR_DUP_BANDS)
+        ]
+        keys = [key for key in keys if any(v != _EMPTY_BIN for v in key[1])]
+        candidates = sorted({cluster_of[j] for key in keys for j in buckets.get(key, ())})
+        representative = next(
+            (r for r in candidates if _jaccard(item_shingles, shingles[r]) >= threshold), i
+        )
+        cluster_of.append(representative)
+        clusters.setdefault(representative, []).append(i)
+        for key in keys:
+            buckets.setdefault(key, []).append(i)
+
+    clustered = []
+    for representative_index, members in clusters.items():
+        representative = dict(news_items[representative_index])
+        representative['source_count'] = len(members)
+        representative['duplicate_urls'] = [news_items[j]['url'] for j in members[1:]]
+        clustered.append(representative)
+    return clustered
+
+# Function to search both keyword groups the way the weekly report uses them
+def search_keyword_groups(keywords, use_cache=True, hedge_delay=None, merge_duplicates=True, progress_callback=None):
+    """Search Group A (construction + humanoid) and Group B keywords.
+
+    keywords uses the .keywords.json layout. Returns {'group_a': [...], 'group_b': [...]};
+    each article's 'topic' is 'construction', 'humanoid' or 'other'.
+    progress_callback(percent, message) is called as each stage starts or ends.
+    """
+    progress = progress_callback or (lambda percent, message: None)
+    construction_keywords = split_keywords(keywords['group_a_construction'])
+    group_a_all = construction_keywords + split_keywords(keywords['group_a_humanoid'])
+    other_keywords = split_keywords(keywords['group_b_keywords'])
+    
+    # Search Group A (high priority)
+    progress(0, "그룹 A 검색 중 (건설 로봇 & 휴머노이드)...")
+    with metrics.span('search.group_a', keywords=len(group_a_all)) as fields:
+        group_a_results = search_news(group_a_all, max_results=5, use_cache=use_cache, hedge_delay=hedge_delay)
+        fields['articles'] = len(group_a_results)
+    
+    # Search Group B
+    progress(60, "그룹 B 검색 중 (기타 로봇)...")
+    with metrics.span('search.group_b', keywords=len(other_keywords)) as fields:
+        group_b_results = search_news(other_keywords, max_results=3, use_cache=use_cache, hedge_delay=hedge_delay)
+        fields['articles'] = len(group_b_results)
+    progress(80, None)
+    
+    # Tag the report section each article feeds (used by section-parallel reports)
+    for news in group_a_results:
+        news['topic'] = 'construction' if news['keyword'] in construction_keywords else 'humanoid'
+    for news in group_b_results:
+        news['topic'] = 'other'
+    
+    if merge_duplicates:
+        progress(80, "유사 기사 정리 중...")
+        with metrics.span('search.cluster', articles=len(group_a_results) + len(group_b_results)) as fields:
+            group_a_results = cluster_near_duplicates(group_a_results)
+            group_b_results = cluster_near_duplicates(group_b_results)
+            fields['clusters'] = len(group_a_results) + len(group_b_results)
+    
+    progress(100, "검색 완료!")
+    return {'group_a': group_a_results, 'group_b': group_b_results}
+
+# Prompt budget settings
+PROMPT_NEWS_TOKEN_BUDGET = 12000   # Tokens of news items across both groups (None = unlimited)
+PROMPT_GROUP_A_SHARE = 0.7         # Matches the 70/30 split in the system instruction
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Function to score documents against a keyword query with BM25
+def bm25_scores(documents, query):
+    doc_terms = [_relevance_terms(doc) for doc in documents]
+    if not doc_terms:
+        return []
+    avgdl = sum(len(terms) for terms in doc_terms) / len(doc_terms) or 1
+    df = Counter()
+    for terms in doc_terms:
+        df.update(set(terms))
+    query_terms = set(_relevance_terms(query))
+
+    scores = []
+    for terms in doc_terms:
+        tf = Counter(terms)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / avgdl)
+        score = 0.0
+        for term in query_terms:
+            freq = tf.get(term)
+            if freq:
+                idf = math.log(1 + (len(doc_terms) - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * freq * (BM25_K1 + 1) / (freq + norm)
+        scores.append(score)
+    return scores
+
+# Function to keep the most relevant news items that fit a token budget
+def select_news_within_budget(news_items, token_budget):
+    """Rank items by BM25 against their group's keywords and fill the budget greedily.
+
+    Stories carried by several outlets get a boost. Returns (kept, dropped, tokens_used);
+    kept items are in ranked order.
+    """
+    query = " ".join(sorted({news.get('keyword', '') for news in news_items}))
+    scores = bm25_scores([f"{news['title']} {news['snippet']}" for news in news_items], query)
+    ranked = sorted(
+        range(len(news_items)),
+        key=lambda i: -scores[i] * (1 + math.log(news_items[i].get('source_count', 1)))
+    )
+
+    kept, dropped, used = [], [], 0
+    for i in ranked:
+        cost = estimate_tokens(format_news_item(news_items[i]))
+        if token_budget is None or used + cost <= token_budget:
+            kept.append(news_items[i])
+            used += cost
+        else:
+            dropped.append(news_items[i])
+    return kept, dropped, used
+
+# Function to split the news token budget 70/30 between the groups
+def apply_prompt_budget(group_a_news, group_b_news, token_budget=PROMPT_NEWS_TOKEN_BUDGET):
+    """Return (group_a_kept, group_b_kept, report) where report lists what was dropped"""
+    budget_a = budget_b = None
+    if token_budget:
+        budget_a = int(token_budget * PROMPT_GROUP_A_SHARE)
+        budget_b = token_budget - budget_a
+
+    report = {'token_budget': token_budget}
+    kept_groups = []
+    for name, news_items, budget in (('group_a', group_a_news, budget_a), ('group_b', group_b_news, budget_b)):
+        kept, dropped, used = select_news_within_budget(news_items, budget)
+        kept_groups.append(kept)
+        report[name] = {
+            'budget': budget,
+            'tokens': used,
+            'kept': len(kept),
+            'dropped': [{'title': news['title'], 'url': news['url']} for news in dropped]
+        }
+    return kept_groups[0], kept_groups[1], report
+
+# Gemini response cache settings
+RESPONSE_CACHE_TTL = 7 * 24 * 60 * 60          # Seconds a cached response stays valid
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024     # Compressed size cap before LRU eviction
+
+# Disk-backed memoization of Gemini responses
+class ResponseCache:
+    """SQLite cache keyed by SHA-256 of (model name, prompt, generation config)"""
+    def __init__(self, path, ttl=RESPONSE_CACHE_TTL, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, last_access REAL NOT NULL, "
+                "size INTEGER NOT NULL, response BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_access ON response_cache(last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def key(model_name, prompt, generation_config=None):
+        payload = json.dumps([model_name, prompt, generation_config or {}], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        row = None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT created_at, response FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and time.time() - row[0] < self.ttl:
+                    conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+                else:
+                    row = None
+        except sqlite3.Error:
+            row = None
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return zlib.decompress(row[1]).decode('utf-8') if row else None
+
+    def put(self, key, response):
+        blob = zlib.compress(response.encode('utf-8'), 6)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, created_at, last_access, size, response) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, now, now, len(blob), blob)
+                )
+                conn.execute("DELETE FROM response_cache WHERE created_at < ?", (now - self.ttl,))
+                _evict_to_size(conn, 'response_cache', 'key', 'last_access', self.max_bytes)
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM response_cache")
+
+    def stats(self):
+        try:
+            with self._connect() as conn:
+                entries, size = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+                ).fetchone()
+        except sqlite3.Error:
+            entries, size = 0, 0
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+@functools.lru_cache(maxsize=None)
+def get_response_cache():
+    return ResponseCache(RESPONSE_CACHE_FILE)
+
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+
+# Long-lived Gemini model objects
+class GeminiModels:
+    """Keep one model per (API key, model name), each bound to its own client.
+
+    A GenerativeModel keeps the gRPC client it is given, so reusing the object
+    reuses its open connection. genai.configure() is process-global and the
+    SDK binds a model to the default client lazily, so two sessions with
+    different keys could end up sending requests under each other's key;
+    instead every model gets a client built for its own key up front.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self.created = 0
+        self.reused = 0
+
+    def get(self, api_key, model_name=GEMINI_MODEL_NAME):
+        import google.generativeai as genai
+        from google.generativeai.client import _ClientManager
+        with self._lock:
+            model = self._models.get((api_key, model_name))
+            if model is None:
+                clients = _ClientManager()
+                clients.configure(api_key=api_key)
+                model = genai.GenerativeModel(model_name)
+                model._client = clients.make_client('generative')
+                self._models[(api_key, model_name)] = model
+                self.created += 1
+            else:
+                self.reused += 1
+            return model
+
+    def stats(self):
+        with self._lock:
+            return {'created': self.created, 'reused': self.reused, 'models': len(self._models)}
+
+@functools.lru_cache(maxsize=None)
+def get_gemini_models():
+    return GeminiModels()
+
+# Function to report how often long-lived API clients were reused
+def get_client_stats():
+    return {'gemini': get_gemini_models().stats(), 'ddgs': get_ddgs_pool().stats()}
+
+# Function to run a Gemini prompt, optionally streaming into a placeholder
+def generate_text(model, prompt, stream_placeholder=None, generation_config=None, refresh=False):
+    """Return the full response text.
+
+    Responses are memoized on disk by (model, prompt, generation config);
+    refresh=True skips the lookup and overwrites the cached entry. With a
+    Streamlit placeholder, the response is requested with stream=True and
+    each chunk is rendered as it arrives, so text shows up at the first token.
+    """
+    cache = get_response_cache()
+    model_name = getattr(model, 'model_name', type(model).__name__)
+    key = ResponseCache.key(model_name, prompt, generation_config)
+    with metrics.span('gemini.generate', model=model_name, prompt_chars=len(prompt)) as fields:
+        if not refresh:
+            cached = cache.get(key)
+            if cached is not None:
+                fields['cached'] = True
+                if stream_placeholder is not None:
+                    stream_placeholder.markdown(cached)
+                return cached
+
+        started = time.perf_counter()
+        options = {'generation_config': generation_config} if generation_config else {}
+        if stream_placeholder is None:
+            response = model.generate_content(prompt, **options)
+            report = response.text
+        else:
+            parts = []
+            response = None
+            for chunk in model.generate_content(prompt, stream=True, **options):
+                response = chunk   # The last chunk carries the final usage metadata
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. finish/safety metadata)
+                    continue
+                if text:
+                    if not parts:
+                        fields['first_token_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                    parts.append(text)
+                    stream_placeholder.markdown("".join(parts) + " ▌")
+            report = "".join(parts)
+            stream_placeholder.markdown(report)
+
+        usage = getattr(response, 'usage_metadata', None)
+        fields.update(
+            output_chars=len(report or ""),
+            prompt_tokens=getattr(usage, 'prompt_token_count', None) or estimate_tokens(prompt),
+            output_tokens=getattr(usage, 'candidates_token_count', None) or estimate_tokens(report or ""),
+            tokens_estimated=usage is None
+        )
+
+        if report:
+            cache.put(key, report)
+        return report
+
+# Function to format one news item for the prompt
+def format_news_item(news):
+    text = f"제목: {news['title']}\n내용: {news['snippet']}\n출처: {news['url']}"
+    if news.get('content'):
+        text += f"\n본문 발췌: {news['content'][:ARTICLE_PROMPT_CHARS]}"
+    if news.get('source_count', 1) > 1:
+        text += f" (외 {news['source_count'] - 1}개 매체 동일 보도)"
+    return text
+
+# Query parameters that only track the click and never change the article
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', 'ref_src', 'cmpid'}
+
+# Function to canonicalize an article URL for the seen-article index
+def canonicalize_url(url):
+    """Normalize scheme/host, drop tracking params, fragments and trailing slashes"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'm.', 'mobile.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit(('https', host, path, query, ''))
+
+# Persistent index of articles already sent to generate_ai_report
+class SeenArticleIndex:
+    """SQLite set of canonical article URLs with the time they were first analysed"""
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_articles ("
+                "url TEXT PRIMARY KEY, first_seen TEXT NOT NULL) WITHOUT ROWID"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def seen(self, urls):
+        """Return the subset of canonical URLs already in the index"""
+        urls = list(urls)
+        found = set()
+        with self._connect() as conn:
+            for i in range(0, len(urls), 500):
+                batch = urls[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(row[0] for row in conn.execute(
+                    f"SELECT url FROM seen_articles WHERE url IN ({placeholders})", batch
+                ))
+        return found
+
+    def add(self, urls):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_articles (url, first_seen) VALUES (?, ?)",
+                [(url, now) for url in urls]
+            )
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM seen_articles").fetchone()[0]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM seen_articles")
+
+@functools.lru_cache(maxsize=None)
+def get_seen_index():
+    return SeenArticleIndex(SEEN_INDEX_FILE)
+
+def _article_urls(news):
+    """Canonical URLs of a news item, including merged duplicates"""
+    return {canonicalize_url(u) for u in [news['url']] + news.get('duplicate_urls', [])}
+
+# Function to keep only articles not analysed before
+def filter_new_articles(news_items, seen_index):
+    candidates = [(news, _article_urls(news)) for news in news_items]
+    seen = seen_index.seen(set().union(*[urls for _, urls in candidates]))
+    return [news for news, urls in candidates if not urls & seen]
+
+# Function to point the model at the last weekly report in incremental mode
+def get_previous_report_pointer():
+    item = get_history_store().latest("주간 뉴스 분석")
+    if item:
+        return (
+            f"이전 주간 리포트({item['timestamp']}) 이후 새로 보도된 기사만 제공됩니다.\n"
+            f"이전 리포트 요약: {item['summary'][:300]}..."
+        )
+    return "이전 주간 리포트가 없습니다. 제공된 기사 전체를 분석해주세요."
+
+# Full-article fetch settings
+ARTICLE_CACHE_TTL = 14 * 24 * 60 * 60         # Seconds a fetched article body stays valid
+ARTICLE_CACHE_MAX_BYTES = 50 * 1024 * 1024    # Compressed size cap before LRU eviction
+ARTICLE_TEXT_MAX_CHARS = 6000                 # Extracted body kept per article
+ARTICLE_PROMPT_CHARS = 1200                   # Body excerpt sent to Gemini per article
+
+# Cache of extracted article bodies
+class ArticleTextCache:
+    """SQLite store of zlib-compressed article text keyed by canonical URL"""
+    def __init__(self, path, ttl=ARTICLE_CACHE_TTL, max_bytes=ARTICLE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS article_text ("
+                "url TEXT PRIMARY KEY, fetched_at REAL NOT NULL, last_access REAL NOT NULL, "
+                "size INTEGER NOT NULL, text BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_article_text_access ON article_text(last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get_many(self, urls):
+        """Return {canonical_url: text} for fresh entries"""
+        urls = list(urls)
+        found = {}
+        try:
+            with self._connect() as conn:
+                for start in range(0, len(urls), 500):
+                    batch = urls[start:start + 500]
+                    rows = conn.execute(
+                        f"SELECT url, text FROM article_text WHERE fetched_at >= ? AND url IN ({','.join('?' * len(batch))})",
+                        [time.time() - self.ttl] + batch
+                    ).fetchall()
+                    for url, blob in rows:
+                        found[url] = zlib.decompress(blob).decode('utf-8')
+                if found:
+                    now = time.time()
+                    conn.executemany("UPDATE article_text SET last_access = ? WHERE url = ?", [(now, url) for url in found])
+        except (sqlite3.Error, zlib.error):
+            pass
+        return found
+
+    def put_many(self, texts):
+        now = time.time()
+        rows = []
+        for url, text in texts.items():
+            blob = zlib.compress(text.encode('utf-8'), 6)
+            rows.append((url, now, now, len(blob), blob))
+        if not rows:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO article_text (url, fetched_at, last_access, size, text) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("DELETE FROM article_text WHERE fetched_at < ?", (now - self.ttl,))
+                _evict_to_size(conn, 'article_text', 'url', 'last_access', self.max_bytes)
+        except sqlite3.Error:
+            pass
+
+@functools.lru_cache(maxsize=None)
+def get_article_cache():
+    return ArticleTextCache(ARTICLE_CACHE_FILE)
+
+# Function to add full article text to news items
+def fetch_article_bodies(news_items, deadline=None):
+    """Return copies of news_items with 'content' set where the page could be read.
+
+    Bodies are looked up by canonical URL first; the rest are fetched
+    concurrently (per-host limits, byte cap, timeouts) and cached. Pages not
+    read within deadline seconds keep just their search snippet.
+    """
+    import article_fetch
+
+    by_url = {canonicalize_url(news['url']): news['url'] for news in news_items if news.get('url')}
+    cache = get_article_cache()
+    with metrics.span('article.fetch', articles=len(by_url)) as fields:
+        texts = cache.get_many(by_url)
+        missing = [url for url in by_url if url not in texts]
+        pages = []
+        fetched = article_fetch.fetch_articles(
+            [by_url[url] for url in missing],
+            deadline=deadline or article_fetch.FETCH_DEADLINE,
+            max_chars=ARTICLE_TEXT_MAX_CHARS,
+            on_page=lambda url, outcome: pages.append(outcome)
+        )
+        fetched = {canonicalize_url(url): text for url, text in fetched.items()}
+        cache.put_many(fetched)
+        texts.update(fetched)
+        fields.update(
+            cached=len(by_url) - len(missing),
+            fetched=len(fetched),
+            failed=sum(1 for outcome in pages if outcome['error']),
+            skipped=len(missing) - len(pages),
+            bytes=sum(outcome['bytes'] for outcome in pages)
+        )
+
+    enriched = []
+    for news in news_items:
+        text = texts.get(canonicalize_url(news['url'])) if news.get('url') else None
+        enriched.append({**news, 'content': text} if text else news)
+    return enriched
+
+# Section-parallel report settings
+REPORT_SECTION_WORKERS = 3
+
+# Draft sections written concurrently, each from its own news subset:
+# (number, heading, topic, what the section covers)
+DRAFT_SECTIONS = [
+    ('1.1', '건설 로봇 현장 적용 분석', 'construction', [
+        "현재 기술 수준과 실제 적용 사례 분석",
+        "주요 기술적 과제와 해결 방향",
+        "시장 성장 가능성 평가"
+    ]),
+    ('1.2', '휴머노이드 로봇 기술 진척', 'humanoid', [
+        "제어 기술의 최신 동향 (보행, 균형, 조작)",
+        "AI 통합 현황 (비전, 자율성, 학습)",
+        "하드웨어 혁신 (액추에이터, 센서, 배터리)"
+    ]),
+    ('2', '🤖 기타 로봇 산업 동향 (30%)', 'other', [
+        "협동로봇, 물류로봇, AMR 등의 주요 트렌드",
+        "시장 성장 동력과 제약 요인"
+    ])
+]
+
+# Sections the synthesis pass writes from the drafts
+SYNTHESIS_SECTIONS = [
+    ('1.3', '융합 시나리오 분석', [
+        "휴머노이드의 건설 현장 투입 가능성",
+        "기술적 요구사항과 현재 격차",
+        "예상 타임라인과 선도 기업"
+    ]),
+    ('1.4', '주요 기업 및 프로젝트 평가', [
+        "핵심 플레이어 분석 (테슬라, 보스턴다이내믹스, Figure AI 등)",
+        "투자 동향과 전략적 방향"
+    ]),
+    ('3', '💡 AI 전망 및 투자 인사이트', [
+        "**단기 전망 (6개월~1년)**: 예상되는 주요 이벤트와 기술 발표",
+        "**중기 전망 (1~3년)**: 시장 구조 변화와 기술 성숙도",
+        "**장기 전망 (3~5년)**: 산업 패러다임 전환 가능성",
+        "**투자 관점**: 주목해야 할 기업, 기술, 시장 세그먼트",
+        "**리스크 요인**: 기술적/규제적/시장 리스크"
+    ])
+]
+
+# Every section in report order: number -> (heading, news topics it draws on, points)
+REPORT_SECTIONS = {
+    '1.1': (DRAFT_SECTIONS[0][1], ('construction',), DRAFT_SECTIONS[0][3]),
+    '1.2': (DRAFT_SECTIONS[1][1], ('humanoid',), DRAFT_SECTIONS[1][3]),
+    '1.3': (SYNTHESIS_SECTIONS[0][1], ('construction', 'humanoid'), SYNTHESIS_SECTIONS[0][2]),
+    '1.4': (SYNTHESIS_SECTIONS[1][1], ('construction', 'humanoid'), SYNTHESIS_SECTIONS[1][2]),
+    '2': (DRAFT_SECTIONS[2][1], ('other',), DRAFT_SECTIONS[2][3]),
+    '3': (SYNTHESIS_SECTIONS[2][1], ('construction', 'humanoid', 'other'), SYNTHESIS_SECTIONS[2][2])
+}
+
+REPORT_STYLE = """**작성 스타일:**
+- 전문적이고 분석적인 톤
+- 구체적인 수치와 사례 인용
+- 명확한 근거를 바탕으로 한 전망
+- 불확실성이 있는 부분은 솔직하게 언급
+- 뉴스를 나열하지 말고, 트렌드를 파악하고 너의 분석을 제시해"""
+
+def _section_heading(number, title):
+    return f"## {number}. {title}" if '.' not in number else f"### {number} {title}"
+
+# Function to split news into the draft sections' subsets
+def _section_news(group_a_news, group_b_news):
+    subsets = {'construction': [], 'humanoid': [], 'other': list(group_b_news)}
+    for news in group_a_news:
+        topic = news.get('topic')
+        if topic not in ('construction', 'humanoid'):
+            # Untagged items (e.g. older history) go by keyword
+            keyword = news.get('keyword', '').lower()
+            topic = 'humanoid' if '휴머노이드' in keyword or 'humanoid' in keyword else 'construction'
+        subsets[topic].append(news)
+    return subsets
+
+def _draft_section_prompt(number, title, points, news_items, context, related=None):
+    """related maps other section numbers to their current text, given as background"""
+    news_text = "\n\n".join(format_news_item(news) for news in news_items) or "(이번 주 관련 뉴스 없음)"
+    guide = "\n".join(f"- {point}" for point in points)
+    related_text = ""
+    if related:
+        related_text = "\n[리포트의 다른 섹션 (참고용, 반복하지 말 것)]\n" + "\n\n".join(
+            f"{_section_heading(other, REPORT_SECTIONS[other][0])}\n{related[other]}"
+            for other in REPORT_SECTIONS if related.get(other)
+        ) + "\n"
+    return f"""
+너는 로봇 산업 전문 애널리스트야. 주간 로봇 산업 분석 리포트 중 '{number} {title}' 섹션만 작성해.
+{context}
+**섹션에서 다룰 내용:**
+{guide}
+
+{REPORT_STYLE}
+- 섹션 제목은 쓰지 말고 본문만 작성 (필요하면 #### 소제목만 사용)
+{related_text}
+[관련 뉴스]
+{news_text}
+
+현재 날짜: {datetime.now().strftime('%Y년 %m월 %d일')}
+분석 기간: 최근 1주일
+"""
+
+def _synthesis_prompt(drafts, context):
+    draft_text = "\n\n".join(f"{_section_heading(number, title)}\n{drafts[number]}" for number, title, _, _ in DRAFT_SECTIONS)
+    guide = "\n\n".join(
+        f"{_section_heading(number, title)}\n" + "\n".join(f"- {point}" for point in points)
+        for number, title, points in SYNTHESIS_SECTIONS
+    )
+    return f"""
+너는 로봇 산업 전문 애널리스트야. 아래는 이번 주 리포트의 섹션 초안이야. 초안을 종합해 나머지 섹션을 작성해.
+{context}
+**작성할 섹션 (아래 제목을 그대로 사용하고 이 순서로만 작성):**
+
+{guide}
+
+{REPORT_STYLE}
+- 건설 로봇과 휴머노이드의 융합 가능성을 적극적으로 분석
+- 초안 내용을 반복하지 말고 연결하고 종합해
+
+[섹션 초안]
+{draft_text}
+
+현재 날짜: {datetime.now().strftime('%Y년 %m월 %d일')}
+"""
+
+# Function to cut the synthesis output at the expected section headings
+def _split_synthesis(text):
+    numbers = [number for number, _, _ in SYNTHESIS_SECTIONS]
+    pattern = re.compile(r'^#{2,4}\s*(' + '|'.join(re.escape(n) for n in numbers) + r')\.?\s', re.M)
+    starts = [(m.start(), m.end(), m.group(1)) for m in pattern.finditer(text)]
+    sections = {}
+    for i, (start, body_start, number) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        body = text[body_start:end]
+        sections.setdefault(number, body.split('\n', 1)[1].strip() if '\n' in body else "")
+    return sections
+
+# Function to assemble the full report from section bodies
+def assemble_report(sections):
+    """sections maps section number ('1.1' .. '3') to markdown body"""
+    parts = ["## 1. 🏗️ 건설 로봇 & 휴머노이드 심층 분석 (70%)"]
+    for number, (title, _, _) in REPORT_SECTIONS.items():
+        if sections.get(number):
+            parts.append(f"{_section_heading(number, title)}\n\n{sections[number]}")
+    return "\n\n".join(parts)
+
+# Placeholder wrapper that renders finished sections above a streaming one
+class _PrefixedPlaceholder:
+    def __init__(self, placeholder, prefix):
+        self.placeholder = placeholder
+        self.prefix = prefix
+
+    def markdown(self, text):
+        self.placeholder.markdown(self.prefix + text)
+
+# Function to write the sections as concurrent drafts plus one synthesis call
+def generate_parallel_sections(group_a_news, group_b_news, model, context="", stream_placeholder=None, refresh=False):
+    """Return {number: markdown} for sections 1.1-1.4, 2 and 3.
+
+    1.1 (construction), 1.2 (humanoid) and 2 (Group B) are drafted in parallel
+    from their own news, then 1.3, 1.4 and 3 are written from the drafts in
+    one short call. Latency is the slowest draft plus the synthesis rather
+    than the sum.
+    """
+    prompt_started = time.perf_counter()
+    subsets = _section_news(group_a_news, group_b_news)
+    prompts = {
+        number: _draft_section_prompt(number, title, points, subsets[topic], context)
+        for number, title, topic, points in DRAFT_SECTIONS
+    }
+    metrics.record(
+        'prompt.build', prompt_started,
+        stage='drafts',
+        articles=len(group_a_news) + len(group_b_news),
+        prompt_chars=sum(len(prompt) for prompt in prompts.values()),
+        estimated_tokens=sum(estimate_tokens(prompt) for prompt in prompts.values())
+    )
+    drafts = {}
+    with ThreadPoolExecutor(max_workers=REPORT_SECTION_WORKERS) as executor:
+        futures = {
+            number: executor.submit(metrics.bind(generate_text), model, prompt, refresh=refresh)
+            for number, prompt in prompts.items()
+        }
+        for number, future in futures.items():
+            drafts[number] = future.result()
+            if stream_placeholder is not None:
+                stream_placeholder.markdown(assemble_report(drafts))
+
+    synthesis_placeholder = None
+    if stream_placeholder is not None:
+        synthesis_placeholder = _PrefixedPlaceholder(stream_placeholder, assemble_report(drafts) + "\n\n")
+    prompt_started = time.perf_counter()
+    synthesis_prompt = _synthesis_prompt(drafts, context)
+    metrics.record(
+        'prompt.build', prompt_started,
+        stage='synthesis',
+        prompt_chars=len(synthesis_prompt),
+        estimated_tokens=estimate_tokens(synthesis_prompt)
+    )
+    synthesis = generate_text(model, synthesis_prompt, synthesis_placeholder, refresh=refresh)
+    sections = dict(drafts)
+    synthesized = _split_synthesis(synthesis or "")
+    if synthesized:
+        sections.update(synthesized)
+    elif synthesis:
+        # Headings not as requested: keep the text rather than drop it
+        sections['3'] = synthesis
+    return sections
+
+# Gemini JSON mode: the response body is a single JSON value
+STRUCTURED_GENERATION_CONFIG = {'response_mime_type': 'application/json'}
+
+_SECTION_KEY_RE = re.compile(r'^\s*(\d(?:\.\d)?)')
+_JSON_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+def _structured_report_prompt(group_a_news, group_b_news, context):
+    guide = "\n\n".join(
+        f'"{number}": {title}\n' + "\n".join(f"- {point}" for point in points)
+        for number, (title, _, points) in REPORT_SECTIONS.items()
+    )
+    group_a_text = "\n\n".join(format_news_item(news) for news in group_a_news)
+    group_b_text = "\n\n".join(format_news_item(news) for news in group_b_news)
+    return f"""
+너는 로봇 산업 전문 애널리스트야. 제공된 뉴스를 단순히 요약하지 말고, 너의 전문적인 분석과 인사이트를 제공해야 해.
+{context}
+**핵심 지침:**
+1. 전체 리포트의 **70%**는 '건설 로봇의 현장 적용'과 '휴머노이드의 기술 진척(제어, AI, 하드웨어)'에 집중 (1.1 ~ 1.4)
+2. 두 분야의 융합 가능성(예: 휴머노이드의 건설 현장 투입)을 적극적으로 분석
+3. 나머지 30%는 기타 로봇 시장 동향 (2)
+4. 이전 분석이 있다면, 트렌드 변화와 연속성을 분석해
+
+**출력 형식:** 아래 섹션 번호를 키로, 각 섹션 본문(마크다운 문자열)을 값으로 하는 JSON 객체 하나만 출력해.
+예: {{"1.1": "...", "1.2": "...", "1.3": "...", "1.4": "...", "2": "...", "3": "..."}}
+- 본문에 섹션 제목은 쓰지 마 (필요하면 #### 소제목만 사용)
+
+**섹션별 내용:**
+
+{guide}
+
+{REPORT_STYLE}
+
+[그룹 A - 건설 로봇 & 휴머노이드 뉴스 (핵심)]
+{group_a_text}
+
+[그룹 B - 기타 로봇 뉴스]
+{group_b_text}
+
+현재 날짜: {datetime.now().strftime('%Y년 %m월 %d일')}
+분석 기간: 최근 1주일
+"""
+
+# Function to read section bodies from a JSON-mode response
+def parse_report_sections(text):
+    """Return {number: markdown} for the known sections, or None if text is not
+    a JSON object with at least one of them. Keys like "1.1 건설 로봇" are accepted.
+    """
+    try:
+        data = json.loads(_JSON_FENCE_RE.sub('', text or ''))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    sections = {}
+    for key, body in data.items():
+        match = _SECTION_KEY_RE.match(str(key))
+        if match and match.group(1) in REPORT_SECTIONS and isinstance(body, str) and body.strip():
+            sections.setdefault(match.group(1), _strip_section_heading(match.group(1), body))
+    return sections or None
+
+def _strip_section_heading(number, body):
+    # Models sometimes repeat the heading despite the instruction
+    return re.sub(r'^\s*#{1,4}\s*' + re.escape(number) + r'\.?\s[^\n]*\n', '', body.strip()).strip()
+
+# Function to write the whole report in one JSON-mode call
+def generate_structured_sections(group_a_news, group_b_news, model, context="", stream_placeholder=None, refresh=False):
+    """Return {number: markdown} for sections 1.1-1.4, 2 and 3, or None if the
+    response could not be parsed. JSON is not worth streaming, so the
+    placeholder only shows a waiting message until the sections are in.
+    """
+    prompt_started = time.perf_counter()
+    prompt = _structured_report_prompt(group_a_news, group_b_news, context)
+    metrics.record(
+        'prompt.build', prompt_started,
+        articles=len(group_a_news) + len(group_b_news),
+        prompt_chars=len(prompt),
+        estimated_tokens=estimate_tokens(prompt)
+    )
+    if stream_placeholder is not None:
+        stream_placeholder.markdown("섹션별 리포트 작성 중...")
+    text = generate_text(model, prompt, generation_config=STRUCTURED_GENERATION_CONFIG, refresh=refresh)
+    sections = parse_report_sections(text)
+    if stream_placeholder is not None:
+        stream_placeholder.markdown(assemble_report(sections) if sections else "")
+    return sections
+
+REPORT_SECTION_STORE_FILE = os.path.join(os.path.dirname(__file__), '.report_sections.sqlite3')
+REPORT_SECTION_STORE_LIMIT = 50   # Reports kept for section regeneration; older ones are dropped
+
+# Per-section storage of generated reports
+class ReportSectionStore:
+    """SQLite store of each report's sections plus the news and context they were
+    written from, so one section can be rewritten without rerunning the rest.
+    """
+    def __init__(self, path, limit=REPORT_SECTION_STORE_LIMIT):
+        self.path = path
+        self.limit = limit
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS section_reports ("
+                "id TEXT PRIMARY KEY, created_at REAL NOT NULL, context TEXT NOT NULL, news BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS report_sections ("
+                "report_id TEXT NOT NULL, number TEXT NOT NULL, body TEXT NOT NULL, "
+                "revision INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (report_id, number))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def create(self, news_subsets, context, sections):
+        """Store a new report; news_subsets maps topic to its news items. Returns the id."""
+        report_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        news = zlib.compress(json.dumps(news_subsets, ensure_ascii=False, default=str).encode('utf-8'), 6)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO section_reports (id, created_at, context, news) VALUES (?, ?, ?, ?)",
+                    (report_id, now, context, news)
+                )
+                conn.executemany(
+                    "INSERT INTO report_sections (report_id, number, body, updated_at) VALUES (?, ?, ?, ?)",
+                    [(report_id, number, body, now) for number, body in sections.items()]
+                )
+                stale = [row[0] for row in conn.execute(
+                    "SELECT id FROM section_reports ORDER BY created_at DESC LIMIT -1 OFFSET ?", (self.limit,)
+                )]
+                for stale_id in stale:
+                    conn.execute("DELETE FROM report_sections WHERE report_id = ?", (stale_id,))
+                    conn.execute("DELETE FROM section_reports WHERE id = ?", (stale_id,))
+        except sqlite3.Error:
+            return None
+        return report_id
+
+    def get(self, report_id):
+        """Return {'id', 'context', 'news', 'sections', 'revisions'} or None"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT context, news FROM section_reports WHERE id = ?", (report_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                sections = conn.execute(
+                    "SELECT number, body, revision FROM report_sections WHERE report_id = ?", (report_id,)
+                ).fetchall()
+            news = json.loads(zlib.decompress(row[1]).decode('utf-8'))
+        except (sqlite3.Error, zlib.error, ValueError):
+            return None
+        return {
+            'id': report_id,
+            'context': row[0],
+            'news': news,
+            'sections': {number: body for number, body, _ in sections},
+            'revisions': {number: revision for number, _, revision in sections}
+        }
+
+    def put_section(self, report_id, number, body):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO report_sections (report_id, number, body, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (report_id, number) DO UPDATE SET "
+                    "body = excluded.body, revision = revision + 1, updated_at = excluded.updated_at",
+                    (report_id, number, body, time.time())
+                )
+            return True
+        except sqlite3.Error:
+            return False
+
+@functools.lru_cache(maxsize=None)
+def get_report_section_store():
+    return ReportSectionStore(REPORT_SECTION_STORE_FILE)
+
+# Function to rewrite one section of a stored report
+def regenerate_report_section(report_id, number, api_key, stream_placeholder=None):
+    """Re-prompt only section number with the news it draws on and the other
+    sections as background, store the result and return the updated
+    {number: markdown} for the whole report (None if it failed).
+    The cached response is bypassed so each request yields a fresh take.
+    """
+    try:
+        store = get_report_section_store()
+        record = store.get(report_id)
+        if record is None:
+            notify('error', "섹션 정보를 찾을 수 없습니다. 리포트를 다시 생성해주세요.")
+            return None
+        title, topics, points = REPORT_SECTIONS[number]
+        news_items = [news for topic in topics for news in record['news'].get(topic, [])]
+        related = {other: body for other, body in record['sections'].items() if other != number}
+        prompt = _draft_section_prompt(number, title, points, news_items, record['context'], related=related)
+        with metrics.span('report.section', section=number, articles=len(news_items)):
+            body = generate_text(get_gemini_models().get(api_key), prompt, stream_placeholder, refresh=True)
+        body = _strip_section_heading(number, body or "")
+        if not body:
+            notify('error', f"{number} 섹션 생성 결과가 비어 있습니다.")
+            return None
+        store.put_section(report_id, number, body)
+        return {**record['sections'], number: body}
+    except Exception as e:
+        notify('error', f"섹션 재생성 실패: {str(e)}")
+        return None
+
+# Function to record a finished news report in history and the seen-article index
+def _remember_news_report(report, news_items):
+    save_to_history("주간 뉴스 분석", report)
+    get_seen_index().add(set().union(*[_article_urls(news) for news in news_items]))
+
+# Function to generate AI report using Gemini
+def generate_ai_report(group_a_news, group_b_news, api_key, use_history=False, selected_ids=None, incremental=False, stream_placeholder=None, token_budget=PROMPT_NEWS_TOKEN_BUDGET, refresh=False, prompt_report=None, parallel_sections=False, structured_sections=False, report_sections=None):
+    """Generate analysis report using Gemini AI.
+
+    In incremental mode only articles missing from the seen-article index are
+    sent, together with a short pointer to the previous weekly report. News
+    items are ranked by relevance and trimmed to token_budget (70/30 between
+    groups); if prompt_report is a dict it receives the trimming report.
+    History context is retrieved by relevance to the news that made the cut.
+    refresh=True bypasses the Gemini response cache.
+
+    parallel_sections=True writes the sections with generate_parallel_sections
+    and structured_sections=True with one JSON-mode call
+    (generate_structured_sections); either way the report is assembled from
+    the sections, which are saved with their news and context in the
+    ReportSectionStore so regenerate_report_section can rewrite one of them
+    later. report_sections (if a dict) receives {'id', 'sections'}.
+    """
+    try:
+        prompt_started = time.perf_counter()
+        seen_index = get_seen_index()
+        incremental_context = ""
+        if incremental:
+            group_a_news = filter_new_articles(group_a_news, seen_index)
+            group_b_news = filter_new_articles(group_b_news, seen_index)
+            if not group_a_news and not group_b_news:
+                notify('info', "이전 분석 이후 새로운 기사가 없습니다.")
+                return None
+            incremental_context = (
+                f"\n**증분 분석:** 이전 리포트 대비 새로운 변화와 움직임에 집중해.\n"
+                f"{get_previous_report_pointer()}\n"
+            )
+        
+        # Prepare news data within the token budget
+        group_a_news, group_b_news, budget_report = apply_prompt_budget(group_a_news, group_b_news, token_budget)
+        if prompt_report is not None:
+            prompt_report.update(budget_report)
+        
+        # Get history relevant to this week's news if requested
+        history_context = ""
+        if use_history:
+            news_query = "\n".join(f"{news['title']} {news['snippet']}" for news in group_a_news + group_b_news)
+            history_context = f"\n\n**이전 분석 참고:**\n{get_relevant_history(news_query, selected_ids)}\n"
+        
+        if parallel_sections or structured_sections:
+            context = history_context + incremental_context
+            model = get_gemini_models().get(api_key)
+            if parallel_sections:
+                sections = generate_parallel_sections(group_a_news, group_b_news, model, context, stream_placeholder, refresh)
+            else:
+                sections = generate_structured_sections(group_a_news, group_b_news, model, context, stream_placeholder, refresh)
+            if sections:
+                report = assemble_report(sections)
+                report_id = get_report_section_store().create(_section_news(group_a_news, group_b_news), context, sections)
+                if report_sections is not None and report_id:
+                    report_sections.update(id=report_id, sections=sections)
+                _remember_news_report(report, group_a_news + group_b_news)
+                return report
+            if parallel_sections:
+                return None
+            notify('warning', "섹션별 응답을 해석하지 못해 한 번에 작성하는 방식으로 다시 생성합니다.")
+        
+        # System instruction
+        system_instruction = f"""
+너는 로봇 산업 전문 애널리스트야. 제공된 뉴스를 단순히 요약하지 말고, 너의 전문적인 분석과 인사이트를 제공해야 해.
+{history_context}{incremental_context}
+**핵심 지침:**
+1. 전체 리포트의 **70%**는 '건설 로봇의 현장 적용'과 '휴머노이드의 기술 진척(제어, AI, 하드웨어)'에 집중
+2. 두 분야의 융합 가능성(예: 휴머노이드의 건설 현장 투입)을 적극적으로 분석
+3. 나머지 30%는 기타 로봇 시장 동향
+4. **중요**: 뉴스를 나열하지 말고, 트렌드를 파악하고 너의 분석을 제시해
+5. 이전 분석이 있다면, 트렌드 변화와 연속성을 분석해
+
+**리포트 구조:**
+
+## 1. 🏗️ 건설 로봇 & 휴머노이드 심층 분석 (70%)
+
+### 1.1 건설 로봇 현장 적용 분석
+- 현재 기술 수준과 실제 적용 사례 분석
+- 주요 기술적 과제와 해결 방향
+- 시장 성장 가능성 평가
+
+### 1.2 휴머노이드 로봇 기술 진척
+- 제어 기술의 최신 동향 (보행, 균형, 조작)
+- AI 통합 현황 (비전, 자율성, 학습)
+- 하드웨어 혁신 (액추에이터, 센서, 배터리)
+
+### 1.3 융합 시나리오 분석
+- 휴머노이드의 건설 현장 투입 가능성
+- 기술적 요구사항과 현재 격차
+- 예상 타임라인과 선도 기업
+
+### 1.4 주요 기업 및 프로젝트 평가
+- 핵심 플레이어 분석 (테슬라, 보스턴다이내믹스, Figure AI 등)
+- 투자 동향과 전략적 방향
+
+## 2. 🤖 기타 로봇 산업 동향 (30%)
+- 협동로봇, 물류로봇, AMR 등의 주요 트렌드
+- 시장 성장 동력과 제약 요인
+
+## 3. 💡 AI 전망 및 투자 인사이트
+- **단기 전망 (6개월~1년)**: 예상되는 주요 이벤트와 기술 발표
+- **중기 전망 (1~3년)**: 시장 구조 변화와 기술 성숙도
+- **장기 전망 (3~5년)**: 산업 패러다임 전환 가능성
+- **투자 관점**: 주목해야 할 기업, 기술, 시장 세그먼트
+- **리스크 요인**: 기술적/규제적/시장 리스크
+
+**작성 스타일:**
+- 전문적이고 분석적인 톤
+- 구체적인 수치와 사례 인용
+- 명확한 근거를 바탕으로 한 전망
+- 불확실성이 있는 부분은 솔직하게 언급
+"""
+        
+        group_a_text = "\n\n".join([format_news_item(news) for news in group_a_news])
+        
+        group_b_text = "\n\n".join([format_news_item(news) for news in group_b_news])
+        
+        # Create full prompt
+        full_prompt = f"""{system_instruction}
+
+다음 뉴스 데이터를 바탕으로 주간 로봇 산업 분석 리포트를 작성해주세요.
+
+[그룹 A - 건설 로봇 & 휴머노이드 뉴스 (핵심)]
+{group_a_text}
+
+[그룹 B - 기타 로봇 뉴스]
+{group_b_text}
+
+현재 날짜: {datetime.now().strftime('%Y년 %m월 %d일')}
+분석 기간: 최근 1주일
+"""
+        metrics.record(
+            'prompt.build', prompt_started,
+            articles=len(group_a_news) + len(group_b_news),
+            prompt_chars=len(full_prompt),
+            estimated_tokens=estimate_tokens(full_prompt)
+        )
+        
+        # Use google-generativeai library (same as stock advisor)
+        model = get_gemini_models().get(api_key)
+        report = generate_text(model, full_prompt, stream_placeholder, refresh=refresh)
+        
+        # Save to history and remember which articles were analysed
+        if report:
+            _remember_news_report(report, group_a_news + group_b_news)
+        
+        return report
+        
+    except Exception as e:
+        notify('error', f"AI 리포트 생성 실패: {str(e)}")
+        return None
+
+# Function to run the whole weekly news analysis (search + report)
+def run_news_analysis(keywords, api_key, use_cache=True, hedge_delay=None, merge_duplicates=True,
+                      use_history=False, selected_ids=None, incremental=False,
+                      token_budget=PROMPT_NEWS_TOKEN_BUDGET, refresh=False,
+                      progress_callback=None, stream_placeholder=None, fetch_articles=False,
+                      parallel_sections=False, structured_sections=False):
+    """Search both keyword groups and generate the report.
+
+    Returns {'group_a', 'group_b', 'report', 'prompt_report', 'sections', 'metrics'};
+    report is None when nothing was found or generation failed, sections is
+    {'id', 'sections'} when the report was written per section (else None),
+    metrics is the metrics.Run with every stage's spans.
+    progress_callback(percent, message) covers both stages: search maps to
+    0-60%, the report to 60-100%. fetch_articles=True adds the linked pages'
+    main text before the report; parallel_sections=True drafts the report
+    sections concurrently; structured_sections=True asks for JSON sections.
+    """
+    with metrics.run('news_analysis') as current:
+        outcome = _run_news_analysis(
+            keywords, api_key, use_cache, hedge_delay, merge_duplicates, use_history, selected_ids,
+            incremental, token_budget, refresh, progress_callback, stream_placeholder, fetch_articles,
+            parallel_sections, structured_sections
+        )
+    outcome['metrics'] = current
+    return outcome
+
+def _run_news_analysis(keywords, api_key, use_cache, hedge_delay, merge_duplicates, use_history, selected_ids,
+                       incremental, token_budget, refresh, progress_callback, stream_placeholder, fetch_articles,
+                       parallel_sections, structured_sections):
+    progress = progress_callback or (lambda percent, message: None)
+    search_results = search_keyword_groups(
+        keywords,
+        use_cache=use_cache,
+        hedge_delay=hedge_delay,
+        merge_duplicates=merge_duplicates,
+        progress_callback=lambda percent, message: progress(percent * 60 // 100, message)
+    )
+    group_a_results = search_results['group_a']
+    group_b_results = search_results['group_b']
+    outcome = {'group_a': group_a_results, 'group_b': group_b_results, 'report': None, 'prompt_report': None,
+               'sections': None}
+    if not group_a_results and not group_b_results:
+        return outcome
+
+    if fetch_articles:
+        progress(55, "기사 본문 가져오는 중...")
+        enriched = fetch_article_bodies(group_a_results + group_b_results)
+        group_a_results, group_b_results = enriched[:len(group_a_results)], enriched[len(group_a_results):]
+
+    progress(60, f"AI 분석 중... (그룹 A: {len(group_a_results)}건, 그룹 B: {len(group_b_results)}건)")
+    prompt_report = {}
+    report_sections = {}
+    outcome['report'] = generate_ai_report(
+        group_a_results,
+        group_b_results,
+        api_key,
+        use_history=use_history,
+        selected_ids=selected_ids,
+        incremental=incremental,
+        stream_placeholder=stream_placeholder,
+        token_budget=token_budget,
+        refresh=refresh,
+        prompt_report=prompt_report,
+        parallel_sections=parallel_sections,
+        structured_sections=structured_sections,
+        report_sections=report_sections
+    )
+    outcome['prompt_report'] = prompt_report or None
+    outcome['sections'] = report_sections or None
+    progress(100, "리포트 생성 완료!" if outcome['report'] else "리포트 생성 실패")
+    return outcome
+
+# Function to identify equivalent news analyses for request coalescing
+def news_analysis_key(keywords, use_history=False, selected_ids=None, incremental=False,
+                      token_budget=PROMPT_NEWS_TOKEN_BUDGET, merge_duplicates=True, refresh=False,
+                      fetch_articles=False, parallel_sections=False, structured_sections=False,
+                      api_key=None, stream=False, day=None):
+    """Hash of the normalized keyword sets, the search date window and the
+    options that change the report. Keyword order, case and spacing are
+    ignored; searches cover the past week, so the window is the calendar day.
+    Only sessions using the same API key (compared by hash) and the same
+    streaming choice share a run, so nobody's job runs on another key's quota.
+    """
+    def normalize(text):
+        return sorted({' '.join(k.split()).casefold() for k in split_keywords(text)})
+
+    group_a = normalize(keywords['group_a_construction'] + '\n' + keywords['group_a_humanoid'])
+    payload = json.dumps({
+        'group_a': group_a,
+        'group_b': normalize(keywords['group_b_keywords']),
+        'day': day or datetime.now().strftime('%Y-%m-%d'),
+        'history': (None if selected_ids is None else sorted(selected_ids)) if use_history else False,
+        'incremental': incremental,
+        'token_budget': token_budget,
+        'merge': merge_duplicates,
+        'fetch_articles': fetch_articles,
+        'parallel_sections': parallel_sections,
+        'structured_sections': structured_sections,
+        'refresh': refresh,
+        'api_key': hashlib.sha256((api_key or '').encode('utf-8')).hexdigest(),
+        'stream': stream
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+# Extracted document text cache settings
+DOC_CACHE_MAX_BYTES = 200 * 1024 * 1024   # Compressed size cap before LRU eviction
+
+# Content-addressed cache of extracted document text
+class DocumentTextCache:
+    """SQLite store of zlib-compressed text keyed by the SHA-256 of the file bytes"""
+    def __init__(self, path, max_bytes=DOC_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS document_text ("
+                "digest TEXT PRIMARY KEY, last_access REAL NOT NULL, "
+                "size INTEGER NOT NULL, text BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_document_text_access ON document_text(last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, digest):
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT text FROM document_text WHERE digest = ?", (digest,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE document_text SET last_access = ? WHERE digest = ?", (time.time(), digest))
+            return zlib.decompress(row[0]).decode('utf-8')
+        except (sqlite3.Error, zlib.error):
+            return None
+
+    def put(self, digest, text):
+        blob = zlib.compress(text.encode('utf-8'), 6)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO document_text (digest, last_access, size, text) VALUES (?, ?, ?, ?)",
+                    (digest, time.time(), len(blob), blob)
+                )
+                # Least recently used documents go first
+                _evict_to_size(conn, 'document_text', 'digest', 'last_access', self.max_bytes)
+        except sqlite3.Error:
+            pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_document_cache():
+    return DocumentTextCache(DOC_CACHE_FILE)
+
+# Function to compute the SHA-256 of an uploaded file without consuming it
+def file_digest(file):
+    file.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(1024 * 1024), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+# Function to identify a set of uploaded files (order-independent)
+def file_set_digest(files):
+    return hashlib.sha256("".join(sorted(file_digest(f) for f in files)).encode()).hexdigest()
+
+# Function to extract text from PDF
+def extract_pdf_text(pdf_file, progress_callback=None):
+    """Extract text from PDF file (page-parallel for large documents)"""
+    try:
+        import pdf_extract
+        with metrics.span('pdf.extract', file=getattr(pdf_file, 'name', None)) as fields:
+            pages = [0]
+            def track(done, total):
+                pages[0] = total
+                if progress_callback:
+                    progress_callback(done, total)
+            text = pdf_extract.extract_text(pdf_file, progress_callback=track)
+            fields.update(pages=pages[0], chars=len(text))
+            return text
+    except Exception as e:
+        notify('error', f"PDF 읽기 실패: {str(e)}")
+        return None
+
+# Map-reduce settings for large documents
+FILE_CHUNK_TOKENS = 8000            # Upper bound per chunk summarized in the map step
+FILE_MAP_WORKERS = 4                # Concurrent chunk summaries
+FILE_MAPREDUCE_THRESHOLD = 30000    # Auto mode switches to map-reduce above this size
+
+# Function to split a document into token-bounded chunks
+def split_into_chunks(text, max_tokens=FILE_CHUNK_TOKENS):
+    """Pack paragraphs into chunks under max_tokens, hard-splitting oversized paragraphs"""
+    chunks = []
+    current, current_tokens = [], 0
+    for paragraph in text.split('\n'):
+        tokens = estimate_tokens(paragraph) + 1
+        if tokens > max_tokens:
+            # Very long paragraph (e.g. a PDF page without line breaks)
+            step = max(1, len(paragraph) * max_tokens // tokens)
+            pieces = [paragraph[i:i + step] for i in range(0, len(paragraph), step)]
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece) + 1
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append('\n'.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current and '\n'.join(current).strip():
+        chunks.append('\n'.join(current))
+    return chunks
+
+# Function to summarize document chunks concurrently (map step)
+def summarize_document_chunks(model, documents, max_workers=FILE_MAP_WORKERS, refresh=False):
+    """Return partial summaries in document order; failed chunks are reported via notify"""
+    jobs = []
+    for name, text in documents:
+        chunks = split_into_chunks(text)
+        for i, chunk in enumerate(chunks, 1):
+            jobs.append((f"{name} ({i}/{len(chunks)})", chunk))
+
+    def summarize(job):
+        label, chunk = job
+        prompt = f"""
+다음은 '{label}' 문서의 일부입니다. 로봇 산업 관점에서 이후 종합 분석에 필요한 내용을 간결하게 요약해주세요.
+- 핵심 주장과 결론
+- 구체적인 수치, 기업, 기술, 일정
+- 시장/투자 관련 시사점
+
+**문서 내용:**
+{chunk}
+"""
+        return generate_text(model, prompt, refresh=refresh)
+
+    summaries = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = [executor.submit(metrics.bind(summarize), job) for job in jobs]
+        for (label, _), future in zip(jobs, futures):
+            try:
+                summaries.append(f"=== {label} ===\n{future.result()}")
+            except Exception:
+                failed += 1
+    if failed:
+        notify('warning', f"문서 일부 요약 실패: {failed}/{len(jobs)}개 구간")
+    return "\n\n".join(summaries)
+
+# Function to analyze uploaded files
+def analyze_files(files, api_key, stream_placeholder=None, map_reduce=None, refresh=False, progress_callback=None):
+    """Analyze uploaded files using Gemini AI.
+
+    map_reduce=True summarizes token-bounded chunks concurrently and writes the
+    report from those summaries; None picks it automatically for large inputs.
+    PDF text is looked up by content hash before parsing; progress_callback(name,
+    done_pages, total_pages) reports extraction of uncached PDFs. refresh=True
+    bypasses the Gemini response cache.
+    """
+    try:
+        doc_cache = get_document_cache()
+        documents = []
+        for file in files:
+            if file.type == "application/pdf":
+                digest = file_digest(file)
+                text = doc_cache.get(digest)
+                if text is not None:
+                    documents.append((file.name, text))
+                    continue
+                text = extract_pdf_text(
+                    file,
+                    progress_callback=progress_callback and (
+                        lambda done, total, name=file.name: progress_callback(name, done, total)
+                    )
+                )
+                if text:
+                    doc_cache.put(digest, text)
+                    documents.append((file.name, text))
+            elif file.type == "text/plain":
+                text = file.read().decode('utf-8')
+                documents.append((file.name, text))
+        
+        if not documents:
+            return None
+        
+        model = get_gemini_models().get(api_key)
+        
+        all_text = "".join(f"\n\n=== {name} ===\n{text}" for name, text in documents)
+        if map_reduce is None:
+            map_reduce = estimate_tokens(all_text) > FILE_MAPREDUCE_THRESHOLD
+        
+        if map_reduce:
+            content_label = "문서별 구간 요약"
+            content = summarize_document_chunks(model, documents, refresh=refresh)
+            if not content:
+                return None
+        else:
+            content_label = "문서 내용"
+            content = all_text
+        
+        prompt = f"""
+다음 문서들을 분석하여 로봇 산업 관점에서 종합 리포트를 작성해주세요.
+
+**분석 요구사항:**
+1. 문서의 주요 내용 요약
+2. 로봇 산업과의 연관성 분석
+3. 기술적 시사점 및 트렌드
+4. 비즈니스 및 투자 인사이트
+5. 향후 전망 및 권고사항
+
+**{content_label}:**
+{content}
+
+**작성 스타일:**
+- 전문적이고 분석적인 톤
+- 구체적인 내용 인용
+- 명확한 구조화
+- 실용적인 인사이트 제공
+"""
+        
+        report = generate_text(model, prompt, stream_placeholder, refresh=refresh)
+        
+        # Save to history
+        if report:
+            save_to_history("파일 분석", report)
+        
+        return report
+        
+    except Exception as e:
+        notify('error', f"파일 분석 실패: {str(e)}")
+        return None
+
+# Function to generate integrated report
+def generate_integrated_report(news_report, file_report, api_key, stream_placeholder=None, refresh=False):
+    """Generate integrated analysis combining news and file analysis"""
+    try:
+        prompt = f"""
+다음 두 가지 분석 결과를 통합하여 종합 리포트를 작성해주세요.
+
+**분석 1: 주간 뉴스 분석 결과**
+{news_report}
+
+**분석 2: 파일 분석 결과**
+{file_report}
+
+**통합 리포트 작성 요구사항:**
+
+## 1. 🔄 교차 분석 및 시너지
+- 뉴스 트렌드와 파일 내용의 연관성 분석
+- 상호 보완적인 인사이트 도출
+- 일치하는 부분과 차이점 분석
+
+## 2. 🎯 핵심 인사이트 통합
+- 두 분석에서 공통으로 나타나는 핵심 트렌드
+- 각 분석에서만 나타나는 독특한 인사이트
+- 통합적 관점에서의 시장 전망
+
+## 3. 💡 전략적 제언
+- 뉴스와 문서 분석을 종합한 실행 가능한 전략
+- 단기/중기/장기 관점의 권고사항
+- 주목해야 할 기회와 리스크
+
+## 4. 📊 종합 결론
+- 로봇 산업의 현재 상황 종합
+- 향후 전망 및 예측
+- 최종 투자/비즈니스 인사이트
+
+**작성 스타일:**
+- 두 분석을 유기적으로 연결
+- 구체적인 근거와 예시 제시
+- 실용적이고 실행 가능한 제언
+- 명확하고 구조화된 형식
+"""
+        
+        model = get_gemini_models().get(api_key)
+        report = generate_text(model, prompt, stream_placeholder, refresh=refresh)
+        
+        # Save to history
+        if report:
+            save_to_history("통합 분석", report)
+        
+        return report
+        
+    except Exception as e:
+        notify('error', f"통합 리포트 생성 실패: {str(e)}")
+        return None
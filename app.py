@@ -1,16 +1,37 @@
 import streamlit as st
-import google.generativeai as genai
-from duckduckgo_search import DDGS
-from datetime import datetime, timedelta
+from datetime import datetime
 import time
+import hashlib
 import os
-import PyPDF2
-import io
-import json
-from docx import Document
-from docx.oxml.ns import qn
-from fpdf import FPDF
-import urllib.request
+from analyzer import (
+    HISTORY_PAGE_SIZE,
+    PROMPT_NEWS_TOKEN_BUDGET,
+    REPORT_SECTIONS,
+    SEARCH_CACHE_TTL,
+    SEARCH_HEDGE_DELAY,
+    analyze_files,
+    assemble_report,
+    delete_history_item,
+    file_set_digest,
+    generate_integrated_report,
+    get_client_stats,
+    get_font_registry,
+    get_history_store,
+    get_search_cache,
+    get_seen_index,
+    load_api_key,
+    load_keywords,
+    news_analysis_key,
+    regenerate_report_section,
+    run_news_analysis,
+    save_api_key,
+    save_keywords,
+    save_to_pdf,
+    save_to_word,
+    set_notifier
+)
+from jobs import DONE, FAILED, RUNNING, get_job_runner
+import metrics
 
 # Page configuration
 st.set_page_config(
@@ -70,243 +91,162 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# API Key file path
-API_KEY_FILE = os.path.join(os.path.dirname(__file__), '.api_key.txt')
-HISTORY_FILE = os.path.join(os.path.dirname(__file__), '.analysis_history.json')
-KEYWORDS_FILE = os.path.join(os.path.dirname(__file__), '.keywords.json')
-
-# Function to load API key from file
-def load_api_key():
-    if os.path.exists(API_KEY_FILE):
-        try:
-            with open(API_KEY_FILE, 'r') as f:
-                return f.read().strip()
-        except:
-            return ""
-    return ""
-
-# Function to save API key to file
-def save_api_key(api_key):
-    try:
-        with open(API_KEY_FILE, 'w') as f:
-            f.write(api_key)
-        return True
-    except:
-        return False
-
-# Function to load keywords
-def load_keywords():
-    default_keywords = {
-        "group_a_construction": "건설 로봇\n건설 현장 자동화\n스마트 건설 R&D\n건설용 웨어러블 로봇",
-        "group_a_humanoid": "휴머노이드 로봇\n이족보행 로봇\n테슬라 옵티머스\n피규어 AI\n보스턴 다이내믹스",
-        "group_b_keywords": "협동로봇\n물류 로봇\nAMR\n주차 로봇\n제조업 로봇"
-    }
-    
-    if os.path.exists(KEYWORDS_FILE):
-        try:
-            with open(KEYWORDS_FILE, 'r', encoding='utf-8') as f:
-                saved_keywords = json.load(f)
-                # Merge with defaults to ensure all keys exist
-                for key, value in default_keywords.items():
-                    if key not in saved_keywords:
-                        saved_keywords[key] = value
-                return saved_keywords
-        except:
-            return default_keywords
-    return default_keywords
-
-# Function to save keywords
-def save_keywords(keywords_data):
-    try:
-        with open(KEYWORDS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(keywords_data, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        st.warning(f"키워드 저장 실패: {str(e)}")
-        return False
-
-# Function to load analysis history
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+# Show pipeline messages in the page that triggered them
+set_notifier(lambda level, message: getattr(st, level)(message))
+
+# Start the Korean PDF font download (if needed) at startup, not at the first export
+get_font_registry()
+
+# Raised inside the memoized builders so a failed export is retried, not cached
+class ExportFailed(Exception):
+    pass
+
+# Memoized export builders: keyed by the report text, built only when requested
+@st.cache_data(max_entries=20, show_spinner=False)
+def build_word_export(content):
+    buffer = save_to_word(content)
+    if buffer is None:
+        raise ExportFailed("word")
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=20, show_spinner=False)
+def build_pdf_export(content):
+    data = save_to_pdf(content)
+    if data is None:
+        raise ExportFailed("pdf")
+    return data
+
+# Function to render lazy Word/PDF export buttons for a report
+def render_export_buttons(content, file_stem, key_prefix):
+    """Show a prepare button per format; documents are built on first request only.
+
+    The prepared state is remembered per report hash, so later reruns reuse the
+    memoized bytes and a new report starts unprepared again.
+    """
+    st.markdown("### 💾 리포트 저장")
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    exports = [
+        ("word", "📄 Word 파일 준비", "📄 Word로 저장", build_word_export, "docx",
+         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        ("pdf", "📑 PDF 파일 준비", "📑 PDF로 저장", build_pdf_export, "pdf", "application/pdf")
+    ]
+    for col, (fmt, prepare_label, label, builder, ext, mime) in zip(st.columns(2), exports):
+        with col:
+            state_key = f"export_{key_prefix}_{fmt}"
+            if st.session_state.get(state_key) != digest:
+                if not st.button(prepare_label, key=f"prepare_{key_prefix}_{fmt}"):
+                    continue
+                st.session_state[state_key] = digest
+            if fmt == "pdf" and not get_font_registry().korean_font_path():
+                # Downloading, or failed: retrying looks for the font again and restarts the download
+                registry = get_font_registry()
+                level, message = registry.missing_notice()
+                (st.warning if level == 'warning' else st.error)(message)
+                st.button("🔄 다시 시도", key=f"retry_{key_prefix}_{fmt}", on_click=registry.retry)
+                continue
+            try:
+                with st.spinner(f"{ext.upper()} 생성 중..."):
+                    data = builder(content)
+            except ExportFailed:
+                # The exporter already reported why; the next rerun tries again
+                data = None
+            if data:
+                st.download_button(
+                    label=label,
+                    data=data,
+                    file_name=f"{file_stem}.{ext}",
+                    mime=mime,
+                    key=f"save_{key_prefix}_{fmt}"
+                )
 
-# Function to save analysis to history
-def save_to_history(analysis_type, content):
-    try:
-        history = load_history()
-        
-        # Keep only last 10 analyses
-        if len(history) >= 10:
-            history = history[-9:]
-        
-        history.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'type': analysis_type,
-            'content': content[:1000]  # Save first 1000 chars as summary
+# Function to label a spinner with the recent average duration of a run type
+def duration_hint(run_name):
+    average = metrics.aggregates.run_average(run_name)
+    return f"최근 평균 {average:.0f}초 소요" if average else "첫 실행은 1분 이상 걸릴 수 있습니다"
+
+# Function to render the last run's per-stage timings
+def render_stage_metrics(run):
+    summary = run.summary()
+    st.caption(f"{summary['run']} · 총 {summary['duration_ms'] / 1000:.1f}초")
+    rows = []
+    for name, stage in sorted(summary['stages'].items(), key=lambda item: -item[1]['total_ms']):
+        details = [
+            f"{key} {stage[key]:,}" for key in ('results', 'articles', 'pages', 'prompt_chars', 'prompt_tokens', 'output_tokens', 'output_bytes')
+            if key in stage
+        ]
+        rows.append({
+            "단계": name,
+            "횟수": stage['count'],
+            "합계 (ms)": round(stage['total_ms']),
+            "평균 (ms)": round(stage['total_ms'] / stage['count']),
+            "오류": stage['errors'],
+            "상세": ", ".join(details)
         })
-        
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-        
-        return True
-    except Exception as e:
-        st.warning(f"히스토리 저장 실패: {str(e)}")
-        return False
-
-        return False
-
-# Function to delete history item
-def delete_history_item(index):
-    try:
-        history = load_history()
-        if 0 <= index < len(history):
-            del history[index]
-            with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
-            return True
-        return False
-    except:
-        return False
-
-# Function to get history summary
-def get_history_summary(selected_indices=None):
-    history = load_history()
-    if not history:
-        return "이전 분석 기록이 없습니다."
-    
-    summary = "=== 이전 분석 히스토리 ===\n\n"
-    
-    # Filter by selected indices if provided
-    if selected_indices is not None:
-        target_history = [history[i] for i in selected_indices if 0 <= i < len(history)]
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    st.caption(f"상세 기록: {os.path.basename(metrics.METRICS_LOG_FILE)} (JSONL)")
+
+# Background job body: search + report, streaming into the job when requested
+def run_news_job(job, stream=False, **options):
+    return run_news_analysis(progress_callback=job.update, stream_placeholder=job if stream else None, **options)
+
+# Function to pick up the news job's result once it finishes
+def finish_news_job(job):
+    notices = list(job['messages'])
+    outcome = job['result']
+    if job['status'] == FAILED:
+        notices.append(('error', f"분석 작업 실패: {job['error']}"))
+    elif not outcome['group_a'] and not outcome['group_b']:
+        notices.append(('error', "검색 결과가 없습니다. 키워드를 변경해보세요."))
     else:
-        target_history = history[-5:]  # Default to last 5
-        
-    if not target_history:
-        return "선택된 이전 분석 기록이 없습니다."
-        
-    for i, item in enumerate(target_history, 1):
-        summary += f"{i}. [{item['timestamp']}] {item['type']}\n"
-        summary += f"   요약: {item['content'][:200]}...\n\n"
+        st.session_state.search_results = {'group_a': outcome['group_a'], 'group_b': outcome['group_b']}
+        st.session_state.ai_report = outcome['report']
+        st.session_state.prompt_budget_report = outcome['prompt_report']
+        st.session_state.report_sections = outcome['sections']
+    if outcome:
+        st.session_state.last_run_metrics = outcome['metrics']
+        if outcome['report']:
+            notices.append(('success', f"✅ 리포트 생성 완료! (그룹 A: {len(outcome['group_a'])}건, 그룹 B: {len(outcome['group_b'])}건)"))
+    st.session_state.news_job_notices = notices
+    st.session_state.news_job_id = None
+    st.query_params.pop("news_job", None)
+
+# Poll the running news job; only this fragment reruns while waiting
+@st.fragment(run_every=1.0)
+def poll_news_job():
+    job = get_job_runner().get(st.session_state.news_job_id)
+    if job is None:
+        # Expired or from a restarted server
+        st.session_state.news_job_id = None
+        st.query_params.pop("news_job", None)
+        st.rerun()
+    if job['status'] in (DONE, FAILED):
+        finish_news_job(job)
+        st.rerun()
     
-    return summary
-
-# Function to save as Word
-def save_to_word(content):
-    try:
-        doc = Document()
-        
-        # Set style for Korean font
-        style = doc.styles['Normal']
-        style.font.name = 'Malgun Gothic'
-        style._element.rPr.rFonts.set(qn('w:eastAsia'), 'Malgun Gothic')
-        
-        # Add heading
-        heading = doc.add_heading('로봇 산업 분석 리포트', 0)
-        heading.style.font.name = 'Malgun Gothic'
-        heading.style._element.rPr.rFonts.set(qn('w:eastAsia'), 'Malgun Gothic')
-        
-        # Add timestamp
-        p = doc.add_paragraph(f"생성 일시: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        p.style = doc.styles['Normal']
-        
-        doc.add_paragraph("-" * 50)
-        
-        # Add content
-        for line in content.split('\n'):
-            p = doc.add_paragraph(line)
-            p.style = doc.styles['Normal']
-        
-        # Save to BytesIO
-        buffer = io.BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        return buffer
-    except Exception as e:
-        st.error(f"Word 생성 실패: {str(e)}")
-        return None
-
-# Function to save as PDF
-def save_to_pdf(content):
-    try:
-        pdf = FPDF()
-        pdf.add_page()
-        
-        # Font handling
-        font_path = "NanumGothic.ttf"
-        
-        # Check if font exists locally, if not try to download
-        if not os.path.exists(font_path):
-            # Check system fonts first
-            system_fonts = [
-                "C:/Windows/Fonts/malgun.ttf",
-                "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
-                "/usr/share/fonts/nanum/NanumGothic.ttf"
-            ]
-            
-            found_system_font = False
-            for path in system_fonts:
-                if os.path.exists(path):
-                    font_path = path
-                    found_system_font = True
-                    break
-            
-            # If no system font, download NanumGothic
-            if not found_system_font:
-                try:
-                    url = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Regular.ttf"
-                    urllib.request.urlretrieve(url, "NanumGothic.ttf")
-                    font_path = "NanumGothic.ttf"
-                except:
-                    pass
-        
-        if os.path.exists(font_path):
-            pdf.add_font('Korean', '', font_path, uni=True)
-            pdf.set_font('Korean', '', 11)
-        else:
-            st.warning("한글 폰트를 찾을 수 없어 기본 폰트를 사용합니다. 한글이 깨질 수 있습니다.")
-            pdf.set_font("Arial", size=11)
-            
-        pdf.cell(0, 10, "로봇 산업 분석 리포트", new_x="LMARGIN", new_y="NEXT", align='C')
-        pdf.cell(0, 10, f"생성 일시: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", new_x="LMARGIN", new_y="NEXT", align='R')
-        pdf.ln(10)
-        
-        # Split content by lines and write
-        # Replace unsupported characters
-        content = content.replace('\u2022', '-').replace('\u2013', '-').replace('\u2014', '-')
-        
-        for line in content.split('\n'):
-            # Handle empty lines
-            if not line.strip():
-                pdf.ln(5)
-                continue
-            
-            # Use multi_cell for automatic wrapping
-            try:
-                pdf.multi_cell(0, 8, line)
-            except Exception:
-                # Fallback for problematic lines (e.g. very long words)
-                try:
-                    pdf.multi_cell(0, 8, line[:100] + "...")
-                except:
-                    pass
-            
-        # Output to bytes
-        return bytes(pdf.output(dest='S'))
-    except Exception as e:
-        st.error(f"PDF 생성 실패: {str(e)}")
-        return None
+    waiting = get_job_runner().active_count() - 1
+    status = job['message'] if job['status'] == RUNNING else f"대기 중... (앞선 분석 {waiting}건)"
+    status += f" · {duration_hint('news_analysis')}"
+    st.progress(job['progress'], text=f"⏳ {status}")
+    st.caption("분석은 서버에서 계속 진행됩니다. 다른 설정을 바꾸거나 페이지를 새로고침해도 결과를 받아볼 수 있습니다.")
+    if job['partial']:
+        st.markdown(job['partial'] + " ▌")
 
 # Initialize session state
 if 'search_results' not in st.session_state:
     st.session_state.search_results = None
 if 'ai_report' not in st.session_state:
     st.session_state.ai_report = None
+if 'prompt_budget_report' not in st.session_state:
+    st.session_state.prompt_budget_report = None
+if 'report_sections' not in st.session_state:
+    st.session_state.report_sections = None
+if 'news_job_id' not in st.session_state:
+    # A job id in the URL lets a refreshed page pick its running analysis back up
+    st.session_state.news_job_id = st.query_params.get("news_job")
+if 'news_job_notices' not in st.session_state:
+    st.session_state.news_job_notices = []
+if 'last_run_metrics' not in st.session_state:
+    st.session_state.last_run_metrics = None
 if 'gemini_api_key' not in st.session_state:
     st.session_state.gemini_api_key = load_api_key()
 
@@ -328,6 +268,17 @@ with st.sidebar:
         else:
             st.warning("⚠️ API 키 저장 실패")
     
+    stream_output = st.checkbox(
+        "AI 응답 실시간 표시",
+        value=True,
+        help="리포트가 생성되는 대로 화면에 표시합니다"
+    )
+    force_regenerate = st.checkbox(
+        "캐시 무시하고 새로 생성",
+        value=False,
+        help="동일한 요청이라도 저장된 AI 응답을 사용하지 않고 다시 생성합니다"
+    )
+    
     st.markdown("---")
     st.markdown("### ⚙️ 검색 키워드 설정")
     
@@ -380,35 +331,43 @@ with st.sidebar:
     )
     
     if use_history:
-        history = load_history()
-        if history:
+        history_store = get_history_store()
+        history_types = ["전체", "주간 뉴스 분석", "파일 분석", "통합 분석"]
+        history_type = st.selectbox("유형", history_types, key="hist_type")
+        type_filter = None if history_type == "전체" else history_type
+        total_history = history_store.count(type_filter)
+        
+        # Selected entry ids for context
+        selected_history_ids = []
+        
+        if total_history:
             st.markdown("##### 🕰️ 히스토리 관리")
-            st.markdown(f"<small>총 {len(history)}개의 분석 기록</small>", unsafe_allow_html=True)
+            st.markdown(f"<small>총 {total_history}개의 분석 기록</small>", unsafe_allow_html=True)
             
-            # Selected indices for context
-            selected_history_indices = []
+            total_pages = (total_history + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+            history_page = 1
+            if total_pages > 1:
+                history_page = st.number_input("페이지", min_value=1, max_value=total_pages, value=1, key="hist_page")
             
-            # Iterate through history items (reverse order to show newest first)
-            for i in range(len(history) - 1, -1, -1):
-                item = history[i]
+            # Newest first, one page at a time
+            for item in history_store.page((history_page - 1) * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE, type_filter):
                 with st.expander(f"{item['timestamp']} ({item['type']})"):
-                    st.caption(f"요약: {item['content'][:100]}...")
+                    st.caption(f"요약: {item['summary'][:100]}...")
                     
                     # Selection checkbox
-                    if st.checkbox("분석에 포함", value=True, key=f"hist_sel_{i}"):
-                        selected_history_indices.append(i)
+                    if st.checkbox("분석에 포함", value=True, key=f"hist_sel_{item['id']}"):
+                        selected_history_ids.append(item['id'])
                     
                     # Delete button
-                    if st.button("🗑️ 삭제", key=f"hist_del_{i}"):
-                        if delete_history_item(i):
+                    if st.button("🗑️ 삭제", key=f"hist_del_{item['id']}"):
+                        if delete_history_item(item['id']):
                             st.success("삭제됨")
                             time.sleep(0.5)
                             st.rerun()
         else:
             st.info("📊 저장된 분석이 없습니다")
-            selected_history_indices = []
     else:
-        selected_history_indices = []
+        selected_history_ids = []
     
     st.markdown("---")
     st.markdown("### 📖 사용 방법")
@@ -419,301 +378,6 @@ with st.sidebar:
     4. 분석 완료까지 약 1-2분 소요됩니다
     """)
 
-# Function to search news using DuckDuckGo
-def search_news(keywords_list, max_results=5):
-    """Search news using DuckDuckGo with robust retry logic"""
-    all_results = []
-    seen_urls = set()
-    
-    ddgs = DDGS()
-    
-    for keyword in keywords_list:
-        success = False
-        # Retry strategies: (region, timelimit)
-        strategies = [
-            ('kr-kr', 'w'),    # 1. Korean region, past week
-            ('kr-kr', None),   # 2. Korean region, any time
-            ('wt-wt', 'w'),    # 3. World region, past week
-            ('wt-wt', None)    # 4. World region, any time
-        ]
-        
-        for region, timelimit in strategies:
-            if success:
-                break
-                
-            try:
-                results = ddgs.text(
-                    keyword,
-                    region=region,
-                    safesearch='off',
-                    timelimit=timelimit,
-                    max_results=max_results
-                )
-                
-                if results:
-                    for result in results:
-                        url = result.get('href', '')
-                        if url and url not in seen_urls:
-                            seen_urls.add(url)
-                            all_results.append({
-                                'title': result.get('title', ''),
-                                'snippet': result.get('body', ''),
-                                'url': url,
-                                'keyword': keyword
-                            })
-                    success = True
-                    # Small delay to avoid rate limiting
-                    time.sleep(0.5)
-            except Exception:
-                time.sleep(1) # Wait a bit before retry
-                continue
-                
-        if not success:
-            # Final fallback: try without any constraints and catch-all
-            try:
-                results = ddgs.text(keyword, max_results=max_results)
-                if results:
-                    for result in results:
-                        url = result.get('href', '')
-                        if url and url not in seen_urls:
-                            seen_urls.add(url)
-                            all_results.append({
-                                'title': result.get('title', ''),
-                                'snippet': result.get('body', ''),
-                                'url': url,
-                                'keyword': keyword
-                            })
-            except:
-                st.warning(f"검색 실패 (키워드: {keyword}) - 모든 검색 시도 실패")
-                
-    return all_results
-
-# Function to generate AI report using Gemini
-def generate_ai_report(group_a_news, group_b_news, api_key, use_history=False, selected_indices=None):
-    """Generate analysis report using Gemini AI"""
-    try:
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
-        
-        # Get history if requested
-        history_context = ""
-        if use_history:
-            history_context = f"\n\n**이전 분석 참고:**\n{get_history_summary(selected_indices)}\n"
-        
-        # System instruction
-        system_instruction = f"""
-너는 로봇 산업 전문 애널리스트야. 제공된 뉴스를 단순히 요약하지 말고, 너의 전문적인 분석과 인사이트를 제공해야 해.
-{history_context}
-**핵심 지침:**
-1. 전체 리포트의 **70%**는 '건설 로봇의 현장 적용'과 '휴머노이드의 기술 진척(제어, AI, 하드웨어)'에 집중
-2. 두 분야의 융합 가능성(예: 휴머노이드의 건설 현장 투입)을 적극적으로 분석
-3. 나머지 30%는 기타 로봇 시장 동향
-4. **중요**: 뉴스를 나열하지 말고, 트렌드를 파악하고 너의 분석을 제시해
-5. 이전 분석이 있다면, 트렌드 변화와 연속성을 분석해
-
-**리포트 구조:**
-
-## 1. 🏗️ 건설 로봇 & 휴머노이드 심층 분석 (70%)
-
-### 1.1 건설 로봇 현장 적용 분석
-- 현재 기술 수준과 실제 적용 사례 분석
-- 주요 기술적 과제와 해결 방향
-- 시장 성장 가능성 평가
-
-### 1.2 휴머노이드 로봇 기술 진척
-- 제어 기술의 최신 동향 (보행, 균형, 조작)
-- AI 통합 현황 (비전, 자율성, 학습)
-- 하드웨어 혁신 (액추에이터, 센서, 배터리)
-
-### 1.3 융합 시나리오 분석
-- 휴머노이드의 건설 현장 투입 가능성
-- 기술적 요구사항과 현재 격차
-- 예상 타임라인과 선도 기업
-
-### 1.4 주요 기업 및 프로젝트 평가
-- 핵심 플레이어 분석 (테슬라, 보스턴다이내믹스, Figure AI 등)
-- 투자 동향과 전략적 방향
-
-## 2. 🤖 기타 로봇 산업 동향 (30%)
-- 협동로봇, 물류로봇, AMR 등의 주요 트렌드
-- 시장 성장 동력과 제약 요인
-
-## 3. 💡 AI 전망 및 투자 인사이트
-- **단기 전망 (6개월~1년)**: 예상되는 주요 이벤트와 기술 발표
-- **중기 전망 (1~3년)**: 시장 구조 변화와 기술 성숙도
-- **장기 전망 (3~5년)**: 산업 패러다임 전환 가능성
-- **투자 관점**: 주목해야 할 기업, 기술, 시장 세그먼트
-- **리스크 요인**: 기술적/규제적/시장 리스크
-
-**작성 스타일:**
-- 전문적이고 분석적인 톤
-- 구체적인 수치와 사례 인용
-- 명확한 근거를 바탕으로 한 전망
-- 불확실성이 있는 부분은 솔직하게 언급
-"""
-        
-        # Prepare news data
-        group_a_text = "\n\n".join([
-            f"제목: {news['title']}\n내용: {news['snippet']}\n출처: {news['url']}"
-            for news in group_a_news
-        ])
-        
-        group_b_text = "\n\n".join([
-            f"제목: {news['title']}\n내용: {news['snippet']}\n출처: {news['url']}"
-            for news in group_b_news
-        ])
-        
-        # Create full prompt
-        full_prompt = f"""{system_instruction}
-
-다음 뉴스 데이터를 바탕으로 주간 로봇 산업 분석 리포트를 작성해주세요.
-
-[그룹 A - 건설 로봇 & 휴머노이드 뉴스 (핵심)]
-{group_a_text}
-
-[그룹 B - 기타 로봇 뉴스]
-{group_b_text}
-
-현재 날짜: {datetime.now().strftime('%Y년 %m월 %d일')}
-분석 기간: 최근 1주일
-"""
-        
-        # Use google-generativeai library (same as stock advisor)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(full_prompt)
-        
-        # Save to history
-        if response.text:
-            save_to_history("주간 뉴스 분석", response.text)
-        
-        return response.text
-        
-    except Exception as e:
-        st.error(f"AI 리포트 생성 실패: {str(e)}")
-        return None
-
-# Function to extract text from PDF
-def extract_pdf_text(pdf_file):
-    """Extract text from PDF file"""
-    try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        st.error(f"PDF 읽기 실패: {str(e)}")
-        return None
-
-# Function to analyze uploaded files
-def analyze_files(files, api_key):
-    """Analyze uploaded files using Gemini AI"""
-    try:
-        genai.configure(api_key=api_key)
-        
-        all_text = ""
-        for file in files:
-            if file.type == "application/pdf":
-                text = extract_pdf_text(file)
-                if text:
-                    all_text += f"\n\n=== {file.name} ===\n{text}"
-            elif file.type == "text/plain":
-                text = file.read().decode('utf-8')
-                all_text += f"\n\n=== {file.name} ===\n{text}"
-        
-        if not all_text:
-            return None
-        
-        prompt = f"""
-다음 문서들을 분석하여 로봇 산업 관점에서 종합 리포트를 작성해주세요.
-
-**분석 요구사항:**
-1. 문서의 주요 내용 요약
-2. 로봇 산업과의 연관성 분석
-3. 기술적 시사점 및 트렌드
-4. 비즈니스 및 투자 인사이트
-5. 향후 전망 및 권고사항
-
-**문서 내용:**
-{all_text}
-
-**작성 스타일:**
-- 전문적이고 분석적인 톤
-- 구체적인 내용 인용
-- 명확한 구조화
-- 실용적인 인사이트 제공
-"""
-        
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        
-        # Save to history
-        if response.text:
-            save_to_history("파일 분석", response.text)
-        
-        return response.text
-        
-    except Exception as e:
-        st.error(f"파일 분석 실패: {str(e)}")
-        return None
-
-# Function to generate integrated report
-def generate_integrated_report(news_report, file_report, api_key):
-    """Generate integrated analysis combining news and file analysis"""
-    try:
-        genai.configure(api_key=api_key)
-        
-        prompt = f"""
-다음 두 가지 분석 결과를 통합하여 종합 리포트를 작성해주세요.
-
-**분석 1: 주간 뉴스 분석 결과**
-{news_report}
-
-**분석 2: 파일 분석 결과**
-{file_report}
-
-**통합 리포트 작성 요구사항:**
-
-## 1. 🔄 교차 분석 및 시너지
-- 뉴스 트렌드와 파일 내용의 연관성 분석
-- 상호 보완적인 인사이트 도출
-- 일치하는 부분과 차이점 분석
-
-## 2. 🎯 핵심 인사이트 통합
-- 두 분석에서 공통으로 나타나는 핵심 트렌드
-- 각 분석에서만 나타나는 독특한 인사이트
-- 통합적 관점에서의 시장 전망
-
-## 3. 💡 전략적 제언
-- 뉴스와 문서 분석을 종합한 실행 가능한 전략
-- 단기/중기/장기 관점의 권고사항
-- 주목해야 할 기회와 리스크
-
-## 4. 📊 종합 결론
-- 로봇 산업의 현재 상황 종합
-- 향후 전망 및 예측
-- 최종 투자/비즈니스 인사이트
-
-**작성 스타일:**
-- 두 분석을 유기적으로 연결
-- 구체적인 근거와 예시 제시
-- 실용적이고 실행 가능한 제언
-- 명확하고 구조화된 형식
-"""
-        
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        
-        # Save to history
-        if response.text:
-            save_to_history("통합 분석", response.text)
-        
-        return response.text
-        
-    except Exception as e:
-        st.error(f"통합 리포트 생성 실패: {str(e)}")
-        return None
-
 # Main content with tabs
 st.markdown('<div class="main-header">🤖 로봇 산업 분석 플랫폼</div>', unsafe_allow_html=True)
 
@@ -725,60 +389,133 @@ with tab1:
     
     news_analysis_button = st.button("🔍 뉴스 분석 시작", type="primary", key="news_analysis_btn")
     
-    # Generate report when button is clicked
+    with st.expander("⚙️ 검색 옵션"):
+        use_search_cache = st.checkbox(
+            "검색 결과 캐시 사용",
+            value=True,
+            help=f"최근 {SEARCH_CACHE_TTL // 3600}시간 이내 동일한 검색은 저장된 결과를 재사용합니다"
+        )
+        merge_duplicates = st.checkbox(
+            "유사 기사 묶기",
+            value=True,
+            help="여러 매체에 실린 같은 기사를 하나로 묶어 AI 분석에 중복 전달하지 않습니다"
+        )
+        use_hedged_search = st.checkbox(
+            "폴백 검색 병렬 실행 (헤지)",
+            value=True,
+            help="응답이 늦으면 다음 검색 전략(지역/기간)을 동시에 시작해 키워드당 대기 시간을 줄입니다"
+        )
+        hedge_delay = st.slider(
+            "헤지 지연 (초)",
+            min_value=0.5,
+            max_value=5.0,
+            value=SEARCH_HEDGE_DELAY,
+            step=0.5,
+            disabled=not use_hedged_search
+        )
+        fetch_articles = st.checkbox(
+            "기사 본문 가져오기",
+            value=False,
+            help="검색 결과의 기사 페이지를 동시에 가져와 본문 발췌를 AI에 함께 전달합니다 (최대 약 5초 추가)"
+        )
+        report_mode = st.radio(
+            "리포트 작성 방식",
+            ["한 번에 작성", "섹션별 작성 (JSON)", "섹션 병렬 생성 후 종합"],
+            index=0,
+            help=(
+                "섹션별 작성: 한 번의 호출로 섹션을 나눠 받아 저장하므로, 마음에 들지 않는 섹션만 다시 생성할 수 있습니다. "
+                "섹션 병렬 생성: 건설 로봇 / 휴머노이드 / 기타 로봇 섹션을 각자의 뉴스로 동시에 작성한 뒤, 융합 분석과 전망을 짧게 종합합니다 "
+                "(이 방식도 섹션별 재생성 가능)"
+            )
+        )
+        parallel_sections = report_mode == "섹션 병렬 생성 후 종합"
+        structured_sections = report_mode == "섹션별 작성 (JSON)"
+        incremental_analysis = st.checkbox(
+            "증분 분석 (새 기사만)",
+            value=False,
+            help=f"이미 분석한 기사는 제외하고 새 기사만 AI에 전달합니다 (분석된 기사 {get_seen_index().count()}건)"
+        )
+        news_token_budget = st.number_input(
+            "AI 프롬프트 뉴스 토큰 예산 (0 = 제한 없음)",
+            min_value=0,
+            max_value=200000,
+            value=PROMPT_NEWS_TOKEN_BUDGET,
+            step=1000,
+            help="관련도가 높은 기사부터 예산 안에서 그룹 A 70% / 그룹 B 30%로 채웁니다"
+        )
+        cache_stats = get_search_cache().stats()
+        st.caption(
+            f"캐시 항목 {cache_stats['entries']}개 ({cache_stats['bytes'] / 1024:.0f} KB) · "
+            f"적중 {cache_stats['hits']} / 미스 {cache_stats['misses']}"
+        )
+        client_stats = get_client_stats()
+        st.caption(
+            f"연결 재사용: 검색 클라이언트 {client_stats['ddgs']['reused']}회 "
+            f"(생성 {client_stats['ddgs']['created']}) · "
+            f"Gemini 모델 {client_stats['gemini']['reused']}회 (생성 {client_stats['gemini']['created']})"
+        )
+        if st.button("🧹 검색 캐시 비우기", key="clear_search_cache_btn"):
+            get_search_cache().clear()
+            st.success("검색 캐시를 비웠습니다")
+    
+    # Queue the analysis as a background job when button is clicked
     if news_analysis_button:
         if not api_key:
             st.error("⚠️ Gemini API 키를 입력해주세요!")
+        elif st.session_state.news_job_id and get_job_runner().get(st.session_state.news_job_id):
+            st.warning("이미 진행 중인 분석이 있습니다. 완료 후 다시 시도해주세요.")
         else:
-            # Parse keywords
-            construction_keywords = [k.strip() for k in group_a_construction.split('\n') if k.strip()]
-            humanoid_keywords = [k.strip() for k in group_a_humanoid.split('\n') if k.strip()]
-            other_keywords = [k.strip() for k in group_b_keywords.split('\n') if k.strip()]
-            
-            group_a_all = construction_keywords + humanoid_keywords
-            
-            # Search progress
-            with st.spinner('🔍 뉴스 검색 중... (약 30-60초 소요)'):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                # Search Group A (high priority)
-                status_text.text("그룹 A 검색 중 (건설 로봇 & 휴머노이드)...")
-                group_a_results = search_news(group_a_all, max_results=5)
-                progress_bar.progress(60)
-                
-                # Search Group B
-                status_text.text("그룹 B 검색 중 (기타 로봇)...")
-                group_b_results = search_news(other_keywords, max_results=3)
-                progress_bar.progress(80)
-                
-                status_text.text("검색 완료!")
-                progress_bar.progress(100)
-                time.sleep(0.5)
-                progress_bar.empty()
-                status_text.empty()
-            
-            # Store results
-            st.session_state.search_results = {
-                'group_a': group_a_results,
-                'group_b': group_b_results
+            news_keywords = {
+                "group_a_construction": group_a_construction,
+                "group_a_humanoid": group_a_humanoid,
+                "group_b_keywords": group_b_keywords
             }
-            
-            # Generate AI report
-            if group_a_results or group_b_results:
-                with st.spinner('🤖 AI 분석 중... (약 30초 소요)'):
-                    ai_report = generate_ai_report(
-                        group_a_results, 
-                        group_b_results, 
-                        api_key, 
-                        use_history=use_history,
-                        selected_indices=selected_history_indices
-                    )
-                    st.session_state.ai_report = ai_report
-                
-                st.success(f"✅ 리포트 생성 완료! (그룹 A: {len(group_a_results)}건, 그룹 B: {len(group_b_results)}건)")
-            else:
-                st.error("검색 결과가 없습니다. 키워드를 변경해보세요.")
+            # Identical analyses already running in other sessions are joined, not repeated
+            job_id = get_job_runner().submit(
+                "주간 뉴스 분석",
+                run_news_job,
+                key=news_analysis_key(
+                    news_keywords,
+                    use_history=use_history,
+                    selected_ids=selected_history_ids,
+                    incremental=incremental_analysis,
+                    token_budget=news_token_budget or None,
+                    merge_duplicates=merge_duplicates,
+                    refresh=force_regenerate,
+                    fetch_articles=fetch_articles,
+                    parallel_sections=parallel_sections,
+                    structured_sections=structured_sections,
+                    api_key=api_key,
+                    stream=stream_output
+                ),
+                keywords=news_keywords,
+                api_key=api_key,
+                use_cache=use_search_cache,
+                hedge_delay=hedge_delay if use_hedged_search else None,
+                merge_duplicates=merge_duplicates,
+                use_history=use_history,
+                selected_ids=selected_history_ids,
+                incremental=incremental_analysis,
+                token_budget=news_token_budget or None,
+                refresh=force_regenerate,
+                fetch_articles=fetch_articles,
+                parallel_sections=parallel_sections,
+                structured_sections=structured_sections,
+                stream=stream_output
+            )
+            st.session_state.news_job_id = job_id
+            st.session_state.news_job_notices = []
+            if get_job_runner().get(job_id)['subscribers'] > 1:
+                st.session_state.news_job_notices = [
+                    ('info', "🔗 같은 키워드로 진행 중인 분석이 있어 해당 분석 결과를 함께 받습니다.")
+                ]
+            st.query_params["news_job"] = job_id
+    
+    if st.session_state.news_job_id:
+        poll_news_job()
+    
+    for level, message in st.session_state.news_job_notices:
+        getattr(st, level)(message)
     
     # Display AI report
     if st.session_state.ai_report:
@@ -788,35 +525,52 @@ with tab1:
         with st.container():
             st.markdown(st.session_state.ai_report)
             
-            # Export buttons
-            st.markdown("### 💾 리포트 저장")
-            col1, col2 = st.columns(2)
-            with col1:
-                docx_data = save_to_word(st.session_state.ai_report)
-                if docx_data:
-                    st.download_button(
-                        label="📄 Word로 저장",
-                        data=docx_data,
-                        file_name="주간_로봇_산업_분석.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                        key="save_news_word"
-                    )
-            with col2:
-                pdf_data = save_to_pdf(st.session_state.ai_report)
-                if pdf_data:
-                    st.download_button(
-                        label="📑 PDF로 저장",
-                        data=pdf_data,
-                        file_name="주간_로봇_산업_분석.pdf",
-                        mime="application/pdf",
-                        key="save_news_pdf"
+            # Rewrite one weak section from its own news; the rest stays as is
+            if st.session_state.report_sections:
+                with st.expander("🧩 섹션 다시 생성"):
+                    section_number = st.selectbox(
+                        "섹션",
+                        list(REPORT_SECTIONS),
+                        format_func=lambda number: f"{number} {REPORT_SECTIONS[number][0]}",
+                        key="regen_section"
                     )
+                    if st.button("🔁 이 섹션 다시 생성", key="regen_section_btn"):
+                        if not api_key:
+                            st.error("⚠️ Gemini API 키를 입력해주세요!")
+                        else:
+                            with st.spinner(f"{section_number} 섹션 생성 중..."):
+                                with metrics.run('section_regeneration') as run_metrics:
+                                    sections = regenerate_report_section(
+                                        st.session_state.report_sections['id'], section_number, api_key
+                                    )
+                            st.session_state.last_run_metrics = run_metrics
+                            if sections:
+                                st.session_state.report_sections = {**st.session_state.report_sections, 'sections': sections}
+                                st.session_state.ai_report = assemble_report(sections)
+                                st.session_state.news_job_notices = [
+                                    ('success', f"✅ {section_number} 섹션을 다시 생성했습니다 ({run_metrics.duration_ms / 1000:.1f}초)")
+                                ]
+                                st.rerun()
+            
+            # Export buttons (built lazily on request)
+            render_export_buttons(st.session_state.ai_report, "주간_로봇_산업_분석", "news")
         
         # Show source count at bottom
         if st.session_state.search_results:
             results = st.session_state.search_results
             total_sources = len(results.get('group_a', [])) + len(results.get('group_b', []))
             st.info(f"📰 분석에 사용된 뉴스 소스: 총 {total_sources}건 (건설/휴머노이드: {len(results.get('group_a', []))}건, 기타: {len(results.get('group_b', []))}건)")
+        
+        budget_report = st.session_state.prompt_budget_report
+        if budget_report:
+            dropped = budget_report['group_a']['dropped'] + budget_report['group_b']['dropped']
+            with st.expander(f"🧮 프롬프트 구성 (예산 초과로 제외된 기사 {len(dropped)}건)"):
+                for name, label in (('group_a', '그룹 A'), ('group_b', '그룹 B')):
+                    group = budget_report[name]
+                    budget_text = f"{group['budget']:,}" if group['budget'] else "제한 없음"
+                    st.caption(f"{label}: {group['kept']}건 포함, 약 {group['tokens']:,} / {budget_text} 토큰")
+                for news in dropped:
+                    st.markdown(f"- [{news['title']}]({news['url']})")
 
 # Tab 2: File Upload Analysis
 with tab2:
@@ -834,6 +588,13 @@ with tab2:
         help="여러 파일을 동시에 업로드할 수 있습니다"
     )
     
+    analysis_mode = st.radio(
+        "분석 방식",
+        ["자동", "전체 한 번에", "분할 요약 후 종합"],
+        horizontal=True,
+        help="대용량 문서는 구간별로 동시에 요약한 뒤 종합합니다. 자동은 문서 크기에 따라 선택합니다"
+    )
+    
     analyze_button = st.button("🔍 파일 분석 시작", type="primary", key="analyze_files_btn")
     
     if analyze_button:
@@ -841,10 +602,33 @@ with tab2:
             st.error("⚠️ Gemini API 키를 입력해주세요!")
         elif not uploaded_files:
             st.error("⚠️ 분석할 파일을 업로드해주세요!")
+        elif (
+            not force_regenerate
+            and st.session_state.file_analysis_report
+            and st.session_state.get('file_analysis_digest') == (file_set_digest(uploaded_files), analysis_mode)
+        ):
+            st.info("ℹ️ 동일한 파일 세트는 이미 분석되었습니다. 아래 리포트를 확인하세요.")
         else:
-            with st.spinner('📄 파일 분석 중... (약 30-60초 소요)'):
-                file_report = analyze_files(uploaded_files, api_key)
+            with st.spinner(f"📄 파일 분석 중... ({duration_hint('file_analysis')})"):
+                pdf_progress = st.empty()
+                stream_placeholder = st.empty() if stream_output else None
+                with metrics.run('file_analysis') as run_metrics:
+                    file_report = analyze_files(
+                        uploaded_files,
+                        api_key,
+                        stream_placeholder=stream_placeholder,
+                        map_reduce={"자동": None, "전체 한 번에": False, "분할 요약 후 종합": True}[analysis_mode],
+                        refresh=force_regenerate,
+                        progress_callback=lambda name, done, total: pdf_progress.progress(
+                            done / total, text=f"📄 {name} 읽는 중... ({done}/{total} 페이지)"
+                        )
+                    )
+                st.session_state.last_run_metrics = run_metrics
+                pdf_progress.empty()
                 st.session_state.file_analysis_report = file_report
+                st.session_state.file_analysis_digest = (file_set_digest(uploaded_files), analysis_mode)
+                if stream_placeholder:
+                    stream_placeholder.empty()
             
             if file_report:
                 st.success(f"✅ 분석 완료! ({len(uploaded_files)}개 파일)")
@@ -857,29 +641,8 @@ with tab2:
         with st.container():
             st.markdown(st.session_state.file_analysis_report)
             
-            # Export buttons
-            st.markdown("### 💾 리포트 저장")
-            col1, col2 = st.columns(2)
-            with col1:
-                docx_data = save_to_word(st.session_state.file_analysis_report)
-                if docx_data:
-                    st.download_button(
-                        label="📄 Word로 저장",
-                        data=docx_data,
-                        file_name="파일_분석_리포트.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                        key="save_file_word"
-                    )
-            with col2:
-                pdf_data = save_to_pdf(st.session_state.file_analysis_report)
-                if pdf_data:
-                    st.download_button(
-                        label="📑 PDF로 저장",
-                        data=pdf_data,
-                        file_name="파일_분석_리포트.pdf",
-                        mime="application/pdf",
-                        key="save_file_pdf"
-                    )
+            # Export buttons (built lazily on request)
+            render_export_buttons(st.session_state.file_analysis_report, "파일_분석_리포트", "file")
         
         if uploaded_files:
             st.info(f"📁 분석된 파일: {', '.join([f.name for f in uploaded_files])}")
@@ -906,13 +669,20 @@ with tab3:
             if not api_key:
                 st.error("⚠️ Gemini API 키를 입력해주세요!")
             else:
-                with st.spinner('🔄 통합 분석 중... (약 30-60초 소요)'):
-                    integrated_report = generate_integrated_report(
-                        st.session_state.ai_report,
-                        st.session_state.file_analysis_report,
-                        api_key
-                    )
+                with st.spinner(f"🔄 통합 분석 중... ({duration_hint('integrated_analysis')})"):
+                    stream_placeholder = st.empty() if stream_output else None
+                    with metrics.run('integrated_analysis') as run_metrics:
+                        integrated_report = generate_integrated_report(
+                            st.session_state.ai_report,
+                            st.session_state.file_analysis_report,
+                            api_key,
+                            stream_placeholder=stream_placeholder,
+                            refresh=force_regenerate
+                        )
+                    st.session_state.last_run_metrics = run_metrics
                     st.session_state.integrated_report = integrated_report
+                    if stream_placeholder:
+                        stream_placeholder.empty()
                 
                 if integrated_report:
                     st.success("✅ 통합 분석 완료!")
@@ -925,29 +695,8 @@ with tab3:
             with st.container():
                 st.markdown(st.session_state.integrated_report)
                 
-                # Export buttons
-                st.markdown("### 💾 리포트 저장")
-                col1, col2 = st.columns(2)
-                with col1:
-                    docx_data = save_to_word(st.session_state.integrated_report)
-                    if docx_data:
-                        st.download_button(
-                            label="📄 Word로 저장",
-                            data=docx_data,
-                            file_name="통합_분석_리포트.docx",
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                            key="save_integrated_word"
-                        )
-                with col2:
-                    pdf_data = save_to_pdf(st.session_state.integrated_report)
-                    if pdf_data:
-                        st.download_button(
-                            label="📑 PDF로 저장",
-                            data=pdf_data,
-                            file_name="통합_분석_리포트.pdf",
-                            mime="application/pdf",
-                            key="save_integrated_pdf"
-                        )
+                # Export buttons (built lazily on request)
+                render_export_buttons(st.session_state.integrated_report, "통합_분석_리포트", "integrated")
             
             # Show summary
             st.info("💡 이 리포트는 주간 뉴스 트렌드와 업로드된 문서를 종합적으로 분석한 결과입니다.")
@@ -965,6 +714,14 @@ with tab3:
         """)
 
 
+# Per-stage timings of this session's latest analysis (rendered last so it reflects this run)
+with st.sidebar:
+    with st.expander("⏱️ 단계별 소요 시간"):
+        if st.session_state.last_run_metrics:
+            render_stage_metrics(st.session_state.last_run_metrics)
+        else:
+            st.caption("분석을 실행하면 검색, 프롬프트 구성, Gemini 호출, PDF 추출, 내보내기 단계별 시간이 표시됩니다.")
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,287 @@
+"""Concurrent article page fetching and main-text extraction.
+
+Pages are fetched over one pooled urllib3 client (keep-alive per host), at
+most FETCH_PER_HOST requests at a time per host, with connect/read timeouts,
+a byte cap per page and an overall deadline for the whole batch. URLs come
+from search results, so every request, including each redirect hop, must
+resolve to public addresses only. Main text is pulled out with a small
+stdlib HTML parser that keeps paragraph-like blocks and drops navigation,
+scripts and other page chrome.
+"""
+import functools
+import ipaddress
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import urllib3
+
+FETCH_MAX_WORKERS = 16          # Pages in flight across all hosts
+FETCH_PER_HOST = 2              # Pages in flight per host
+FETCH_CONNECT_TIMEOUT = 2.0     # Seconds to establish a connection
+FETCH_READ_TIMEOUT = 3.0        # Seconds between bytes once connected
+FETCH_DEADLINE = 5.0            # Seconds for the whole batch; slower pages are skipped
+FETCH_MAX_BYTES = 1024 * 1024   # Bytes read per page; the rest is ignored
+FETCH_CHUNK_SIZE = 64 * 1024
+FETCH_MAX_REDIRECTS = 3         # Redirect hops followed per page
+FETCH_ALLOWED_HOSTS = frozenset()   # Hosts exempt from the public-address check (local tests/benchmarks)
+MIN_BLOCK_CHARS = 25            # Shorter text blocks are treated as chrome (menus, captions)
+USER_AGENT = "Mozilla/5.0 (compatible; RobotNewsAnalyzer/1.0)"
+
+_SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer', 'aside', 'form', 'button', 'select', 'iframe'}
+_BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'li', 'td', 'h1', 'h2', 'h3', 'h4', 'blockquote', 'pre', 'br'}
+_VOID_TAGS = {'br', 'img', 'meta', 'link', 'input', 'hr', 'source', 'wbr', 'area', 'base', 'col', 'embed', 'param', 'track'}
+_CHROME_HINT_RE = re.compile(r'(^|[-_ ])(nav|menu|footer|header|sidebar|comment|related|share|banner|ad|ads|promo|subscribe|copyright)([-_ ]|$)', re.I)
+_WHITESPACE_RE = re.compile(r'\s+')
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_\-]+)', re.I)
+
+
+# Boilerplate-stripping HTML parser
+class _MainTextParser(HTMLParser):
+    """Collect text blocks, skipping chrome subtrees; tracks whether each
+    block sits inside <article>/<main> and how much of it is link text."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []        # (text, in_article, link_chars)
+        self.title = ""
+        self._stack = []        # (tag, skip, article)
+        self._parts = []
+        self._link_chars = 0
+        self._link_start = 0
+        self._in_title = False
+
+    def _skipping(self):
+        return bool(self._stack) and self._stack[-1][1]
+
+    def _in_article(self):
+        return bool(self._stack) and self._stack[-1][2]
+
+    def _flush(self):
+        text = _WHITESPACE_RE.sub(' ', ''.join(self._parts)).strip()
+        if text:
+            self.blocks.append((text, self._in_article(), self._link_chars))
+        self._parts = []
+        self._link_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self._in_title = True
+        if tag in _BLOCK_TAGS:
+            self._flush()
+        if tag in _VOID_TAGS:
+            return
+        attr = dict(attrs)
+        hint = f"{attr.get('class') or ''} {attr.get('id') or ''} {attr.get('role') or ''}"
+        skip = self._skipping() or tag in _SKIP_TAGS or bool(_CHROME_HINT_RE.search(hint))
+        article = self._in_article() or tag in ('article', 'main')
+        self._stack.append((tag, skip, article))
+        if tag == 'a':
+            self._link_start = sum(len(p) for p in self._parts)
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        if tag == 'a' and not self._skipping():
+            self._link_chars += sum(len(p) for p in self._parts) - self._link_start
+        if tag in _BLOCK_TAGS:
+            self._flush()
+        # Pop to the matching tag, tolerating unclosed children
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if not self._skipping():
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+# Function to extract the main article text from an HTML page
+def extract_main_text(html, max_chars=None):
+    """Keep long, low-link-density blocks; prefer those inside <article>/<main>"""
+    parser = _MainTextParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    blocks = [
+        (text, in_article) for text, in_article, link_chars in parser.blocks
+        if len(text) >= MIN_BLOCK_CHARS and link_chars <= len(text) * 0.5
+    ]
+    if any(in_article for _, in_article in blocks):
+        blocks = [block for block in blocks if block[1]]
+    text = "\n".join(dict.fromkeys(text for text, _ in blocks))   # Drop repeated blocks
+    return text[:max_chars] if max_chars else text
+
+
+def _decode(body, content_type):
+    match = re.search(r'charset=([\w\-]+)', content_type or '', re.I)
+    charset = match.group(1) if match else None
+    if not charset:
+        meta = _CHARSET_RE.search(body[:4096])
+        charset = meta.group(1).decode('ascii') if meta else 'utf-8'
+    if charset.lower().replace('_', '-') in ('euc-kr', 'ks-c-5601-1987', 'ksc5601'):
+        charset = 'cp949'   # Superset used by Korean sites labelled EUC-KR
+    try:
+        return body.decode(charset, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+
+@functools.lru_cache(maxsize=None)
+def get_http_pool():
+    """Process-wide pooled client; keeps FETCH_PER_HOST connections alive per host"""
+    return urllib3.PoolManager(
+        num_pools=64,
+        maxsize=FETCH_PER_HOST,
+        headers={'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml'},
+        timeout=urllib3.Timeout(connect=FETCH_CONNECT_TIMEOUT, read=FETCH_READ_TIMEOUT),
+        retries=urllib3.Retry(total=1, redirect=False, backoff_factor=0)   # Redirects are followed by _request_public
+    )
+
+
+# Function to refuse URLs that point into the local network
+def check_public_url(url):
+    """Raise IOError unless url is http(s) and its host resolves only to
+    global addresses (no loopback, private, link-local or reserved ranges)."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        raise IOError(f"unsupported scheme: {parts.scheme or url}")
+    host = (parts.hostname or '').lower()
+    if not host:
+        raise IOError(f"no host: {url}")
+    if host in FETCH_ALLOWED_HOSTS:
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError) as e:
+        raise IOError(f"cannot resolve {host}: {e}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%')[0])
+        if getattr(address, 'ipv4_mapped', None):
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise IOError(f"non-public address {address} for {host}")
+
+
+# Per-host semaphores
+class _HostLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.limit)
+            return self._hosts[host]
+
+
+# Function to GET a URL, following redirects only to public hosts
+def _request_public(url):
+    for _ in range(FETCH_MAX_REDIRECTS + 1):
+        check_public_url(url)
+        response = get_http_pool().request('GET', url, preload_content=False, redirect=False)
+        location = response.get_redirect_location()
+        if not location:
+            return response
+        # Redirect bodies are not needed; drop the connection rather than read them
+        response.close()
+        response.release_conn()
+        url = urljoin(url, location)
+    raise IOError(f"more than {FETCH_MAX_REDIRECTS} redirects")
+
+
+# Function to fetch one page's HTML (bytes capped), or raise
+def fetch_html(url, deadline=None, max_bytes=FETCH_MAX_BYTES, host_limiter=None):
+    host = (urlsplit(url).hostname or '').lower()
+    semaphore = host_limiter.get(host) if host_limiter else None
+    if semaphore:
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not semaphore.acquire(timeout=remaining):
+            raise TimeoutError(f"host slot wait exceeded deadline: {host}")
+    try:
+        response = _request_public(url)
+        complete = False
+        try:
+            if response.status >= 400:
+                raise IOError(f"HTTP {response.status}")
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and 'html' not in content_type.lower():
+                raise IOError(f"not HTML: {content_type}")
+            chunks, size = [], 0
+            for chunk in response.stream(FETCH_CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes or (deadline is not None and time.monotonic() > deadline):
+                    break
+            else:
+                complete = True
+            return _decode(b"".join(chunks)[:max_bytes], content_type), min(size, max_bytes)
+        finally:
+            if not complete:
+                # Unread body bytes would corrupt the next request on this connection
+                response.close()
+            response.release_conn()
+    finally:
+        if semaphore:
+            semaphore.release()
+
+
+# Function to fetch and extract many pages concurrently within a deadline
+def fetch_articles(urls, deadline=FETCH_DEADLINE, max_workers=FETCH_MAX_WORKERS,
+                   per_host=FETCH_PER_HOST, max_bytes=FETCH_MAX_BYTES, max_chars=None, on_page=None):
+    """Return {url: text} for pages fetched and extracted before the deadline.
+
+    on_page(url, outcome) is called from worker threads with a dict of
+    'bytes', 'chars', 'ms' and 'error' (None on success) for each attempt.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    limiter = _HostLimiter(per_host)
+    stop_at = time.monotonic() + deadline
+
+    def fetch(url):
+        started = time.monotonic()
+        outcome = {'bytes': 0, 'chars': 0, 'error': None}
+        try:
+            html, outcome['bytes'] = fetch_html(url, stop_at, max_bytes, limiter)
+            text = extract_main_text(html, max_chars)
+            outcome['chars'] = len(text)
+            return text
+        except Exception as e:
+            outcome['error'] = f"{type(e).__name__}: {e}"[:200]
+            return None
+        finally:
+            outcome['ms'] = round((time.monotonic() - started) * 1000, 1)
+            if on_page:
+                on_page(url, outcome)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))), thread_name_prefix="article-fetch")
+    try:
+        futures = {executor.submit(fetch, url): url for url in urls}
+        done, _ = wait(futures, timeout=deadline)
+        texts = {}
+        for future in done:
+            text = future.result()
+            if text:
+                texts[futures[future]] = text
+        return texts
+    finally:
+        # Stragglers finish in the background; their pages are simply not used
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,410 @@
+"""Offline benchmark suite for the weekly analysis pipeline.
+
+Times the stages of a weekly run against local stand-ins: a fake DDGS with
+configurable latency and failure rate, a fake Gemini model and synthetic
+PDFs. Nothing touches the network, and the caches, history, seen-article
+index and metrics log live in a temporary directory.
+
+    python benchmark.py --out benchmark_baseline.json          # record a baseline
+    python benchmark.py --compare benchmark_baseline.json      # check for regressions (needs --repeat >= 2)
+
+Stages:
+    search_news            10/100/1000 articles (5 per keyword, 4 workers)
+    generate_ai_report     prompt construction with a zero-latency model
+    fetch_articles         50 article pages from a local HTTP stand-in (10 hosts)
+    extract_pdf_text       10/300-page synthetic PDFs
+    save_to_word/pdf       reports sized for 10/100/1000 articles (PDF with a generated box-glyph font)
+"""
+import argparse
+import functools
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import analyzer
+import metrics
+
+ARTICLE_SIZES = [10, 100, 1000]
+FETCH_PAGES = 50
+FETCH_HOSTS = 10               # One stand-in server per loopback address 127.0.0.1 .. 127.0.0.10
+PDF_PAGE_SIZES = [10, 300]
+RESULTS_PER_KEYWORD = 5
+DEFAULT_TOLERANCE = 0.25       # Relative slowdown reported as a regression
+WARMUP_RUNS = 1                # Untimed runs per benchmark before the timed ones
+
+_TOPICS = ["건설 로봇", "휴머노이드", "협동 로봇", "물류 로봇", "서비스 로봇", "자율주행 로봇", "산업용 로봇", "의료 로봇"]
+_COMPANIES = ["현대건설", "삼성물산", "레인보우로보틱스", "두산로보틱스", "Boston Dynamics", "Figure AI", "Tesla", "Agility Robotics"]
+
+
+# Stand-in for duckduckgo_search.DDGS
+class FakeDDGS:
+    """Answers text() after `latency` seconds; fails a fixed share of queries.
+
+    Failures are decided by hashing (keyword, region, timelimit), so every run
+    walks the same fallback ladder and timings stay comparable.
+    """
+    def __init__(self, latency=0.05, failure_rate=0.1, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.calls = 0
+
+    def text(self, keyword, region=None, safesearch=None, timelimit=None, max_results=5):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        token = zlib.crc32(f"{self.seed}|{keyword}|{region}|{timelimit}".encode('utf-8'))
+        if region is not None and (token % 1000) / 1000 < self.failure_rate:
+            raise RuntimeError("fake DDGS failure")
+        return [synthetic_article(keyword, i) for i in range(max_results)]
+
+
+# Stand-in for google.generativeai.GenerativeModel
+class FakeGeminiModel:
+    model_name = 'fake-gemini'
+
+    def __init__(self, latency=0.0, report=None):
+        self.latency = latency
+        self.report = report or synthetic_report(10)
+        self.prompt_chars = []
+
+    def generate_content(self, prompt, stream=False, **options):
+        self.prompt_chars.append(len(prompt))
+        if self.latency:
+            time.sleep(self.latency)
+        response = type("FakeResponse", (), {'text': self.report})()
+        return [response] if stream else response
+
+
+class FakeGeminiModels:
+    def __init__(self, model):
+        self.model = model
+
+    def get(self, api_key, model_name=analyzer.GEMINI_MODEL_NAME):
+        return self.model
+
+    def stats(self):
+        return {'created': 1, 'reused': 0, 'models': 1}
+
+
+def synthetic_article(keyword, index):
+    rng = random.Random(f"{keyword}|{index}")
+    topic = rng.choice(_TOPICS)
+    company = rng.choice(_COMPANIES)
+    return {
+        'href': f"https://news.example.com/{zlib.crc32(keyword.encode('utf-8'))}/{index}",
+        'title': f"{company}, {topic} {keyword} 관련 신규 발표 ({index})",
+        'body': f"{company}가 {topic} 분야에서 {keyword} 기술을 공개했다. "
+                f"업계는 {rng.randint(10, 90)}% 성장을 전망하며 상용화 일정은 {rng.randint(2025, 2030)}년이다."
+    }
+
+
+def synthetic_keywords(count):
+    return [f"{_TOPICS[i % len(_TOPICS)]} 키워드{i}" for i in range(count)]
+
+
+def synthetic_news(count):
+    items = []
+    for keyword in synthetic_keywords(max(1, count // RESULTS_PER_KEYWORD)):
+        for i in range(RESULTS_PER_KEYWORD):
+            article = synthetic_article(keyword, i)
+            items.append({'title': article['title'], 'snippet': article['body'], 'url': article['href'], 'keyword': keyword})
+    return items[:count]
+
+
+def synthetic_report(articles):
+    lines = ["## 1. 핵심 요약", "로봇 산업 주간 동향 요약입니다.", ""]
+    for i, news in enumerate(synthetic_news(articles)):
+        if i % 10 == 0:
+            lines += ["", f"### 2.{i // 10 + 1} {news['keyword']}"]
+        lines.append(f"- **{news['title']}**: {news['snippet']} ([출처]({news['url']}))")
+    return "\n".join(lines)
+
+
+def synthetic_article_html(path):
+    rng = random.Random(path)
+    paragraphs = "".join(
+        f"<p>{rng.choice(_COMPANIES)}가 {rng.choice(_TOPICS)} 사업 확대 계획을 발표했다. "
+        f"올해 매출 목표는 {rng.randint(100, 900)}억 원이며 {rng.randint(2, 20)}개 현장에 적용한다.</p>"
+        for _ in range(12)
+    )
+    menu = "".join(f"<li><a href='/c/{i}'>카테고리 {i}</a></li>" for i in range(40))
+    return (
+        "<html><head><meta charset='utf-8'><title>기사</title><script>var tracking = 1;</script></head><body>"
+        f"<header><nav><ul>{menu}</ul></nav></header><div class='ad-banner'>광고</div>"
+        f"<article><h1>{path}</h1>{paragraphs}<div class='related'><p>관련 기사 목록</p></div></article>"
+        "<footer><p>Copyright. All rights reserved.</p></footer></body></html>"
+    ).encode('utf-8')
+
+
+# Local stand-in for news sites
+class ArticleServer:
+    """Threaded HTTP servers answering every path with a synthetic article page after `latency` seconds.
+
+    Each server listens on its own loopback address (Linux routes all of
+    127.0.0.0/8 to lo), so the fetcher sees `hosts` distinct hosts without
+    anything being reachable from outside the machine.
+    """
+    def __init__(self, latency=0.1, hosts=FETCH_HOSTS):
+        latency_s = latency
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                time.sleep(latency_s)
+                body = synthetic_article_html(self.path)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.servers = []
+        for host in range(1, hosts + 1):
+            server = ThreadingHTTPServer((f"127.0.0.{host}", 0), Handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+
+    def hosts(self):
+        return frozenset(server.server_address[0] for server in self.servers)
+
+    def urls(self, count):
+        return [
+            "http://%s:%d/article/%d" % (*self.servers[i % len(self.servers)].server_address, i)
+            for i in range(count)
+        ]
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+def synthetic_pdf(pages):
+    """ASCII-only text PDF (core font) so no Korean font is needed to build it"""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=10)
+    rng = random.Random(pages)
+    words = ["robot", "humanoid", "construction", "actuator", "sensor", "market", "growth", "deployment", "safety", "autonomy"]
+    for page in range(pages):
+        pdf.add_page()
+        for line in range(40):
+            pdf.cell(0, 6, f"{page}.{line} " + " ".join(rng.choice(words) for _ in range(12)), new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+def synthetic_font(path):
+    """Box-glyph TrueType font covering ASCII and every Hangul syllable.
+
+    Lets save_to_pdf be timed on Korean reports without a real Korean font
+    installed, and keeps the timing independent of whichever font a machine
+    happens to have. Built with fontTools, which fpdf2 already depends on.
+    """
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+    def box(width):
+        pen = TTGlyphPen(None)
+        pen.moveTo((50, 0))
+        pen.lineTo((50, 700))
+        pen.lineTo((width - 50, 700))
+        pen.lineTo((width - 50, 0))
+        pen.closePath()
+        return pen.glyph()
+
+    cmap = {cp: 'narrow' for cp in range(0x21, 0x7F)}
+    cmap.update({cp: 'wide' for cp in range(0xAC00, 0xD7A4)})
+    cmap[0x20] = 'space'
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(['.notdef', 'space', 'narrow', 'wide'])
+    builder.setupCharacterMap(cmap)
+    builder.setupGlyf({'.notdef': box(500), 'space': TTGlyphPen(None).glyph(), 'narrow': box(500), 'wide': box(1000)})
+    builder.setupHorizontalMetrics({'.notdef': (500, 50), 'space': (250, 0), 'narrow': (500, 50), 'wide': (1000, 50)})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({'familyName': 'BenchmarkBox', 'styleName': 'Regular'})
+    builder.setupOS2(sTypoAscender=800, sTypoDescender=-200, usWinAscent=800, usWinDescent=200)
+    builder.setupPost()
+    builder.save(path)
+    return path
+
+
+# Point every on-disk store at a scratch directory and install the fakes
+def install_fakes(workdir, ddgs_latency, ddgs_failure_rate, gemini_latency):
+    # Benchmark spans must not reach the app's timing log or Prometheus file
+    metrics.set_log_file(os.path.join(workdir, os.path.basename(metrics.METRICS_LOG_FILE)))
+    os.environ[metrics.PROMETHEUS_FILE_ENV] = os.path.join(workdir, "robot_news.prom")
+    for name in ('SEARCH_CACHE_FILE', 'SEEN_INDEX_FILE', 'DOC_CACHE_FILE', 'RESPONSE_CACHE_FILE', 'HISTORY_DB_FILE',
+                 'ARTICLE_CACHE_FILE'):
+        setattr(analyzer, name, os.path.join(workdir, os.path.basename(getattr(analyzer, name))))
+    analyzer.HISTORY_FILE = os.path.join(workdir, os.path.basename(analyzer.HISTORY_FILE))
+    for getter in (analyzer.get_search_cache, analyzer.get_seen_index, analyzer.get_document_cache,
+                   analyzer.get_response_cache, analyzer.get_history_store, analyzer.get_article_cache):
+        getter.cache_clear()
+
+    ddgs = FakeDDGS(ddgs_latency, ddgs_failure_rate)
+    model = FakeGeminiModel(gemini_latency)
+    pool = analyzer.ClientPool(lambda: ddgs, analyzer.DDGS_POOL_MAX_IDLE)
+    analyzer.get_ddgs_pool = lambda: pool
+    analyzer.get_gemini_models = lambda: FakeGeminiModels(model)
+    # The production limiter would dominate every search timing; pace nothing
+    limiter = analyzer.TokenBucket(rate=1e9, capacity=1e9)
+    analyzer.get_search_rate_limiter = lambda: limiter
+    # Never start the background font download; render PDFs with the box font
+    registry = analyzer.FontRegistry(download=False)
+    registry.path = synthetic_font(os.path.join(workdir, "benchmark_box.ttf"))
+    analyzer.get_font_registry = lambda: registry
+    analyzer.set_notifier(lambda level, message: None)
+    return ddgs, model, registry
+
+
+def timed(fn, repeat):
+    """Median/min of repeat runs after WARMUP_RUNS discarded ones (imports, first-call setup)"""
+    for _ in range(WARMUP_RUNS):
+        fn()
+    samples = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        samples.append(time.perf_counter() - start)
+    return {'median_s': round(statistics.median(samples), 4), 'min_s': round(min(samples), 4), 'runs': repeat}, value
+
+
+def run_benchmarks(repeat, ddgs, model, registry, article_sizes=ARTICLE_SIZES, page_sizes=PDF_PAGE_SIZES,
+                   page_latency=0.1):
+    import article_fetch
+
+    results = {}
+
+    for size in article_sizes:
+        keywords = synthetic_keywords(max(1, size // RESULTS_PER_KEYWORD))
+        calls_before = ddgs.calls
+        stats, found = timed(functools.partial(
+            analyzer.search_news, keywords, max_results=RESULTS_PER_KEYWORD, use_cache=False
+        ), repeat)
+        stats.update({'articles': len(found), 'ddgs_calls_per_run': (ddgs.calls - calls_before) // (WARMUP_RUNS + repeat)})
+        results[f"search_news/{size}"] = stats
+
+    for size in article_sizes:
+        news = synthetic_news(size)
+        split = max(1, size * 7 // 10)
+        prompt_report = {}
+        stats, _ = timed(lambda: analyzer.generate_ai_report(
+            news[:split], news[split:], "benchmark", use_history=True, refresh=True, prompt_report=prompt_report
+        ), repeat)
+        stats['prompt_chars'] = model.prompt_chars[-1] if model.prompt_chars else 0
+        results[f"generate_ai_report/{size}"] = stats
+
+    server = ArticleServer(page_latency)
+    allowed_hosts = article_fetch.FETCH_ALLOWED_HOSTS
+    article_fetch.FETCH_ALLOWED_HOSTS = allowed_hosts | server.hosts()   # Loopback is refused otherwise
+    try:
+        urls = server.urls(FETCH_PAGES)
+        stats, texts = timed(lambda: article_fetch.fetch_articles(urls), repeat)
+        stats.update({'pages': len(urls), 'extracted': len(texts), 'hosts': FETCH_HOSTS, 'page_latency_s': page_latency})
+        results[f"fetch_articles/{FETCH_PAGES}"] = stats
+    finally:
+        article_fetch.FETCH_ALLOWED_HOSTS = allowed_hosts
+        server.close()
+
+    for pages in page_sizes:
+        data = synthetic_pdf(pages)
+        stats, text = timed(lambda: analyzer.extract_pdf_text(io.BytesIO(data)), repeat)
+        stats.update({'pdf_bytes': len(data), 'text_chars': len(text or "")})
+        results[f"extract_pdf_text/{pages}p"] = stats
+
+    for size in article_sizes:
+        report = synthetic_report(size)
+        stats, buffer = timed(lambda: analyzer.save_to_word(report), repeat)
+        stats['output_bytes'] = len(buffer.getvalue()) if buffer else 0
+        results[f"save_to_word/{size}"] = stats
+        stats, data = timed(lambda: analyzer.save_to_pdf(report), repeat)
+        stats.update({'output_bytes': len(data or b""), 'font': os.path.basename(registry.korean_font_path())})
+        results[f"save_to_pdf/{size}"] = stats
+
+    return results
+
+
+# Function to list benchmarks slower than the baseline by more than tolerance
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get('results', {}).get(name, {})
+        if 'median_s' in stats and before.get('median_s'):
+            ratio = stats['median_s'] / before['median_s']
+            if ratio > 1 + tolerance:
+                regressions.append((name, before['median_s'], stats['median_s'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="주간 분석 파이프라인 오프라인 벤치마크")
+    parser.add_argument("--repeat", type=int, default=3, help="벤치마크당 반복 횟수")
+    parser.add_argument("--out", default="benchmark_results.json", help="결과 JSON 경로")
+    parser.add_argument("--compare", default=None, help="비교할 기준(baseline) JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="회귀로 판단할 상대 지연 비율")
+    parser.add_argument("--ddgs-latency", type=float, default=0.05, help="가짜 DDGS 응답 지연 (초)")
+    parser.add_argument("--ddgs-failure-rate", type=float, default=0.1, help="가짜 DDGS 실패 비율 (0-1)")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="가짜 Gemini 응답 지연 (초)")
+    parser.add_argument("--page-latency", type=float, default=0.1, help="가짜 기사 서버 응답 지연 (초)")
+    parser.add_argument("--quick", action="store_true", help="작은 크기만 실행 (10건, 10페이지)")
+    args = parser.parse_args(argv)
+    if args.compare and args.repeat < 2:
+        parser.error("--compare 는 중앙값을 비교하므로 --repeat 2 이상이 필요합니다")
+    warnings.simplefilter("ignore")
+
+    with tempfile.TemporaryDirectory(prefix="robot-news-bench-") as workdir:
+        ddgs, model, registry = install_fakes(workdir, args.ddgs_latency, args.ddgs_failure_rate, args.gemini_latency)
+        results = run_benchmarks(
+            max(1, args.repeat), ddgs, model, registry,
+            article_sizes=ARTICLE_SIZES[:1] if args.quick else ARTICLE_SIZES,
+            page_sizes=PDF_PAGE_SIZES[:1] if args.quick else PDF_PAGE_SIZES,
+            page_latency=args.page_latency
+        )
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': {k: v for k, v in vars(args).items() if k not in ('out', 'compare')}
+        },
+        'results': results
+    }
+    for name, stats in results.items():
+        print(f"{name:<28} {stats['median_s'] * 1000:>10.1f} ms (min {stats['min_s'] * 1000:.1f})")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"회귀: {name} {before * 1000:.1f} ms -> {after * 1000:.1f} ms (x{ratio:.2f})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
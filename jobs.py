@@ -0,0 +1,168 @@
+"""Background job runner for long analyses.
+
+Jobs run on a process-wide thread pool, so a Streamlit rerun, a browser
+refresh or a dropped connection does not cancel them. The UI keeps only the
+job id and polls the job table for progress and the finished result.
+"""
+import functools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from analyzer import notifier_scope
+
+JOB_MAX_WORKERS = 4             # Analyses running at once across all sessions
+JOB_RETENTION = 6 * 60 * 60     # Seconds a finished job stays pickable
+JOB_TABLE_LIMIT = 200           # Finished jobs kept before the oldest are dropped
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+# One row of the job table
+class Job:
+    def __init__(self, label, key=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.key = key
+        self.subscribers = 1        # Submissions sharing this run
+        self.status = QUEUED
+        self.progress = 0
+        self.message = "대기 중..."
+        self.partial = ""           # Streamed report text so far
+        self.messages = []          # (level, message) from notify()
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    # Progress hook: progress_callback(percent, message)
+    def update(self, percent, message=None):
+        with self._lock:
+            self.progress = max(self.progress, min(100, int(percent)))
+            if message:
+                self.message = message
+
+    # Notifier hook: keeps warnings/errors for the UI to show on completion
+    def notify(self, level, message):
+        with self._lock:
+            self.messages.append((level, message))
+
+    # Stream placeholder stand-in: generate_text() calls markdown() per chunk
+    def markdown(self, text):
+        with self._lock:
+            self.partial = text
+
+    def empty(self):
+        with self._lock:
+            self.partial = ""
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'label': self.label,
+                'subscribers': self.subscribers,
+                'status': self.status,
+                'progress': self.progress,
+                'message': self.message,
+                'partial': self.partial,
+                'messages': list(self.messages),
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+# Thread pool plus the in-memory job table
+class JobRunner:
+    """Run callables off the request thread and keep their state by job id.
+
+    fn(job, *args, **kwargs) receives the Job so it can report progress via
+    job.update, stream via job.markdown and surface messages via notify().
+    """
+    def __init__(self, max_workers=JOB_MAX_WORKERS, retention=JOB_RETENTION, limit=JOB_TABLE_LIMIT):
+        self.retention = retention
+        self.limit = limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._jobs = {}
+        self._inflight = {}         # Coalescing key -> queued/running job
+        self._lock = threading.Lock()
+
+    def submit(self, label, fn, *args, key=None, **kwargs):
+        """Queue fn and return its job id.
+
+        Single-flight: if a job with the same key is still queued or running,
+        nothing new is started and that job's id is returned instead, so
+        identical requests from several sessions share one run and its result.
+        """
+        with self._lock:
+            self._prune()
+            if key is not None:
+                job = self._inflight.get(key)
+                if job is not None:
+                    with job._lock:
+                        job.subscribers += 1
+                    return job.id
+            job = Job(label, key=key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._inflight[key] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        with job._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.message = "시작..."
+        try:
+            with notifier_scope(job.notify):
+                result = fn(job, *args, **kwargs)
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._finish(job, DONE, result=result)
+
+    def _finish(self, job, status, result=None, error=None):
+        # Leave the in-flight map first so a later identical request starts a fresh run
+        with self._lock:
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+        with job._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            if status == DONE:
+                job.progress = 100
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job else None
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in (QUEUED, RUNNING))
+
+    def _prune(self):
+        """Drop expired finished jobs, then the oldest finished beyond the limit"""
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at
+        )
+        for index, job in enumerate(finished):
+            if now - job.finished_at > self.retention or len(finished) - index > self.limit:
+                del self._jobs[job.id]
+
+
+@functools.lru_cache(maxsize=None)
+def get_job_runner():
+    return JobRunner()
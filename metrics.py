@@ -0,0 +1,238 @@
+"""Per-stage timing spans for the analysis pipeline.
+
+Wrap a stage in span(); the finished span goes to the rotating JSONL metrics
+log, to the enclosing run() (shown in the app's sidebar panel) and to
+process-wide aggregates that can be exported as a Prometheus text file.
+
+    with metrics.run("news_analysis") as current:
+        with metrics.span("search.keyword", keyword=kw) as fields:
+            ...
+            fields['attempts'] = 3
+    current.spans   # [{'name': 'search.keyword', 'duration_ms': ..., ...}]
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import uuid
+
+METRICS_LOG_FILE = os.path.join(os.path.dirname(__file__), '.metrics.jsonl')
+METRICS_LOG_MAX_BYTES = 5 * 1024 * 1024   # Rotate the JSONL log at this size
+METRICS_LOG_BACKUPS = 3                   # Rotated files kept (.1 .. .3)
+PROMETHEUS_FILE_ENV = 'ROBOT_NEWS_PROM_FILE'   # Optional node_exporter textfile path
+RUN_SPAN_LIMIT = 500                      # Spans kept per run for the UI
+
+_current_run = contextvars.ContextVar('metrics_run', default=None)
+_log_lock = threading.Lock()
+_logger = None
+
+
+# One analysis run: the spans recorded while it was current
+class Run:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            if len(self.spans) < RUN_SPAN_LIMIT:
+                self.spans.append(record)
+
+    def summary(self):
+        """Total time, call count and summed numeric fields per span name"""
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            stage = stages.setdefault(record['name'], {'count': 0, 'total_ms': 0.0, 'errors': 0})
+            stage['count'] += 1
+            stage['total_ms'] += record['duration_ms']
+            stage['errors'] += record['status'] != 'ok'
+            for key, value in record.get('fields', {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage[key] = stage.get(key, 0) + value
+        return {'run': self.name, 'id': self.id, 'duration_ms': self.duration_ms, 'stages': stages}
+
+
+# Process-wide totals per span name, for the Prometheus export
+class Aggregates:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._runs = {}
+
+    def add_span(self, record):
+        with self._lock:
+            stage = self._stages.setdefault(record['name'], {'count': 0, 'seconds': 0.0, 'errors': 0, 'tokens': 0})
+            stage['count'] += 1
+            stage['seconds'] += record['duration_ms'] / 1000
+            stage['errors'] += record['status'] != 'ok'
+            fields = record.get('fields', {})
+            stage['tokens'] += fields.get('prompt_tokens', 0) + fields.get('output_tokens', 0)
+
+    def add_run(self, run):
+        with self._lock:
+            totals = self._runs.setdefault(run.name, {'count': 0, 'seconds': 0.0, 'last_seconds': 0.0})
+            totals['count'] += 1
+            totals['seconds'] += run.duration_ms / 1000
+            totals['last_seconds'] = run.duration_ms / 1000
+
+    def run_average(self, name):
+        """Mean duration in seconds of finished runs called name, or None"""
+        with self._lock:
+            totals = self._runs.get(name)
+            return totals['seconds'] / totals['count'] if totals else None
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP robot_news_stage_seconds Time spent per pipeline stage.",
+            "# TYPE robot_news_stage_seconds summary",
+        ]
+        with self._lock:
+            stages = {name: dict(values) for name, values in self._stages.items()}
+            runs = {name: dict(values) for name, values in self._runs.items()}
+        for name, values in sorted(stages.items()):
+            lines.append(f'robot_news_stage_seconds_sum{{stage="{name}"}} {values["seconds"]:.6f}')
+            lines.append(f'robot_news_stage_seconds_count{{stage="{name}"}} {values["count"]}')
+        lines += ["# HELP robot_news_stage_errors_total Failed spans per pipeline stage.",
+                  "# TYPE robot_news_stage_errors_total counter"]
+        lines += [f'robot_news_stage_errors_total{{stage="{name}"}} {values["errors"]}' for name, values in sorted(stages.items())]
+        lines += ["# HELP robot_news_gemini_tokens_total Gemini prompt + output tokens per stage.",
+                  "# TYPE robot_news_gemini_tokens_total counter"]
+        lines += [f'robot_news_gemini_tokens_total{{stage="{name}"}} {values["tokens"]}'
+                  for name, values in sorted(stages.items()) if values["tokens"]]
+        lines += ["# HELP robot_news_run_seconds Duration of whole analysis runs.",
+                  "# TYPE robot_news_run_seconds summary"]
+        for name, values in sorted(runs.items()):
+            lines.append(f'robot_news_run_seconds_sum{{run="{name}"}} {values["seconds"]:.6f}')
+            lines.append(f'robot_news_run_seconds_count{{run="{name}"}} {values["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+aggregates = Aggregates()
+
+
+def _metrics_logger():
+    global _logger
+    with _log_lock:
+        if _logger is None:
+            logger = logging.getLogger("robot_news.metrics")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            try:
+                handler = logging.handlers.RotatingFileHandler(
+                    METRICS_LOG_FILE, maxBytes=METRICS_LOG_MAX_BYTES,
+                    backupCount=METRICS_LOG_BACKUPS, encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            except OSError:
+                logger.addHandler(logging.NullHandler())
+            _logger = logger
+        return _logger
+
+
+def set_log_file(path):
+    """Write the JSONL log to path from now on (benchmarks and tests use a scratch file)"""
+    global METRICS_LOG_FILE, _logger
+    with _log_lock:
+        METRICS_LOG_FILE = path
+        if _logger is not None:
+            for handler in list(_logger.handlers):
+                _logger.removeHandler(handler)
+                handler.close()
+            _logger = None
+
+
+def _emit(record):
+    _metrics_logger().info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+# Function to write the aggregates for node_exporter's textfile collector
+def write_prometheus(path=None):
+    path = path or os.environ.get(PROMETHEUS_FILE_ENV)
+    if not path:
+        return
+    try:
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, 'w', encoding='utf-8') as f:
+            f.write(aggregates.prometheus_text())
+        os.replace(partial, path)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def run(name):
+    """Make a new Run current for this thread (and threads started via bind())"""
+    current = Run(name)
+    token = _current_run.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        _current_run.reset(token)
+        aggregates.add_run(current)
+        _emit({'type': 'run', 'run': current.name, 'run_id': current.id,
+               'ts': current.started_at, 'duration_ms': current.duration_ms})
+        write_prometheus()
+
+
+@contextlib.contextmanager
+def span(name, **fields):
+    """Time a stage. Yields a dict the caller can add fields to (sizes, tokens)."""
+    start = time.perf_counter()
+    started_at = time.time()
+    status = 'ok'
+    try:
+        yield fields
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        _record(name, started_at, (time.perf_counter() - start) * 1000, status, fields)
+
+
+def record(name, started, status='ok', **fields):
+    """Record a stage timed by the caller from time.perf_counter() value started"""
+    duration_ms = (time.perf_counter() - started) * 1000
+    _record(name, time.time() - duration_ms / 1000, duration_ms, status, fields)
+
+
+def _record(name, started_at, duration_ms, status, fields):
+    record = {
+        'type': 'span',
+        'name': name,
+        'ts': started_at,
+        'duration_ms': round(duration_ms, 2),
+        'status': status,
+        'fields': fields
+    }
+    current = _current_run.get()
+    if current is not None:
+        record['run_id'] = current.id
+        current.add(record)
+    aggregates.add_span(record)
+    _emit(record)
+
+
+def bind(fn):
+    """Wrap fn so spans recorded on a pool thread join the caller's current run"""
+    current = _current_run.get()
+
+    def bound(*args, **kwargs):
+        token = _current_run.set(current)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_run.reset(token)
+    return bound
@@ -0,0 +1,104 @@
+"""Page-parallel PDF text extraction.
+
+Lives outside app.py so process-pool workers can import the worker function
+without re-running the Streamlit script.
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import PyPDF2
+
+PARALLEL_MIN_PAGES = 40     # Smaller PDFs are faster to read in-process
+PAGES_PER_TASK = 16         # Page range handed to one worker at a time
+SPOOL_CHUNK_SIZE = 1024 * 1024
+STALL_TIMEOUT = 60          # Seconds without a finished page range before falling back in-process
+
+logger = logging.getLogger(__name__)
+
+
+# Worker: extract text for pages [start, stop) from a PDF on disk
+def _extract_page_range(path, start, stop):
+    reader = PyPDF2.PdfReader(path)
+    return start, [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _extract_task(task):
+    return _extract_page_range(*task)
+
+
+# Function to pick a process start method that does not re-import the app
+def _pool_context():
+    # "spawn"/"forkserver" children re-execute sys.modules['__main__'], which
+    # under Streamlit is the app script itself, so only fork is usable here.
+    # A forked child can inherit a lock held by another server thread, so
+    # extract_text never waits on workers without a timeout.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+# Function to extract text from a PDF file object
+def extract_text(pdf_file, progress_callback=None, max_workers=None):
+    """Return the text of every page, each followed by a newline.
+
+    Large documents are spooled to a temporary file once and split across a
+    process pool by page range; pages are joined a single time at the end.
+    If no range finishes within STALL_TIMEOUT seconds (or a worker fails),
+    the pool is terminated and the remaining pages are read in-process.
+    progress_callback(done_pages, total_pages) is called from the caller's
+    thread after each page or page range.
+    """
+    pdf_file.seek(0)
+    reader = PyPDF2.PdfReader(pdf_file)
+    total = len(reader.pages)
+    pages = [""] * total
+
+    context = _pool_context()
+    workers = max_workers or min(os.cpu_count() or 1, 8)
+    if total < PARALLEL_MIN_PAGES or context is None or workers < 2:
+        for i, page in enumerate(reader.pages):
+            pages[i] = page.extract_text() or ""
+            if progress_callback:
+                progress_callback(i + 1, total)
+        return "\n".join(pages) + "\n" if pages else ""
+
+    # Spool the upload to disk so workers read it lazily instead of each
+    # receiving a pickled copy of the whole document
+    pdf_file.seek(0)
+    spool = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with spool:
+            shutil.copyfileobj(pdf_file, spool, SPOOL_CHUNK_SIZE)
+
+        tasks = [(spool.name, start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK)]
+        extracted = [False] * total
+        done = 0
+        pool = context.Pool(workers)
+        try:
+            results = pool.imap_unordered(_extract_task, tasks)
+            for _ in tasks:
+                start, texts = results.next(timeout=STALL_TIMEOUT)
+                pages[start:start + len(texts)] = texts
+                extracted[start:start + len(texts)] = [True] * len(texts)
+                done += len(texts)
+                if progress_callback:
+                    progress_callback(done, total)
+        except Exception as e:
+            pool.terminate()
+            logger.warning("병렬 PDF 추출 중단 (%s), 남은 페이지를 순차 추출합니다", type(e).__name__)
+            for i, page in enumerate(reader.pages):
+                if not extracted[i]:
+                    pages[i] = page.extract_text() or ""
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+        else:
+            pool.close()
+        pool.join()
+    finally:
+        os.unlink(spool.name)
+
+    return "\n".join(pages) + "\n"
@@ -0,0 +1,81 @@
+"""Measure cold-start import cost of the app and its heavy dependencies.
+
+Each module is imported in a fresh interpreter so results are not skewed by
+modules already loaded in this process. Run once per release and keep the
+--json output next to the release notes to track regressions:
+
+    python startup_time.py --repeat 5 --json startup_times.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# "analyzer" is what every Streamlit rerun and the batch runner pay for;
+# the rest are the dependencies it now imports only when a feature needs them.
+MODULES = [
+    "analyzer",
+    "streamlit",
+    "google.generativeai",
+    "duckduckgo_search",
+    "docx",
+    "fpdf",
+    "PyPDF2",
+]
+
+_TIMER = (
+    "import time, warnings; warnings.simplefilter('ignore'); "
+    "t = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+# Function to time one import in a fresh interpreter (milliseconds)
+def time_import(module):
+    result = subprocess.run(
+        [sys.executable, "-c", _TIMER.format(module=module)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(modules, repeat):
+    results = {}
+    for module in modules:
+        samples = [time_import(module) for _ in range(repeat)]
+        samples = [s for s in samples if s is not None]
+        results[module] = {
+            'median_ms': round(statistics.median(samples), 1) if samples else None,
+            'min_ms': round(min(samples), 1) if samples else None,
+            'samples': len(samples)
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모듈별 콜드 스타트 import 시간을 측정합니다.")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="측정할 모듈 (기본값: 앱과 주요 의존성)")
+    parser.add_argument("--repeat", type=int, default=3, help="모듈당 측정 횟수")
+    parser.add_argument("--json", dest="json_path", default=None, help="결과를 JSON 파일로 저장")
+    args = parser.parse_args(argv)
+
+    results = measure(args.modules, max(1, args.repeat))
+    for module, stats in results.items():
+        if stats['median_ms'] is None:
+            print(f"{module:<22} import 실패")
+        else:
+            print(f"{module:<22} {stats['median_ms']:>8.1f} ms (min {stats['min_ms']:.1f})")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({'python': sys.version.split()[0], 'modules': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
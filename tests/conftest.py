@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer  # noqa: E402
+import metrics  # noqa: E402
+from fakes import FakeDDGS, search_result  # noqa: E402
+
+_STORE_FILES = ('SEARCH_CACHE_FILE', 'SEEN_INDEX_FILE', 'DOC_CACHE_FILE', 'RESPONSE_CACHE_FILE',
+                'HISTORY_DB_FILE', 'ARTICLE_CACHE_FILE', 'REPORT_SECTION_STORE_FILE', 'HISTORY_FILE')
+_STORE_GETTERS = ('get_search_cache', 'get_seen_index', 'get_document_cache', 'get_response_cache',
+                  'get_history_store', 'get_article_cache', 'get_report_section_store')
+
+
+def _clear_stores():
+    for getter in _STORE_GETTERS:
+        getattr(analyzer, getter).cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """Keep caches, history and the metrics log of every test in tmp_path"""
+    for name in _STORE_FILES:
+        monkeypatch.setattr(analyzer, name, str(tmp_path / os.path.basename(getattr(analyzer, name))))
+    monkeypatch.delenv(metrics.PROMETHEUS_FILE_ENV, raising=False)
+    log_file = metrics.METRICS_LOG_FILE
+    metrics.set_log_file(str(tmp_path / "metrics.jsonl"))
+    _clear_stores()
+    yield tmp_path
+    _clear_stores()
+    metrics.set_log_file(log_file)
+
+
+@pytest.fixture
+def notices():
+    """Messages passed to analyzer.notify() during the test"""
+    messages = []
+    with analyzer.notifier_scope(lambda level, message: messages.append((level, message))):
+        yield messages
+
+
+@pytest.fixture
+def ddgs(monkeypatch):
+    """Route searches to one FakeDDGS and lift the rate limit"""
+    fake = FakeDDGS({keyword: [search_result(keyword, n) for n in range(3)] for keyword in ("로봇", "휴머노이드", "건설")})
+    monkeypatch.setattr(analyzer, 'get_ddgs_pool', lambda: analyzer.ClientPool(lambda: fake, 8))
+    monkeypatch.setattr(analyzer, 'get_search_rate_limiter', lambda: analyzer.TokenBucket(1000, 1000))
+    return fake
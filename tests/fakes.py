@@ -0,0 +1,83 @@
+"""Stand-ins for the Gemini SDK, DuckDuckGo and Streamlit placeholders"""
+import threading
+import time
+
+import analyzer
+
+
+class Chunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("chunk has no text parts")
+        return self._text
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel: replies from a list, records calls"""
+    model_name = 'stub-model'
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def generate_content(self, prompt, stream=False, generation_config=None):
+        self.calls.append({'prompt': prompt, 'stream': stream, 'generation_config': generation_config})
+        reply = self.replies.pop(0)
+        if stream:
+            return [Chunk(part) for part in reply]
+        return Chunk("".join(part or "" for part in reply))
+
+
+class Placeholder:
+    def __init__(self):
+        self.rendered = []
+
+    def markdown(self, text):
+        self.rendered.append(text)
+
+
+class StubModels:
+    def __init__(self, model):
+        self.model = model
+
+    def get(self, api_key, model_name=analyzer.GEMINI_MODEL_NAME):
+        return self.model
+
+
+class FakeDDGS:
+    """Stands in for duckduckgo_search.DDGS; text() yields like the 4.x client.
+
+    results maps keyword -> list of result dicts; failing holds keywords
+    whose every query raises; delay is seconds per query, or a dict of
+    seconds per keyword. Calls are recorded as (keyword, region, timelimit).
+    """
+    def __init__(self, results, failing=(), delay=0.0):
+        self.results = results
+        self.failing = set(failing)
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def text(self, keyword, region=None, safesearch=None, timelimit=None, max_results=None):
+        with self._lock:
+            self.calls.append((keyword, region, timelimit))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay.get(keyword, 0.0) if isinstance(self.delay, dict) else self.delay)
+            if keyword in self.failing:
+                raise RuntimeError("ratelimit")
+        finally:
+            with self._lock:
+                self.active -= 1
+        return (dict(result) for result in self.results.get(keyword, [])[:max_results])
+
+
+def search_result(keyword, n):
+    return {'title': f"{keyword} 기사 {n}", 'body': f"{keyword} 관련 내용 {n}", 'href': f"https://news.example.com/{keyword}/{n}"}
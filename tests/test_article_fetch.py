@@ -0,0 +1,229 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import analyzer
+import article_fetch
+
+ARTICLE_TEXT = "휴머노이드 로봇이 건설 현장에서 자재를 운반하는 시험 운용을 시작했다고 회사가 밝혔다."
+
+ARTICLE_PAGE = f"""<html><head><title>로봇 뉴스</title><script>var tracker = "script text";</script></head>
+<body>
+<nav><a href="/">홈</a> <a href="/robots">로봇 섹션으로 이동하는 메뉴 링크 모음</a></nav>
+<div class="ad-banner">지금 구독하면 첫 달 무료로 모든 기사를 볼 수 있습니다</div>
+<article>
+<h1>휴머노이드, 건설 현장 투입</h1>
+<p>{ARTICLE_TEXT}</p>
+<p>업계는 이번 시험이 인력 부족 문제를 해결할 첫 단계가 될 것으로 보고 있다.</p>
+<div class="share">공유하기 페이스북 트위터 카카오톡 링크 복사</div>
+</article>
+<footer>Copyright 2024 Robot News. All rights reserved. 무단 전재 금지</footer>
+</body></html>"""
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            path = self.path.split('?')[0]
+            if path.startswith('/slow'):
+                time.sleep(float(self.path.split('=')[1]))
+                self._send('text/html; charset=utf-8', ARTICLE_PAGE.encode('utf-8'))
+            elif path == '/large':
+                self._send('text/html; charset=utf-8', b"<p>" + b"x" * 500_000 + b"</p>")
+            elif path == '/euc-kr':
+                self._send('text/html; charset=euc-kr', ARTICLE_PAGE.encode('cp949'))
+            elif path == '/image':
+                self._send('image/png', b"\x89PNG\r\n\x1a\n")
+            elif path == '/missing':
+                self._send('text/html', b"not found", status=404)
+            elif path == '/redirect':
+                self.send_response(302)
+                self.send_header('Location', parse_qs(urlsplit(self.path).query)['to'][0])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                self._send('text/html; charset=utf-8', ARTICLE_PAGE.encode('utf-8'))
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _send(self, content_type, body, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass   # The client stopped reading at its byte cap
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host):
+    httpd = ThreadingHTTPServer((host, 0), ArticleHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.requests = httpd.active = httpd.max_active = 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.base = f"http://{host}:{httpd.server_address[1]}"
+    return httpd
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Article server on 127.0.0.1, the only loopback host the fetcher may use"""
+    monkeypatch.setattr(article_fetch, 'FETCH_ALLOWED_HOSTS', frozenset({'127.0.0.1'}))
+    httpd = start_server('127.0.0.1')
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def internal_server():
+    """A second loopback host standing in for an internal service"""
+    httpd = start_server('127.0.0.2')
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_extract_main_text_strips_boilerplate():
+    text = article_fetch.extract_main_text(ARTICLE_PAGE)
+
+    assert ARTICLE_TEXT in text
+    assert "인력 부족" in text
+    for chrome in ("메뉴 링크", "구독하면", "공유하기", "Copyright", "script text"):
+        assert chrome not in text
+
+
+def test_extract_main_text_truncates_to_max_chars():
+    assert article_fetch.extract_main_text(ARTICLE_PAGE, max_chars=10) == ARTICLE_TEXT[:10]
+
+
+def test_fetch_articles_returns_main_text(server):
+    urls = [f"{server.base}/article/{i}" for i in range(4)]
+
+    texts = article_fetch.fetch_articles(urls)
+
+    assert sorted(texts) == sorted(urls)
+    assert all(ARTICLE_TEXT in text and "구독하면" not in text for text in texts.values())
+
+
+def test_fetch_articles_decodes_declared_charset(server):
+    texts = article_fetch.fetch_articles([f"{server.base}/euc-kr"])
+
+    assert ARTICLE_TEXT in texts[f"{server.base}/euc-kr"]
+
+
+def test_fetch_articles_limits_requests_per_host(server):
+    urls = [f"{server.base}/slow/{i}?delay=0.2" for i in range(6)]
+
+    texts = article_fetch.fetch_articles(urls, deadline=5, max_workers=6, per_host=2)
+
+    assert len(texts) == 6
+    assert server.max_active == 2
+
+
+def test_fetch_articles_caps_bytes_per_page(server):
+    pages = []
+
+    article_fetch.fetch_articles([f"{server.base}/large"], max_bytes=100_000,
+                                 on_page=lambda url, outcome: pages.append(outcome))
+
+    assert pages[0]['error'] is None
+    assert pages[0]['bytes'] == 100_000
+
+
+def test_fetch_articles_skips_pages_past_the_deadline(server):
+    fast, slow = f"{server.base}/article/fast", f"{server.base}/slow/page?delay=2"
+    started = time.monotonic()
+
+    texts = article_fetch.fetch_articles([fast, slow], deadline=0.5)
+
+    assert time.monotonic() - started < 1.5
+    assert list(texts) == [fast]
+
+
+def test_fetch_articles_reports_non_html_and_http_errors(server):
+    pages = {}
+
+    texts = article_fetch.fetch_articles([f"{server.base}/image", f"{server.base}/missing"],
+                                         on_page=lambda url, outcome: pages.update({url: outcome}))
+
+    assert texts == {}
+    assert "not HTML" in pages[f"{server.base}/image"]['error']
+    assert "HTTP 404" in pages[f"{server.base}/missing"]['error']
+
+
+def test_fetch_article_bodies_reuses_cached_text(server):
+    news = [{'title': "휴머노이드", 'snippet': "요약", 'url': f"{server.base}/article/cached"}]
+
+    first = analyzer.fetch_article_bodies(news)
+    second = analyzer.fetch_article_bodies(news)
+
+    assert ARTICLE_TEXT in first[0]['content']
+    assert second[0]['content'] == first[0]['content']
+    assert server.requests == 1
+
+
+def test_fetch_articles_follows_redirects_on_allowed_hosts(server):
+    url = f"{server.base}/redirect?to=/article/moved"
+
+    texts = article_fetch.fetch_articles([url])
+
+    assert ARTICLE_TEXT in texts[url]
+    assert server.requests == 2
+
+
+def test_redirect_into_the_local_network_is_refused(server, internal_server):
+    url = f"{server.base}/redirect?to={internal_server.base}/admin"
+    pages = []
+
+    texts = article_fetch.fetch_articles([url], on_page=lambda url, outcome: pages.append(outcome))
+
+    assert texts == {}
+    assert "non-public address 127.0.0.2" in pages[0]['error']
+    assert internal_server.requests == 0
+
+
+def test_long_redirect_chains_are_cut_off(server):
+    url = f"{server.base}/redirect?to=/redirect%3Fto%3D/redirect%253Fto%253D/redirect%25253Fto%25253D/article/1"
+    pages = []
+
+    article_fetch.fetch_articles([url], on_page=lambda url, outcome: pages.append(outcome))
+
+    assert "redirects" in pages[0]['error']
+    assert server.requests == article_fetch.FETCH_MAX_REDIRECTS + 1
+
+
+@pytest.mark.parametrize('url', [
+    "http://127.0.0.1/", "http://localhost:8080/", "http://10.0.0.5/", "http://192.168.1.1/",
+    "http://169.254.169.254/latest/meta-data/", "http://[::1]/", "http://[::ffff:10.0.0.1]/", "file:///etc/passwd",
+])
+def test_check_public_url_refuses_local_targets(url):
+    with pytest.raises(IOError):
+        article_fetch.check_public_url(url)
+
+
+def test_loopback_is_refused_unless_allowed(internal_server):
+    pages = []
+
+    texts = article_fetch.fetch_articles([f"{internal_server.base}/article/1"],
+                                         on_page=lambda url, outcome: pages.append(outcome))
+
+    assert texts == {}
+    assert "non-public address" in pages[0]['error']
+    assert internal_server.requests == 0
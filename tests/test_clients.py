@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+import analyzer
+
+pytest.importorskip('google.generativeai')
+
+
+def client_key(model):
+    return model._client._client_options.api_key
+
+
+def test_gemini_models_bind_each_key_to_its_own_client():
+    models = analyzer.GeminiModels()
+    barrier = threading.Barrier(4)
+    bound = {}
+
+    def get(name, api_key):
+        barrier.wait()
+        model = models.get(api_key)
+        bound[name] = (api_key, client_key(model))
+
+    threads = [threading.Thread(target=get, args=(f"{api_key}-{n}", api_key))
+               for api_key in ("key-a", "key-b") for n in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(api_key == used for api_key, used in bound.values())
+    assert models.stats() == {'created': 2, 'reused': 2, 'models': 2}
+
+
+def test_gemini_models_keep_earlier_keys_after_a_new_one():
+    models = analyzer.GeminiModels()
+    first = models.get("key-a")
+
+    models.get("key-b")
+
+    assert models.get("key-a") is first
+    assert client_key(first) == "key-a"
+
+
+def test_client_pool_reuses_returned_clients():
+    pool = analyzer.ClientPool(object, max_idle=1)
+
+    with pool.lease() as first:
+        with pool.lease() as second:
+            assert first is not second
+    with pool.lease() as third:
+        assert third in (first, second)
+
+    assert (pool.created, pool.reused) == (2, 1)
@@ -0,0 +1,56 @@
+import analyzer
+import benchmark
+
+WORDS = ("현대건설 휴머노이드 로봇 현장 투입 시험 자재 운반 용접 점검 안전 관리 인력 부족 해소 "
+         "기대 정부 지원 예산 확대 내년 상용화 목표 협력사 센서 배터리 제어 알고리즘 보행 균형").split()
+
+
+def item(title, snippet="", url=None):
+    return {'title': title, 'snippet': snippet, 'url': url or f"https://news.example.com/{abs(len(title))}/{title[:4]}"}
+
+
+def similarity(a, b):
+    return analyzer._jaccard(analyzer._shingles(f"{a['title']} {a['snippet']}"),
+                             analyzer._shingles(f"{b['title']} {b['snippet']}"))
+
+
+def test_rephrased_copy_is_merged_into_the_earlier_item():
+    original = item("현대건설, 휴머노이드 로봇 건설 현장 첫 투입… 자재 운반·용접 시험 운용",
+                    "현대건설이 휴머노이드 로봇을 건설 현장에 처음 투입해 자재 운반과 용접 작업을 시험 운용한다고 밝혔다.",
+                    "https://a.example.com/1")
+    rephrased = item("현대건설, 건설 현장에 휴머노이드 로봇 첫 투입",
+                     "현대건설이 휴머노이드 로봇을 건설 현장에 처음 투입해 자재 운반과 용접 작업을 시험한다고 밝혔다. 업계 첫 사례다.",
+                     "https://b.example.com/2")
+    assert 0.5 <= similarity(original, rephrased) < 0.55
+
+    clustered = analyzer.cluster_near_duplicates([original, rephrased])
+
+    assert len(clustered) == 1
+    assert clustered[0]['url'] == original['url']
+    assert clustered[0]['source_count'] == 2
+    assert clustered[0]['duplicate_urls'] == [rephrased['url']]
+
+
+def test_chain_of_near_matches_is_not_merged_transitively():
+    first, middle, last = (item(" ".join(WORDS[start:start + 20]), url=f"https://news.example.com/{start}") for start in (0, 3, 6))
+    assert similarity(first, middle) >= 0.5 and similarity(middle, last) >= 0.5
+    assert similarity(first, last) < 0.5
+
+    clustered = analyzer.cluster_near_duplicates([first, middle, last])
+
+    assert [(news['url'], news['source_count']) for news in clustered] == [(first['url'], 2), (last['url'], 1)]
+
+
+def test_unrelated_stories_stay_separate_and_in_order():
+    items = [item("테슬라 옵티머스 공장 시범 투입", "테슬라가 휴머노이드 옵티머스를 배터리 공장 라인에 배치했다."),
+             item("물류 로봇 스타트업 시리즈B 투자 유치", "자율주행 물류 로봇 기업이 300억 원 규모 투자를 받았다."),
+             item("협동로봇 수출 역대 최대", "국내 협동로봇 수출액이 전년 대비 40% 늘었다.")]
+
+    clustered = analyzer.cluster_near_duplicates(items)
+
+    assert [news['title'] for news in clustered] == [news['title'] for news in items]
+    assert all(news['source_count'] == 1 for news in clustered)
+
+
+def test_templated_benchmark_news_does_not_collapse():
+    assert len(analyzer.cluster_near_duplicates(benchmark.synthetic_news(300))) > 1
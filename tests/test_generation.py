@@ -0,0 +1,44 @@
+import analyzer
+from fakes import Placeholder, StubModel
+
+
+def test_generate_text_streams_chunks_into_placeholder():
+    model = StubModel(["로봇 ", "시장은 ", "성장 중"])
+    placeholder = Placeholder()
+
+    text = analyzer.generate_text(model, "prompt", stream_placeholder=placeholder)
+
+    assert text == "로봇 시장은 성장 중"
+    assert model.calls[0]['stream'] is True
+    assert placeholder.rendered == ["로봇  ▌", "로봇 시장은  ▌", "로봇 시장은 성장 중 ▌", "로봇 시장은 성장 중"]
+
+
+def test_generate_text_skips_chunks_without_text():
+    model = StubModel(["앞부분", None, "", "뒷부분"])
+    placeholder = Placeholder()
+
+    text = analyzer.generate_text(model, "prompt", stream_placeholder=placeholder)
+
+    assert text == "앞부분뒷부분"
+    assert placeholder.rendered[-1] == "앞부분뒷부분"
+
+
+def test_generate_text_renders_cached_response_without_calling_model():
+    model = StubModel(["캐시될 ", "응답"])
+    analyzer.generate_text(model, "prompt", stream_placeholder=Placeholder())
+    placeholder = Placeholder()
+
+    text = analyzer.generate_text(model, "prompt", stream_placeholder=placeholder)
+
+    assert text == "캐시될 응답"
+    assert len(model.calls) == 1
+    assert placeholder.rendered == ["캐시될 응답"]
+
+
+def test_generate_text_refresh_bypasses_cache():
+    model = StubModel(["첫 응답"], ["새 응답"])
+    analyzer.generate_text(model, "prompt")
+
+    assert analyzer.generate_text(model, "prompt", refresh=True) == "새 응답"
+    assert analyzer.generate_text(model, "prompt") == "새 응답"
+    assert len(model.calls) == 2
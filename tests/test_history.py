@@ -0,0 +1,69 @@
+import json
+
+import analyzer
+
+
+def report(topic, lines=3):
+    return "\n".join(f"## {topic} {n}\n{topic} 관련 분석 내용 {n}" for n in range(lines))
+
+
+def test_append_and_get_keep_the_full_report(tmp_path):
+    store = analyzer.HistoryStore(str(tmp_path / "history.sqlite3"))
+    content = "긴 리포트 " * analyzer.HISTORY_SUMMARY_CHARS
+
+    entry_id = store.append("뉴스 분석", content)
+
+    entry = store.get(entry_id)
+    assert entry['content'] == content
+    assert entry['summary'] == content[:analyzer.HISTORY_SUMMARY_CHARS]
+    assert 'content' not in store.page()[0]
+
+
+def test_page_lists_newest_first_and_filters_by_type(tmp_path):
+    store = analyzer.HistoryStore(str(tmp_path / "history.sqlite3"))
+    ids = [store.append("뉴스 분석" if n % 2 else "파일 분석", report(f"주제{n}")) for n in range(7)]
+
+    assert [entry['id'] for entry in store.page(0, 3)] == ids[::-1][:3]
+    assert [entry['id'] for entry in store.page(3, 3)] == ids[::-1][3:6]
+    assert [entry['id'] for entry in store.page(analysis_type="뉴스 분석")] == [ids[5], ids[3], ids[1]]
+    assert store.count() == 7 and store.count("파일 분석") == 4
+    assert store.latest("뉴스 분석")['id'] == ids[5]
+
+
+def test_delete_removes_the_entry_and_its_passages(tmp_path):
+    store = analyzer.HistoryStore(str(tmp_path / "history.sqlite3"))
+    kept = store.append("뉴스 분석", report("휴머노이드"))
+    dropped = store.append("뉴스 분석", report("물류로봇"))
+
+    assert store.delete(dropped)
+
+    assert store.get(dropped) is None
+    assert not store.delete(dropped)
+    assert [entry['id'] for entry in store.page()] == [kept]
+    assert store.search_passages("물류로봇") == []
+
+
+def test_legacy_json_history_is_imported_once(tmp_path):
+    legacy = tmp_path / "history.json"
+    legacy.write_text(json.dumps([
+        {'timestamp': "2024-01-01 09:00:00", 'type': "뉴스 분석", 'content': report("건설로봇")},
+        {'timestamp': "2024-01-08 09:00:00", 'type': "파일 분석", 'content': report("휴머노이드")},
+    ], ensure_ascii=False), encoding='utf-8')
+
+    store = analyzer.HistoryStore(str(tmp_path / "history.sqlite3"), legacy_json=str(legacy))
+
+    assert [entry['timestamp'] for entry in store.page()] == ["2024-01-08 09:00:00", "2024-01-01 09:00:00"]
+    assert not legacy.exists() and (tmp_path / "history.json.bak").exists()
+    assert store.search_passages("건설로봇")
+
+
+def test_history_summary_defaults_to_the_newest_sidebar_page(monkeypatch):
+    monkeypatch.setattr(analyzer, 'HISTORY_PAGE_SIZE', 2)
+    store = analyzer.get_history_store()
+    for n in range(3):
+        store.append("뉴스 분석", f"리포트 {n}")
+
+    summary = analyzer.get_history_summary()
+
+    assert "리포트 0" not in summary
+    assert summary.index("리포트 1") < summary.index("리포트 2")
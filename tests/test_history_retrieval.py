@@ -0,0 +1,57 @@
+import analyzer
+
+
+def test_split_passages_starts_a_new_passage_at_each_heading():
+    content = "## 휴머노이드\n보행 제어 발표\n\n## 물류 로봇\n창고 자동화 확대"
+
+    assert analyzer.split_passages(content) == ["## 휴머노이드\n보행 제어 발표", "## 물류 로봇\n창고 자동화 확대"]
+
+
+def test_search_passages_ranks_matching_passages_first(tmp_path):
+    store = analyzer.HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append("뉴스 분석", "## 물류 로봇\n창고 자동화 투자 확대\n## 휴머노이드\n휴머노이드 보행 제어 공개")
+    store.append("뉴스 분석", "## 건설 로봇\n건설 현장 자동화 도입")
+
+    results = store.search_passages("휴머노이드 보행")
+
+    assert results[0]['text'].startswith("## 휴머노이드")
+    assert all("건설" not in item['text'] for item in results)
+    assert [item['score'] for item in results] == sorted((item['score'] for item in results), reverse=True)
+
+
+def test_search_passages_stays_within_the_token_budget(tmp_path):
+    store = analyzer.HistoryStore(str(tmp_path / "history.sqlite3"))
+    for n in range(10):
+        store.append("뉴스 분석", f"## 휴머노이드 {n}\n" + "휴머노이드 양산 계획 " * 30)
+
+    results = store.search_passages("휴머노이드 양산", token_budget=300)
+
+    assert results
+    assert sum(analyzer.estimate_tokens(item['text']) for item in results) <= 300
+
+
+def test_search_passages_filters_by_entry(tmp_path):
+    store = analyzer.HistoryStore(str(tmp_path / "history.sqlite3"))
+    first = store.append("뉴스 분석", "## 휴머노이드\n1월 휴머노이드 동향")
+    second = store.append("뉴스 분석", "## 휴머노이드\n2월 휴머노이드 동향")
+
+    assert [item['text'] for item in store.search_passages("휴머노이드", entry_ids=[second])] == ["## 휴머노이드\n2월 휴머노이드 동향"]
+    assert store.search_passages("휴머노이드", entry_ids=[]) == []
+    assert len(store.search_passages("휴머노이드", entry_ids=[first, second])) == 2
+
+
+def test_relevant_history_uses_only_selected_entries():
+    store = analyzer.get_history_store()
+    store.append("뉴스 분석", "## 휴머노이드\n선택하지 않은 휴머노이드 리포트")
+    selected = store.append("뉴스 분석", "## 휴머노이드\n선택한 휴머노이드 리포트")
+
+    context = analyzer.get_relevant_history("휴머노이드", selected_ids=[selected])
+
+    assert "선택한 휴머노이드 리포트" in context
+    assert "선택하지 않은" not in context
+
+
+def test_relevant_history_falls_back_to_the_summary_without_matches():
+    analyzer.get_history_store().append("뉴스 분석", "## 물류 로봇\n창고 자동화")
+
+    assert analyzer.get_relevant_history("우주 탐사") == analyzer.get_history_summary()
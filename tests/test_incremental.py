@@ -0,0 +1,45 @@
+import pytest
+
+import analyzer
+from fakes import StubModel, StubModels
+
+
+def news(title, url, **extra):
+    return {'title': title, 'snippet': f"{title} 관련 기사", 'url': url, **extra}
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ("http://www.example.com/news/1/", "https://example.com/news/1"),
+    ("https://m.example.com/news/1?utm_source=x&fbclid=y", "https://example.com/news/1"),
+    ("https://example.com/view?b=2&a=1#comments", "https://example.com/view?a=1&b=2"),
+    ("https://Example.com:8443/news", "https://example.com:8443/news"),
+])
+def test_canonicalize_url_drops_tracking_and_presentation_details(url, canonical):
+    assert analyzer.canonicalize_url(url) == canonical
+
+
+def test_filter_new_articles_matches_merged_duplicates(tmp_path):
+    index = analyzer.SeenArticleIndex(str(tmp_path / "seen.sqlite3"))
+    index.add({analyzer.canonicalize_url("https://b.example.com/copy")})
+    items = [news("원문", "https://a.example.com/story", duplicate_urls=["https://b.example.com/copy?utm_medium=rss"]),
+             news("새 기사", "https://c.example.com/new")]
+
+    assert [item['title'] for item in analyzer.filter_new_articles(items, index)] == ["새 기사"]
+
+
+def test_incremental_report_only_sends_unseen_articles(monkeypatch, notices):
+    model = StubModel(["첫 리포트"], ["두 번째 리포트"])
+    monkeypatch.setattr(analyzer, 'get_gemini_models', lambda: StubModels(model))
+    first_week = [news("휴머노이드 현장 투입", "https://a.example.com/1"), news("건설 로봇 수주", "https://b.example.com/2")]
+
+    assert analyzer.generate_ai_report(first_week, [], "key", incremental=True) == "첫 리포트"
+    assert analyzer.generate_ai_report(first_week, [], "key", incremental=True) is None
+    assert ('info', "이전 분석 이후 새로운 기사가 없습니다.") in notices
+
+    second_week = first_week + [news("물류 로봇 투자", "https://www.c.example.com/3/")]
+    assert analyzer.generate_ai_report(second_week, [], "key", incremental=True) == "두 번째 리포트"
+
+    prompt = model.calls[-1]['prompt']
+    assert "물류 로봇 투자" in prompt and "휴머노이드 현장 투입" not in prompt
+    assert "이전 리포트 요약: 첫 리포트" in prompt
+    assert analyzer.get_seen_index().count() == 3
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+from analyzer import news_analysis_key, notify
+from jobs import DONE, FAILED, JobRunner
+
+
+def wait_for(runner, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job['status'] in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=4)
+    yield runner
+    runner._executor.shutdown(wait=True)
+
+
+def test_job_reports_progress_stream_and_result(runner):
+    release = threading.Event()
+
+    def analysis(job):
+        job.update(40, "검색 중...")
+        job.markdown("## 리포트 초안")
+        notify('warning', "일부 키워드 검색 실패")
+        release.wait(5)
+        return "## 리포트"
+
+    job_id = runner.submit("주간 뉴스 분석", analysis)
+    while runner.get(job_id)['progress'] < 40:
+        time.sleep(0.01)
+
+    running = runner.get(job_id)
+    assert running['message'] == "검색 중..." and running['partial'] == "## 리포트 초안"
+    assert runner.active_count() == 1
+
+    release.set()
+    job = wait_for(runner, job_id)
+    assert job['status'] == DONE and job['progress'] == 100
+    assert job['result'] == "## 리포트"
+    assert job['messages'] == [('warning', "일부 키워드 검색 실패")]
+
+
+def test_job_failure_is_recorded_not_raised(runner):
+    def analysis(job):
+        raise RuntimeError("quota exceeded")
+
+    job = wait_for(runner, runner.submit("파일 분석", analysis))
+
+    assert job['status'] == FAILED and job['error'] == "quota exceeded"
+    assert runner.active_count() == 0
+
+
+def test_finished_jobs_beyond_the_limit_are_pruned(runner):
+    runner.limit = 2
+    ids = [runner.submit("분석", lambda job, n=n: n) for n in range(3)]
+    for job_id in ids:
+        wait_for(runner, job_id)
+
+    runner.submit("분석", lambda job: None)
+
+    assert runner.get(ids[0]) is None
+    assert runner.get(ids[2])['result'] == 2
+
+
+def test_unknown_job_id_returns_none(runner):
+    assert runner.get("missing") is None
+
+
+KEYWORDS = {'group_a_construction': "건설 로봇", 'group_a_humanoid': "휴머노이드", 'group_b_keywords': "물류 로봇"}
+
+
+def test_identical_submissions_share_one_run(runner):
+    release, calls = threading.Event(), []
+
+    def analysis(job):
+        calls.append(job.id)
+        release.wait(5)
+        return "## 리포트"
+
+    first = runner.submit("주간 뉴스 분석", analysis, key="same")
+    second = runner.submit("주간 뉴스 분석", analysis, key="same")
+    other = runner.submit("주간 뉴스 분석", analysis, key="other")
+    release.set()
+
+    assert first == second != other
+    assert wait_for(runner, first)['subscribers'] == 2
+    assert wait_for(runner, other)['result'] == "## 리포트"
+    assert len(calls) == 2
+
+
+def test_finished_key_starts_a_fresh_run(runner):
+    first = runner.submit("분석", lambda job: "첫 결과", key="same")
+    wait_for(runner, first)
+
+    second = runner.submit("분석", lambda job: "새 결과", key="same")
+
+    assert second != first
+    assert wait_for(runner, second)['result'] == "새 결과"
+
+
+def test_shared_run_failure_reaches_every_subscriber(runner):
+    release = threading.Event()
+
+    def analysis(job):
+        release.wait(5)
+        raise RuntimeError("검색 실패")
+
+    job_id = runner.submit("분석", analysis, key="same")
+    assert runner.submit("분석", analysis, key="same") == job_id
+    release.set()
+
+    job = wait_for(runner, job_id)
+    assert job['status'] == FAILED and job['error'] == "검색 실패"
+
+
+def test_news_key_ignores_keyword_order_case_and_spacing():
+    reordered = {'group_a_construction': "휴머노이드", 'group_a_humanoid': "건설  로봇",
+                 'group_b_keywords': "물류 로봇"}
+
+    assert news_analysis_key(KEYWORDS, day="2024-01-01") == news_analysis_key(reordered, day="2024-01-01")
+
+
+@pytest.mark.parametrize('change', [
+    {'api_key': "other-key"},
+    {'stream': True},
+    {'day': "2024-01-02"},
+    {'use_history': True},
+    {'refresh': True},
+])
+def test_news_key_separates_runs_that_differ(change):
+    base = {'api_key': "key", 'stream': False, 'day': "2024-01-01"}
+
+    assert news_analysis_key(KEYWORDS, **base) != news_analysis_key(KEYWORDS, **{**base, **change})
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import analyzer
+import metrics
+
+
+def spans(run, name):
+    return [record['fields'] for record in run.spans if record['name'] == name]
+
+
+def test_search_query_span_counts_generator_results_without_cache(ddgs):
+    with metrics.run("search") as current:
+        analyzer.search_news(["로봇"], max_results=3, use_cache=False)
+
+    assert spans(current, 'search.query')[0]['results'] == 3
+    assert spans(current, 'search.keyword')[0] == {'keyword': "로봇", 'hedged': False, 'results': 3, 'failed': False}
+
+
+def test_search_query_span_marks_cache_hits(ddgs):
+    analyzer.search_news(["로봇"], max_results=3)
+
+    with metrics.run("search") as current:
+        analyzer.search_news(["로봇"], max_results=3)
+
+    assert spans(current, 'search.query')[0]['cached'] is True
+    assert spans(current, 'search.query')[0]['results'] == 3
+
+
+def test_worker_thread_spans_join_the_callers_run():
+    def work():
+        with metrics.span("inner"):
+            pass
+
+    with metrics.run("outer") as current:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(metrics.bind(work)).result()
+            executor.submit(work).result()
+        with metrics.span("stage", items=2):
+            pass
+
+    assert [record['name'] for record in current.spans] == ["inner", "stage"]
+    assert current.summary()['stages']['stage']['items'] == 2
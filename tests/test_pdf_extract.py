@@ -0,0 +1,57 @@
+import io
+import time
+
+import pytest
+
+import analyzer
+import benchmark
+
+pdf_extract = pytest.importorskip('pdf_extract')
+needs_fork = pytest.mark.skipif(pdf_extract._pool_context() is None, reason="page-parallel extraction needs fork")
+
+
+@pytest.fixture(scope='module')
+def document():
+    return benchmark.synthetic_pdf(pdf_extract.PARALLEL_MIN_PAGES + 10)
+
+
+def stalled_task(task):
+    time.sleep(30)
+    return pdf_extract._extract_page_range(*task)
+
+
+@needs_fork
+def test_parallel_extraction_matches_sequential(document):
+    progress = []
+
+    parallel = pdf_extract.extract_text(io.BytesIO(document), lambda done, total: progress.append((done, total)), max_workers=2)
+
+    assert parallel == pdf_extract.extract_text(io.BytesIO(document), max_workers=1)
+    assert f"{pdf_extract.PARALLEL_MIN_PAGES + 9}.39 " in parallel
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    assert progress[-1] == (pdf_extract.PARALLEL_MIN_PAGES + 10,) * 2
+
+
+@needs_fork
+def test_stalled_workers_fall_back_to_in_process_extraction(document, monkeypatch):
+    monkeypatch.setattr(pdf_extract, '_extract_task', stalled_task)
+    monkeypatch.setattr(pdf_extract, 'STALL_TIMEOUT', 0.5)
+    started = time.monotonic()
+
+    text = pdf_extract.extract_text(io.BytesIO(document), max_workers=2)
+
+    assert time.monotonic() - started < 10
+    assert text == pdf_extract.extract_text(io.BytesIO(document), max_workers=1)
+
+
+def test_extract_pdf_text_records_page_count():
+    with analyzer.metrics.run("upload") as current:
+        text = analyzer.extract_pdf_text(io.BytesIO(benchmark.synthetic_pdf(3)))
+
+    assert text.startswith("0.0 ") and "2.39 " in text
+    assert current.spans[-1]['fields']['pages'] == 3
+
+
+def test_unreadable_pdf_is_reported(notices):
+    assert analyzer.extract_pdf_text(io.BytesIO(b"not a pdf")) is None
+    assert notices[0][0] == 'error'
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+import analyzer
+import benchmark
+
+pytest.importorskip('fpdf')
+pytest.importorskip('fontTools')
+
+
+@pytest.fixture
+def font_dir(tmp_path, monkeypatch):
+    """No installed fonts; the download points at a file that does not exist yet"""
+    fonts = tmp_path / "fonts"
+    source = tmp_path / "mirror" / "NanumGothic-Regular.ttf"
+    monkeypatch.delenv(analyzer.FONT_PATH_ENV, raising=False)
+    monkeypatch.setattr(analyzer, 'FONT_DIR', str(fonts))
+    monkeypatch.setattr(analyzer, 'KOREAN_FONT_CANDIDATES', [str(fonts / "NanumGothic.ttf")])
+    monkeypatch.setattr(analyzer, 'KOREAN_FONT_URL', source.as_uri())
+    return fonts, source
+
+
+def test_failed_download_is_reported_with_the_override_hint(font_dir):
+    registry = analyzer.FontRegistry()
+
+    assert registry.wait(timeout=5) is None
+    level, message = registry.missing_notice()
+
+    assert registry.error
+    assert level == 'error'
+    assert analyzer.FONT_PATH_ENV in message
+
+
+def test_retry_restarts_the_download(font_dir):
+    fonts, source = font_dir
+    registry = analyzer.FontRegistry()
+    registry.wait(timeout=5)
+    source.parent.mkdir()
+    benchmark.synthetic_font(str(source))
+
+    registry.retry()
+
+    assert registry.wait(timeout=5) == str(fonts / "NanumGothic.ttf")
+    assert registry.error is None
+
+
+def test_font_installed_later_is_picked_up(font_dir, monkeypatch, notices):
+    fonts, _ = font_dir
+    registry = analyzer.FontRegistry(download=False)
+    monkeypatch.setattr(analyzer, 'get_font_registry', lambda: registry)
+    assert analyzer.save_to_pdf("## 리포트") is None
+    assert notices[-1][0] == 'error'
+
+    fonts.mkdir()
+    benchmark.synthetic_font(str(fonts / "NanumGothic.ttf"))
+
+    assert analyzer.save_to_pdf("## 리포트\n한글 본문").startswith(b"%PDF")
+
+
+def test_font_path_override_is_honoured(font_dir, tmp_path, monkeypatch):
+    path = benchmark.synthetic_font(str(tmp_path / "custom.ttf"))
+    monkeypatch.setenv(analyzer.FONT_PATH_ENV, path)
+
+    assert analyzer.FontRegistry(download=False).korean_font_path() == path
+    assert os.path.exists(path)
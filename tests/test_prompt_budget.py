@@ -0,0 +1,58 @@
+import analyzer
+
+
+def news(title, snippet, keyword, **extra):
+    return {'title': title, 'snippet': snippet, 'keyword': keyword,
+            'url': f"https://news.example.com/{len(title)}/{title[:6]}", **extra}
+
+
+def test_bm25_ranks_documents_matching_the_query_terms():
+    scores = analyzer.bm25_scores(
+        ["휴머노이드 로봇 보행 제어", "물류 창고 자동화", "휴머노이드 휴머노이드 배터리"],
+        "휴머노이드"
+    )
+
+    assert scores[1] == 0
+    assert scores[2] > scores[0] > 0
+
+
+def test_budget_keeps_the_most_relevant_items_that_fit():
+    items = [news("물류 창고 자동화 확대", "창고 물류 기사", "휴머노이드"),
+             news("휴머노이드 보행 제어 공개", "휴머노이드 기술 기사", "휴머노이드"),
+             news("휴머노이드 투자 유치", "휴머노이드 업체 투자", "휴머노이드")]
+    budget = max(analyzer.estimate_tokens(analyzer.format_news_item(item)) for item in items) * 2
+
+    kept, dropped, used = analyzer.select_news_within_budget(items, budget)
+
+    assert [item['title'] for item in dropped] == ["물류 창고 자동화 확대"]
+    assert len(kept) == 2 and used <= budget
+
+
+def test_stories_from_several_outlets_rank_higher():
+    single = news("휴머노이드 제어 기술", "휴머노이드 관련", "휴머노이드")
+    syndicated = news("휴머노이드 제어 기술 발표", "휴머노이드 관련", "휴머노이드", source_count=4)
+
+    kept, _, _ = analyzer.select_news_within_budget([single, syndicated], None)
+
+    assert kept[0] is syndicated
+
+
+def test_prompt_budget_splits_70_30_and_reports_dropped_items():
+    group_a = [news(f"건설 로봇 {n}호 현장 투입", "건설 로봇 " * 20, "건설 로봇") for n in range(30)]
+    group_b = [news(f"물류 로봇 {n}", "물류 로봇 " * 20, "물류 로봇") for n in range(30)]
+
+    kept_a, kept_b, report = analyzer.apply_prompt_budget(group_a, group_b, token_budget=1000)
+
+    assert report['group_a']['budget'] == 700 and report['group_b']['budget'] == 300
+    assert report['group_a']['tokens'] <= 700 and report['group_b']['tokens'] <= 300
+    assert len(kept_a) + len(report['group_a']['dropped']) == 30
+    assert len(kept_a) > len(kept_b) > 0
+
+
+def test_unlimited_budget_keeps_everything():
+    items = [news(f"로봇 {n}", "내용", "로봇") for n in range(5)]
+
+    kept_a, kept_b, report = analyzer.apply_prompt_budget(items, items[:2], token_budget=None)
+
+    assert len(kept_a) == 5 and len(kept_b) == 2
+    assert report['group_a']['dropped'] == []
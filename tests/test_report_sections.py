@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import analyzer
+from fakes import Placeholder, StubModel, StubModels
+
+
+def news(title):
+    return {'title': title, 'snippet': f"{title} 관련 기사", 'url': "https://news.example.com/" + title.replace(" ", "-")}
+
+
+SECTIONS = {
+    '1.1': "건설 현장 분석",
+    '1.2': "휴머노이드 기술",
+    '1.3': "융합 시나리오",
+    '1.4': "기업 평가",
+    '2': "기타 동향",
+    '3': "전망",
+}
+
+
+def test_parse_report_sections_accepts_fences_and_titled_keys():
+    text = "```json\n" + json.dumps({
+        "1.1 건설 로봇 현장 적용 분석": "### 1.1 건설 로봇 현장 적용 분석\n본문",
+        "2": "기타 동향",
+        "9": "알 수 없는 섹션",
+        "3": "",
+    }, ensure_ascii=False) + "\n```"
+
+    assert analyzer.parse_report_sections(text) == {'1.1': "본문", '2': "기타 동향"}
+
+
+@pytest.mark.parametrize('text', ["리포트 본문", '["1.1", "본문"]', '{"9": "본문"}', "", None])
+def test_parse_report_sections_rejects_other_responses(text):
+    assert analyzer.parse_report_sections(text) is None
+
+
+def test_structured_sections_request_json_mode():
+    model = StubModel([json.dumps(SECTIONS, ensure_ascii=False)])
+    placeholder = Placeholder()
+
+    sections = analyzer.generate_structured_sections([news("건설 로봇")], [news("물류 로봇")], model, stream_placeholder=placeholder)
+
+    assert sections == SECTIONS
+    assert model.calls[0]['generation_config'] == analyzer.STRUCTURED_GENERATION_CONFIG
+    assert model.calls[0]['stream'] is False
+    assert placeholder.rendered[-1] == analyzer.assemble_report(SECTIONS)
+
+
+def test_structured_report_is_saved_per_section(monkeypatch):
+    model = StubModel([json.dumps(SECTIONS, ensure_ascii=False)])
+    monkeypatch.setattr(analyzer, 'get_gemini_models', lambda: StubModels(model))
+    report_sections = {}
+
+    report = analyzer.generate_ai_report([news("건설 로봇")], [news("물류 로봇")], "key",
+                                         structured_sections=True, report_sections=report_sections)
+
+    assert report == analyzer.assemble_report(SECTIONS)
+    assert report_sections['sections'] == SECTIONS
+    assert analyzer.get_report_section_store().get(report_sections['id'])['sections'] == SECTIONS
+
+
+def test_structured_report_falls_back_to_streamed_markdown(monkeypatch, notices):
+    model = StubModel(["JSON이 아닌 응답"], ["## 1. 분석", "\n본문"])
+    monkeypatch.setattr(analyzer, 'get_gemini_models', lambda: StubModels(model))
+    placeholder = Placeholder()
+    report_sections = {}
+
+    report = analyzer.generate_ai_report([news("건설 로봇")], [news("물류 로봇")], "key", stream_placeholder=placeholder,
+                                         structured_sections=True, report_sections=report_sections)
+
+    assert report == "## 1. 분석\n본문"
+    assert [call['generation_config'] for call in model.calls] == [analyzer.STRUCTURED_GENERATION_CONFIG, None]
+    assert model.calls[1]['stream'] is True
+    assert placeholder.rendered[-1] == report
+    assert report_sections == {}
+    assert ('warning', "섹션별 응답을 해석하지 못해 한 번에 작성하는 방식으로 다시 생성합니다.") in notices
@@ -0,0 +1,143 @@
+import time
+
+import pytest
+
+import analyzer
+from fakes import search_result
+
+
+@pytest.mark.parametrize('use_cache', [True, False])
+def test_search_news_accepts_generator_results(ddgs, notices, use_cache):
+    results = analyzer.search_news(["로봇"], max_results=3, use_cache=use_cache)
+
+    assert [item['url'] for item in results] == [search_result("로봇", n)['href'] for n in range(3)]
+    assert notices == []
+
+
+def test_search_cache_answers_repeat_queries(ddgs):
+    first = analyzer.search_news(["로봇"], max_results=3)
+    calls = len(ddgs.calls)
+
+    second = analyzer.search_news(["로봇"], max_results=3)
+
+    assert second == first
+    assert len(ddgs.calls) == calls
+    assert analyzer.get_search_cache().stats()['hits'] == 1
+
+
+def test_search_cache_expires_entries(tmp_path):
+    cache = analyzer.SearchCache(str(tmp_path / "search.sqlite3"), ttl=0)
+    cache.set("로봇", 'kr-kr', 'w', 3, [search_result("로봇", 0)])
+
+    assert cache.get("로봇", 'kr-kr', 'w', 3) is None
+
+
+def test_search_cache_keys_on_query_parameters(tmp_path):
+    cache = analyzer.SearchCache(str(tmp_path / "search.sqlite3"))
+    cache.set("로봇", 'kr-kr', 'w', 3, [search_result("로봇", 0)])
+
+    assert cache.get("로봇", 'kr-kr', 'w', 3) == [search_result("로봇", 0)]
+    assert cache.get("로봇", 'wt-wt', 'w', 3) is None
+    assert cache.get("로봇", 'kr-kr', 'w', 5) is None
+
+
+def test_keywords_are_searched_concurrently(ddgs):
+    ddgs.delay = 0.2
+    started = time.monotonic()
+
+    analyzer.search_news(["로봇", "휴머노이드", "건설"], max_results=3, use_cache=False)
+
+    assert ddgs.max_active == 3
+    assert time.monotonic() - started < 0.5
+
+
+def test_max_workers_bounds_concurrency(ddgs):
+    ddgs.delay = 0.05
+
+    analyzer.search_news(["로봇", "휴머노이드", "건설"], max_results=3, max_workers=1, use_cache=False)
+
+    assert ddgs.max_active == 1
+
+
+def test_results_keep_keyword_order_and_first_keyword_wins_duplicates(ddgs):
+    shared = search_result("공통", 0)
+    ddgs.results["로봇"].append(shared)
+    ddgs.results["휴머노이드"].insert(0, shared)
+    ddgs.delay = {"로봇": 0.2}   # The first keyword answers last
+
+    results = analyzer.search_news(["로봇", "휴머노이드"], max_results=4, use_cache=False)
+
+    assert [item['keyword'] for item in results] == ["로봇"] * 4 + ["휴머노이드"] * 3
+    assert [item['keyword'] for item in results if item['url'] == shared['href']] == ["로봇"]
+
+
+def test_failed_keyword_is_reported_and_the_rest_returned(ddgs, notices):
+    ddgs.failing.add("휴머노이드")
+
+    results = analyzer.search_news(["로봇", "휴머노이드"], max_results=3, use_cache=False)
+
+    assert {item['keyword'] for item in results} == {"로봇"}
+    assert notices == [('warning', "검색 실패 (키워드: 휴머노이드) - 모든 검색 시도 실패")]
+    assert len([call for call in ddgs.calls if call[0] == "휴머노이드"]) == len(analyzer.SEARCH_STRATEGIES)
+
+
+def test_token_bucket_paces_after_the_burst():
+    bucket = analyzer.TokenBucket(rate=20, capacity=2)
+    started = time.monotonic()
+
+    for _ in range(6):
+        bucket.acquire()
+
+    assert time.monotonic() - started >= (6 - 2) / 20 * 0.9
+
+
+class LadderDDGS:
+    """Answers each (region, timelimit) strategy after its own delay"""
+    def __init__(self, answers):
+        self.answers = answers   # (region, timelimit) -> (delay, results)
+        self.launched = []
+
+    def text(self, keyword, region=None, safesearch=None, timelimit=None, max_results=None):
+        self.launched.append((region, timelimit))
+        delay, results = self.answers.get((region, timelimit), (0.0, []))
+        time.sleep(delay)
+        return iter(results)
+
+
+def hedged(monkeypatch, answers, hedge_delay=0.1):
+    fake = LadderDDGS(answers)
+    monkeypatch.setattr(analyzer, 'get_ddgs_pool', lambda: analyzer.ClientPool(lambda: fake, 8))
+    started = time.monotonic()
+    results = analyzer.search_keyword("로봇", 3, hedge_delay=hedge_delay)
+    return results, fake.launched, time.monotonic() - started
+
+
+def test_hedged_search_launches_the_next_strategy_when_the_first_is_slow(monkeypatch):
+    results, launched, elapsed = hedged(monkeypatch, {
+        ('kr-kr', 'w'): (2.0, [search_result("느림", 0)]),
+        ('kr-kr', None): (0.0, [search_result("빠름", 0)]),
+    })
+
+    assert results == [search_result("빠름", 0)]
+    assert launched == [('kr-kr', 'w'), ('kr-kr', None)]
+    assert elapsed < 1.0
+
+
+def test_hedged_search_prefers_a_higher_priority_answer_that_arrives_in_time(monkeypatch):
+    results, launched, _ = hedged(monkeypatch, {
+        ('kr-kr', 'w'): (0.15, [search_result("우선", 0)]),
+        ('kr-kr', None): (0.0, [search_result("차선", 0)]),
+    })
+
+    assert results == [search_result("우선", 0)]
+    assert launched == [('kr-kr', 'w'), ('kr-kr', None)]
+
+
+def test_hedged_search_escalates_at_once_on_empty_answers(monkeypatch):
+    results, launched, elapsed = hedged(monkeypatch, {
+        ('wt-wt', 'w'): (0.0, [search_result("세계", 0)]),
+    }, hedge_delay=5.0)
+
+    assert results == [search_result("세계", 0)]
+    assert launched == [('kr-kr', 'w'), ('kr-kr', None), ('wt-wt', 'w')]
+    assert elapsed < 1.0
@@ -0,0 +1,119 @@
+"""Headless weekly report runner (no Streamlit).
+
+Runs the same search -> prompt -> Gemini -> export pipeline as the
+"뉴스 분석 시작" button and writes the report to disk, e.g. from cron:
+
+    python weekly_batch.py --keywords .keywords.json --out reports/
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+import analyzer
+
+logger = logging.getLogger("weekly_batch")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="로봇 산업 주간 뉴스 분석 리포트를 생성합니다.")
+    parser.add_argument("--keywords", default=analyzer.KEYWORDS_FILE,
+                        help="키워드 JSON 파일 (앱의 .keywords.json 형식, 기본값: 앱 설정)")
+    parser.add_argument("--out", default="reports", help="리포트 저장 디렉터리")
+    parser.add_argument("--api-key", default=None,
+                        help="Gemini API 키 (기본값: GEMINI_API_KEY 환경 변수 또는 .api_key.txt)")
+    parser.add_argument("--formats", default="md,docx,pdf", help="저장 형식 (md, docx, pdf 중 쉼표로 구분)")
+    parser.add_argument("--no-history", action="store_true", help="이전 분석 결과를 참고하지 않음")
+    parser.add_argument("--incremental", action="store_true", help="이미 분석한 기사를 제외한 증분 분석")
+    parser.add_argument("--token-budget", type=int, default=analyzer.PROMPT_NEWS_TOKEN_BUDGET,
+                        help="프롬프트 뉴스 토큰 예산 (0 = 제한 없음)")
+    parser.add_argument("--no-cache", action="store_true", help="검색 결과 캐시를 사용하지 않음")
+    parser.add_argument("--no-hedge", action="store_true", help="폴백 검색 병렬 실행(헤지)을 끔")
+    parser.add_argument("--no-merge", action="store_true", help="유사 기사 묶기를 끔")
+    parser.add_argument("--refresh", action="store_true", help="캐시된 AI 응답을 무시하고 새로 생성")
+    parser.add_argument("--fetch-articles", action="store_true", help="기사 페이지 본문을 가져와 AI에 함께 전달")
+    report_mode = parser.add_mutually_exclusive_group()
+    report_mode.add_argument("--parallel-sections", action="store_true", help="섹션 초안을 동시에 생성한 뒤 종합")
+    report_mode.add_argument("--structured-sections", action="store_true",
+                             help="섹션별 JSON으로 생성해 저장 (앱에서 섹션 단위 재생성 가능)")
+    return parser.parse_args(argv)
+
+
+# Function to write the report in each requested format
+def write_reports(report, out_dir, formats, stem):
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{stem}.{fmt}")
+        if fmt == "md":
+            data = report.encode("utf-8")
+        elif fmt == "docx":
+            buffer = analyzer.save_to_word(report)
+            data = buffer.getvalue() if buffer else None
+        elif fmt == "pdf":
+            # Short-lived process: the font download must finish here, not in a daemon thread
+            registry = analyzer.get_font_registry()
+            if registry.wait() is None:
+                logger.warning("PDF를 건너뜁니다: %s", registry.missing_notice()[1])
+                continue
+            data = analyzer.save_to_pdf(report)
+        else:
+            logger.warning("알 수 없는 형식: %s", fmt)
+            continue
+        if data is None:
+            continue
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append(path)
+    return written
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    api_key = args.api_key or os.environ.get("GEMINI_API_KEY") or analyzer.load_api_key()
+    if not api_key:
+        logger.error("Gemini API 키가 없습니다 (--api-key, GEMINI_API_KEY 또는 .api_key.txt)")
+        return 2
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()]
+    if "pdf" in formats:
+        analyzer.get_font_registry()   # Starts the font download (if needed) while the analysis runs
+
+    keywords = analyzer.load_keywords(args.keywords)
+    outcome = analyzer.run_news_analysis(
+        keywords,
+        api_key,
+        use_cache=not args.no_cache,
+        hedge_delay=None if args.no_hedge else analyzer.SEARCH_HEDGE_DELAY,
+        merge_duplicates=not args.no_merge,
+        use_history=not args.no_history,
+        incremental=args.incremental,
+        token_budget=args.token_budget or None,
+        refresh=args.refresh,
+        fetch_articles=args.fetch_articles,
+        parallel_sections=args.parallel_sections,
+        structured_sections=args.structured_sections,
+        progress_callback=lambda percent, message: message and logger.info("[%3d%%] %s", percent, message)
+    )
+    if not outcome['group_a'] and not outcome['group_b']:
+        logger.error("검색 결과가 없습니다. 키워드를 변경해보세요.")
+        return 1
+    report = outcome['report']
+    for name, stage in outcome['metrics'].summary()['stages'].items():
+        logger.info("단계 %-18s %3d회 %8.0f ms", name, stage['count'], stage['total_ms'])
+    if not report:
+        return 1
+    if outcome['sections']:
+        logger.info("섹션 저장: %s (%d개 섹션)", outcome['sections']['id'], len(outcome['sections']['sections']))
+
+    stem = f"주간_로봇_산업_분석_{datetime.now().strftime('%Y%m%d')}"
+    for path in write_reports(report, args.out, formats, stem):
+        logger.info("저장: %s", path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())